@@ -2,25 +2,31 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import async_session
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from typing import List
-from app.core.config import settings
+from jose import JWTError
+from typing import List, Mapping
+from app.core.security import decode_access_token
+from app.services.orthanc import OrthancClient
+from app.services.ingest_queue import IngestQueue
+from app.services.previews import PreviewCache
+from app.services.resumable import ResumableUploads
+from app.services.reconcile import OrthancReconciler
+from app.services.login_throttle import LoginThrottle
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_current_user_data(token: str = Depends(oauth2_scheme)) -> dict:
+async def get_current_user_data(token: str = Depends(oauth2_scheme)) -> Mapping:
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        # payload should contain 'sub', 'user_id', 'roles', 'exp'
-        return payload
+        # claims contain 'sub', 'user_id', 'roles' (a frozenset) and 'exp'
+        return decode_access_token(token)
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
 
 def check_roles(required_roles: List[str]):
-    def role_checker(user_data: dict = Depends(get_current_user_data)):
-        if not any(r in user_data.get("roles", []) for r in required_roles):
+    required = frozenset(required_roles)
+    async def role_checker(user_data: Mapping = Depends(get_current_user_data)):
+        if required.isdisjoint(user_data["roles"]):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
         return user_data
     return role_checker
@@ -30,3 +36,33 @@ async def get_db() -> AsyncSession:
     async with async_session() as session:
         yield session
 
+
+
+def get_orthanc(request: Request) -> OrthancClient:
+    """The shared Orthanc client created by the app lifespan."""
+    return request.app.state.orthanc
+
+
+def get_ingest_queue(request: Request) -> IngestQueue:
+    """The background ingest queue started by the app lifespan."""
+    return request.app.state.ingest_queue
+
+
+def get_previews(request: Request) -> PreviewCache:
+    """The preview cache started by the app lifespan."""
+    return request.app.state.previews
+
+
+def get_uploads(request: Request) -> ResumableUploads:
+    """The resumable upload manager started by the app lifespan."""
+    return request.app.state.uploads
+
+
+def get_reconciler(request: Request) -> OrthancReconciler:
+    """The Orthanc change-feed reconciler started by the app lifespan."""
+    return request.app.state.reconciler
+
+
+def get_login_throttle(request: Request) -> LoginThrottle:
+    """The login throttle created by the app lifespan."""
+    return request.app.state.login_throttle
@@ -1,5 +1,5 @@
 # app/api/routers/admin.py
-from fastapi import APIRouter, Depends, HTTPException, status, Path, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Body, Query, Request
 from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -11,7 +11,17 @@ from app.db.crud.crud_pending_registration import (
     approve_pending_registration,
     delete_pending_by_id
 )
-from app.api.dependencies import get_db, check_roles
+from app.db.crud.crud_user import get_user_by_id
+from app.schemas.orthanc import OrthancOrphanRead
+from app.db.crud.crud_reconcile import list_orphans
+from app.db.models import OrphanStatusEnum, IntegrityIssueKindEnum
+from app.schemas.integrity import IntegrityIssueRead
+from app.db.crud.crud_integrity import list_integrity_issues
+from app.api.dependencies import get_db, check_roles, get_orthanc, get_reconciler
+from app.services.orthanc import OrthancClient
+from app.services.reconcile import OrthancReconciler
+from app.services.downloads import file_response, sniff_media_type
+from app.core import security
 
 router = APIRouter()
 
@@ -72,3 +82,97 @@ async def reject(
         raise HTTPException(status_code=404, detail="Pending registration not found")
     await delete_pending_by_id(db, pending_id)
     return None
+
+
+# Registration documents, kept on the user after approval
+REGISTRATION_DOCUMENTS = {
+    "research-id":                "research_id_doc",
+    "ethics-approval":            "ethics_approval_doc",
+    "confidentiality-agreement":  "confidentiality_agreement_doc",
+}
+
+async def _document_response(request: Request, owner, document: str):
+    column = REGISTRATION_DOCUMENTS.get(document)
+    if not column:
+        raise HTTPException(status_code=404, detail="Unknown document")
+    path = getattr(owner, column)
+    if not path:
+        raise HTTPException(status_code=404, detail="Document not uploaded")
+    return await file_response(request, path, media_type=await sniff_media_type(path))
+
+
+@router.get("/pending-registrations/{pending_id}/documents/{document}")
+async def download_pending_document(
+    request: Request,
+    document: str,
+    pending_id: int = Path(..., ge=1),
+    db: AsyncSession = Depends(get_db),
+    _=Depends(check_roles(["admin"]))
+):
+    pending = await get_pending_by_id(db, pending_id)
+    if not pending:
+        raise HTTPException(status_code=404, detail="Pending registration not found")
+    return await _document_response(request, pending, document)
+
+
+@router.get("/users/{user_id}/documents/{document}")
+async def download_user_document(
+    request: Request,
+    document: str,
+    user_id: int = Path(..., ge=1),
+    db: AsyncSession = Depends(get_db),
+    _=Depends(check_roles(["admin"]))
+):
+    user = await get_user_by_id(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return await _document_response(request, user, document)
+
+
+@router.get("/metrics/orthanc")
+async def orthanc_metrics(
+    orthanc: OrthancClient = Depends(get_orthanc),
+    _=Depends(check_roles(["admin"]))
+):
+    """Circuit state plus latency histograms and outcome counts per Orthanc call."""
+    return orthanc.metrics_snapshot()
+
+
+@router.get("/metrics/auth")
+async def auth_metrics(_=Depends(check_roles(["admin"]))):
+    """Hit/miss counters of the verified-token cache."""
+    return security.token_cache.stats()
+
+
+@router.get("/orthanc/orphans", response_model=List[OrthancOrphanRead])
+async def list_orthanc_orphans(
+    orphan_status: OrphanStatusEnum | None = Query(None, alias="status"),
+    db: AsyncSession = Depends(get_db),
+    _=Depends(check_roles(["admin"]))
+):
+    """Orthanc instances without a DataFile, as found by the reconciler."""
+    return await list_orphans(db, status=orphan_status)
+
+
+@router.post("/orthanc/reconcile", status_code=status.HTTP_204_NO_CONTENT)
+async def reconcile_orthanc(
+    reconciler: OrthancReconciler = Depends(get_reconciler),
+    _=Depends(check_roles(["admin"]))
+):
+    """Run one reconciliation pass now instead of waiting for the next poll."""
+    await reconciler.run_once()
+
+
+@router.get("/integrity/issues", response_model=List[IntegrityIssueRead])
+async def list_integrity_findings(
+    kind: IntegrityIssueKindEnum | None = None,
+    include_resolved: bool = False,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+    _=Depends(check_roles(["admin"]))
+):
+    """Missing or corrupted files found by the integrity scrubber, newest first."""
+    return await list_integrity_issues(
+        db, kind=kind, include_resolved=include_resolved, skip=skip, limit=limit
+    )
@@ -1,20 +1,21 @@
 # app/api/routers/auth.py
-from fastapi import APIRouter, Depends, HTTPException, status, Form, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Form, UploadFile, File, Request
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-import os
-import shutil
 from datetime import datetime, timedelta, timezone
 import pyotp
 from app.schemas.login import LoginRequest
 
 from app.schemas.user import UserMe
 from app.db.crud.crud_user import get_user_by_id
-from app.api.dependencies import get_db, get_current_user_data
+from app.api.dependencies import get_db, get_current_user_data, get_login_throttle
 
 from app.db.crud import crud_user, crud_pending_registration
 from app.api.dependencies import get_db
 from app.core import security
+from app.core.config import settings
+from app.services.login_throttle import LoginThrottle
+from app.services.storage import store_upload
 
 router = APIRouter()
 
@@ -45,21 +46,16 @@ async def register_user(
     if existing_pending and existing_pending.status == "pending":
         raise HTTPException(status_code=400, detail="Registration already pending.")
 
-    # Create uploads folder if it doesn't exist.
-    upload_folder = "uploads"
-    os.makedirs(upload_folder, exist_ok=True)
-
-    def save_file(file: UploadFile, prefix: str) -> Optional[str]:
+    # Store documents in the content-addressed blob store.
+    async def save_file(file: Optional[UploadFile]) -> Optional[str]:
         if file:
-            file_path = os.path.join(upload_folder, f"{prefix}_{file.filename}")
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            return file_path
+            stored = await store_upload(file, "document")
+            return stored.path
         return None
 
-    research_id_path = save_file(research_id_doc, "research_id")
-    ethics_approval_path = save_file(ethics_approval_doc, "ethics_approval")
-    confidentiality_agreement_path = save_file(confidentiality_agreement_doc, "confidentiality_agreement")
+    research_id_path = await save_file(research_id_doc)
+    ethics_approval_path = await save_file(ethics_approval_doc)
+    confidentiality_agreement_path = await save_file(confidentiality_agreement_doc)
 
     # Combine all registration data into a dictionary.
     registration_data = {
@@ -84,12 +80,29 @@ async def register_user(
 ###################################
 
 @router.post("/login", response_model=dict)
-async def login_user(login_req: LoginRequest, db: AsyncSession = Depends(get_db)):
+async def login_user(
+    login_req: LoginRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    throttle: LoginThrottle = Depends(get_login_throttle),
+):
+    email     = login_req.email
+    client_ip = request.client.host if request.client else None
+
+    # Throttled attempts are refused before any DB query or bcrypt work
+    await throttle.acquire(email, client_ip)
+
+    async def fail(detail: str, user=None):
+        # the lockout is written only when the threshold is crossed
+        if await throttle.failed(email, client_ip) and user is not None:
+            user.lock_until = datetime.now(timezone.utc) + timedelta(minutes=settings.LOGIN_LOCKOUT_MINUTES)
+            await db.commit()
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
 
     # Retrieve user by email
-    user = await crud_user.get_user_by_email(db, login_req.email)
+    user = await crud_user.get_user_by_email(db, email)
     if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+        await fail("Invalid credentials")
     
     now = datetime.now(timezone.utc)
     
@@ -99,13 +112,14 @@ async def login_user(login_req: LoginRequest, db: AsyncSession = Depends(get_db)
             detail=f"Account is locked until {user.lock_until.isoformat()}"
         )
     
-    if not security.verify_password(login_req.password, user.hashed_password):
-        user.failed_login_attempts += 1
-        if user.failed_login_attempts >= 5:
-            user.lock_until = now + timedelta(minutes=30)
-            user.failed_login_attempts = 0
-        await db.commit()
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    try:
+        password_ok = await security.verify_password(login_req.password, user.hashed_password)
+    except HTTPException:
+        # hashing pool saturated; not the caller's failed attempt
+        await throttle.release(email, client_ip)
+        raise
+    if not password_ok:
+        await fail("Invalid credentials", user)
     
     if not user.is_totp_verified:
         if not user.totp_secret:
@@ -113,6 +127,7 @@ async def login_user(login_req: LoginRequest, db: AsyncSession = Depends(get_db)
             await db.commit()
         totp = pyotp.TOTP(user.totp_secret)
         if not login_req.totp_code:
+            await throttle.release(email, client_ip)
             qr_url = totp.provisioning_uri(name=user.email, issuer_name="InsightPACS")
             return {
                 "totp_setup": True,
@@ -121,21 +136,20 @@ async def login_user(login_req: LoginRequest, db: AsyncSession = Depends(get_db)
             }
         else:
             if not totp.verify(login_req.totp_code):
-                user.failed_login_attempts += 1
-                await db.commit()
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid TOTP code")
+                await fail("Invalid TOTP code", user)
             user.is_totp_verified = True
     else:
         if not login_req.totp_code:
+            await throttle.release(email, client_ip)
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="TOTP code required")
         totp = pyotp.TOTP(user.totp_secret)
         if not totp.verify(login_req.totp_code):
-            user.failed_login_attempts += 1
-            await db.commit()
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid TOTP code")
+            await fail("Invalid TOTP code", user)
     
-    user.failed_login_attempts = 0
-    user.lock_until = None
+    await throttle.succeeded(email, client_ip)
+    if user.failed_login_attempts or user.lock_until:
+        user.failed_login_attempts = 0
+        user.lock_until = None
     await db.commit()
 
     token_data = {
@@ -2,20 +2,63 @@
 
 from fastapi import (
     APIRouter, Depends, HTTPException,
-    UploadFile, File, Form, status
+    UploadFile, File, Form, Header, Query, Request, status
 )
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
+from starlette.datastructures import UploadFile as StarletteUploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-import httpx, pydicom, io, os, shutil
+from datetime import datetime
+from typing import Literal
+import asyncio
 
-from app.api.dependencies import get_db, check_roles
+from app.api.dependencies import (
+    get_db, check_roles, get_current_user_data,
+    get_orthanc, get_ingest_queue, get_previews,
+)
 from app.db.crud.crud_datafile import (
-    create_datafile,
     list_datafiles,
-    get_datafile_by_orthanc_id,
+    add_datafile,
+    get_recorded_orthanc_ids,
+    get_recorded_sop_instance_uids,
+    get_visible_datafile,
+)
+from app.schemas.datafile import (
+    DataFileCreate, DataFileRead,
+    InstanceIngestResult, BatchIngestRead,
+    IngestJobRead,
+)
+from app.db.crud.crud_ingest_job import get_ingest_job, list_ingest_jobs
+from app.db.models import (
+    FileTypeEnum, IngestJobStatusEnum,
+    ModalityEnum, AccessLevelEnum, BodyAreaEnum,
+)
+from app.core.config import settings
+from app.services.ingest import (
+    read_upload_header, forward_instance, ingest_file, instance_columns,
+    recorded_sop_uid, ForwardedInstance,
 )
-from app.schemas.datafile import DataFileCreate, DataFileRead
-from app.db.models import FileTypeEnum
+from app.db.crud.crud_deid import record_uid_mappings
+from app.services.dicom import extract_header_fields
+from app.db.crud.crud_study import get_or_create_series
+from app.services.orthanc import OrthancClient
+from app.services.ingest_queue import IngestQueue
+from app.services.wado import instance_response
+from app.services.previews import PreviewCache
+from app.services.downloads import file_response
+from app.services.batch_form import batch_form
+from app.services.upload_writer import check_declared_size
+from app.services.export import export_datafiles, MEDIA_TYPES as EXPORT_MEDIA_TYPES
+
+FILES_MAX_LIMIT = 1000
+
+# Media types for locally stored (non-DICOM) file types
+MEDIA_TYPES = {
+    FileTypeEnum.PDF: "application/pdf",
+    FileTypeEnum.JPG: "image/jpeg",
+}
 
 router = APIRouter(
     prefix="/files",
@@ -23,21 +66,87 @@ router = APIRouter(
     dependencies=[Depends(check_roles(["admin", "researcher"]))],
 )
 
-ORTHANC_URL  = "http://localhost:8042/instances"
-ORTHANC_AUTH = ("orthanc", "orthanc")
 
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+@router.get("", response_model=list[DataFileRead])
+async def get_all_files(
+    request:       Request,
+    response:      Response,
+    project_id:    int | None             = None,
+    patient_id:    int | None             = None,
+    modality:      ModalityEnum | None    = None,
+    access_level:  AccessLevelEnum | None = None,
+    body_area:     BodyAreaEnum | None    = None,
+    file_type:     FileTypeEnum | None    = None,
+    uploaded_from: datetime | None        = None,
+    uploaded_to:   datetime | None        = None,
+    cursor:        str | None             = None,
+    limit:         int                    = Query(100, ge=1, le=FILES_MAX_LIMIT),
+    db:            AsyncSession           = Depends(get_db),
+):
+    """
+    List file metadata, newest first, one page at a time. When more rows
+    remain, the next page's cursor is returned in X-Next-Cursor and as a
+    Link rel="next" header.
+    """
+    files, next_cursor = await list_datafiles(
+        db,
+        filters=dict(
+            project_id=project_id,
+            patient_id=patient_id,
+            modality=modality,
+            access_level=access_level,
+            body_area=body_area,
+            file_type=file_type,
+        ),
+        uploaded_from=uploaded_from,
+        uploaded_to=uploaded_to,
+        cursor=cursor,
+        limit=limit,
+    )
+    if next_cursor:
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return files
 
 
-@router.get("", response_model=list[DataFileRead])
-async def get_all_files(db: AsyncSession = Depends(get_db)):
-    """List all file‐metadata entries."""
-    return await list_datafiles(db)
+@router.get("/export")
+async def export_files(
+    fmt:           Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    project_id:    int | None             = None,
+    patient_id:    int | None             = None,
+    modality:      ModalityEnum | None    = None,
+    access_level:  AccessLevelEnum | None = None,
+    body_area:     BodyAreaEnum | None    = None,
+    file_type:     FileTypeEnum | None    = None,
+    uploaded_from: datetime | None        = None,
+    uploaded_to:   datetime | None        = None,
+):
+    """
+    Stream the whole (filtered) file catalogue as NDJSON or CSV, oldest
+    first. Takes the same filters as GET /files, without pagination.
+    """
+    chunks = export_datafiles(
+        fmt,
+        filters=dict(
+            project_id=project_id,
+            patient_id=patient_id,
+            modality=modality,
+            access_level=access_level,
+            body_area=body_area,
+            file_type=file_type,
+        ),
+        uploaded_from=uploaded_from,
+        uploaded_to=uploaded_to,
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="datafiles.{fmt}"'},
+    )
 
 
-@router.post("", response_model=DataFileRead, status_code=status.HTTP_201_CREATED)
-async def upload_file(
+def datafile_form(
     data_name:         str            = Form(...),
     project_id:        int            = Form(...),
     patient_id:        int            = Form(...),
@@ -47,17 +156,9 @@ async def upload_file(
     body_area:         str | None     = Form(None),
     related_report_id: int | None     = Form(None),
     comments:          str | None     = Form(None),
-    upload:            UploadFile     = File(...),
-    db:                AsyncSession   = Depends(get_db),
-):
-    """
-    Dispatch based on file_type:
-      - DICOM → validate + forward to Orthanc, guard against duplicates
-      - else  → save locally
-    """
-
-    # Build our Pydantic‐validated input
-    df_in = DataFileCreate(
+) -> DataFileCreate:
+    """Build our Pydantic‐validated input from the upload form fields."""
+    return DataFileCreate(
       data_name=data_name,
       project_id=project_id,
       patient_id=patient_id,
@@ -69,86 +170,298 @@ async def upload_file(
       file_type=file_type,
     )
 
-    # Read the entire upload into memory once
-    contents = await upload.read()
 
-    if file_type is FileTypeEnum.DICOM:
-        # ─── 1) Validate as DICOM ────────────────────────────────────────────
+@router.post("", response_model=DataFileRead, status_code=status.HTTP_201_CREATED)
+async def upload_file(
+    df_in:   DataFileCreate = Depends(datafile_form),
+    upload:   UploadFile     = File(...),
+    db:       AsyncSession   = Depends(get_db),
+    orthanc:  OrthancClient  = Depends(get_orthanc),
+    previews: PreviewCache   = Depends(get_previews),
+):
+    """
+    Dispatch based on file_type:
+      - DICOM → validate + forward to Orthanc, guard against duplicates
+      - else  → save locally
+    """
+    df = await ingest_file(db, orthanc, df_in, upload)
+    previews.schedule(df)
+    return df
+
+
+@router.post("/jobs", response_model=IngestJobRead, status_code=status.HTTP_202_ACCEPTED)
+async def submit_ingest_job(
+    df_in:     DataFileCreate = Depends(datafile_form),
+    upload:    UploadFile     = File(...),
+    db:        AsyncSession   = Depends(get_db),
+    queue:     IngestQueue    = Depends(get_ingest_queue),
+    user_data: dict           = Depends(get_current_user_data),
+):
+    """
+    Same form as POST /files, but the upload is only spooled and queued.
+    Returns 202 with the job; poll GET /files/jobs/{id} for the outcome.
+    """
+    return await queue.submit(db, df_in, upload, user_data.get("user_id"))
+
+
+@router.get("/jobs", response_model=list[IngestJobRead])
+async def get_ingest_jobs(
+    project_id: int | None                 = None,
+    job_status: IngestJobStatusEnum | None = Query(None, alias="status"),
+    db:         AsyncSession               = Depends(get_db),
+    user_data:  dict                       = Depends(get_current_user_data),
+):
+    """
+    List ingest jobs, newest first, optionally per project or status.
+    Admins see every job, everyone else only the jobs they submitted.
+    """
+    return await list_ingest_jobs(
+        db,
+        project_id=project_id,
+        status=job_status,
+        submitted_by_user_id=None if "admin" in user_data["roles"] else user_data.get("user_id"),
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=IngestJobRead)
+async def get_ingest_job_status(
+    job_id:    int,
+    db:        AsyncSession = Depends(get_db),
+    user_data: dict         = Depends(get_current_user_data),
+):
+    job = await get_ingest_job(db, job_id)
+    if not job or (
+        "admin" not in user_data["roles"] and job.submitted_by_user_id != user_data.get("user_id")
+    ):
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return job
+
+
+@router.post("/batch", response_model=BatchIngestRead)
+async def upload_study(
+    request:  Request,
+    db:       AsyncSession  = Depends(get_db),
+    orthanc:  OrthancClient = Depends(get_orthanc),
+    previews: PreviewCache  = Depends(get_previews),
+):
+    """
+    Ingest a whole study in one multipart request: the same metadata fields
+    as POST /files plus any number of `uploads` parts, each a DICOM instance.
+    Instances are forwarded to Orthanc concurrently (BATCH_INGEST_CONCURRENCY)
+    and recorded BATCH_COMMIT_SIZE at a time, each in its own savepoint, so
+    every instance gets its own result.
+    """
+    async with batch_form(request, FileTypeEnum.DICOM.value, settings.BATCH_MAX_FILES) as batch:
+        form = batch.form
         try:
-            pydicom.dcmread(io.BytesIO(contents))
-        except Exception:
+            df_in = DataFileCreate(
+                data_name=form.get("data_name"),
+                project_id=form.get("project_id"),
+                patient_id=form.get("patient_id"),
+                modality=form.get("modality"),
+                access_level=form.get("access_level"),
+                body_area=form.get("body_area") or None,
+                related_report_id=form.get("related_report_id") or None,
+                comments=form.get("comments") or None,
+                file_type=FileTypeEnum.DICOM,
+            )
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+
+        uploads = [u for u in form.getlist("uploads") if isinstance(u, StarletteUploadFile)]
+        if not uploads:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Not a valid DICOM file"
+                detail="No DICOM instances in request"
             )
 
-        # ─── 2) Send to Orthanc ─────────────────────────────────────────────
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                ORTHANC_URL,
-                content=contents,
-                auth=ORTHANC_AUTH,
-                headers={"Content-Type": "application/dicom"},
-                timeout=30.0,
-            )
+        semaphore = asyncio.Semaphore(settings.BATCH_INGEST_CONCURRENCY)
+        results: list[InstanceIngestResult | None] = [None] * len(uploads)
 
-        # Catch an Orthanc‐side conflict
-        if resp.status_code == status.HTTP_409_CONFLICT:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="This DICOM instance already exists in Orthanc"
-            )
-        if resp.status_code != status.HTTP_200_OK:
-            detail = await resp.text()
-            raise HTTPException(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                detail=f"Orthanc error {resp.status_code}: {detail}"
+        def reject(i: int, e: HTTPException) -> None:
+            results[i] = InstanceIngestResult(
+                filename=uploads[i].filename,
+                status_code=e.status_code,
+                detail=e.detail,
             )
 
-        orthanc_id = resp.json().get("ID")
-        if not orthanc_id:
-            raise HTTPException(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                detail="Orthanc did not return an instance ID"
-            )
+        # ─── 1) Check sizes, parse every header (bounded by the parse pool) ─
+        async def parse(i: int) -> dict:
+            try:
+                check_declared_size(batch.received_size(uploads[i]), FileTypeEnum.DICOM.value)
+                return extract_header_fields(await read_upload_header(uploads[i]))
+            except HTTPException as e:
+                reject(i, e)
+                return {}
 
-        # ─── 3) App-level guard against duplicate orthanc_id in our DB ──────
-        existing = await get_datafile_by_orthanc_id(db, orthanc_id)
-        if existing:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="This DICOM instance has already been recorded locally"
-            )
+        fields   = await asyncio.gather(*(parse(i) for i in range(len(uploads))))
+        sop_uids = [recorded_sop_uid(df_in, f) for f in fields]
+
+        # ─── 2) Drop instances already recorded (or repeated in this batch) ─
+        recorded = await get_recorded_sop_instance_uids(db, [u for u in sop_uids if u])
+        pending  = []
+        for i, sop_uid in enumerate(sop_uids):
+            if results[i] is not None:
+                continue
+            if sop_uid and sop_uid in recorded:
+                reject(i, HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="This DICOM instance has already been recorded locally",
+                ))
+                continue
+            if sop_uid:
+                recorded.add(sop_uid)
+            pending.append(i)
+
+        # ─── 3) De-identify/transcode and forward with bounded concurrency ──
+        forwarded: dict[int, ForwardedInstance] = {}
 
-        # ─── 4) Persist to our DB, translating any race-condition errors ────
+        async def forward(i: int) -> None:
+            async with semaphore:
+                try:
+                    forwarded[i] = await forward_instance(uploads[i], df_in, orthanc, fields[i])
+                except HTTPException as e:
+                    reject(i, e)
+
+        await asyncio.gather(*(forward(i) for i in pending))
+
+    # ─── 4) Record each instance in a savepoint, committing in chunks ───────
+    known = await get_recorded_orthanc_ids(db, [f.orthanc_id for f in forwarded.values()])
+    series_by_uid = {}
+    created = {}
+    for n, i in enumerate(sorted(forwarded), 1):
+        instance = forwarded[i]
+        # orthanc_ids recorded without a SOPInstanceUID
+        if instance.orthanc_id in known:
+            reject(i, HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="This DICOM instance has already been recorded locally",
+            ))
+            continue
+        known.add(instance.orthanc_id)
         try:
-            df = await create_datafile(
-                db,
-                df_in,
-                orthanc_id=orthanc_id,
-                storage_path=None
-            )
+            async with db.begin_nested():
+                series_uid = instance.fields.get("series_instance_uid")
+                if series_uid not in series_by_uid:
+                    series_by_uid[series_uid] = await get_or_create_series(
+                        db,
+                        instance.fields,
+                        project_id=df_in.project_id,
+                        patient_id=df_in.patient_id,
+                    )
+                await record_uid_mappings(db, df_in.project_id, instance.uid_map)
+                created[i] = await add_datafile(
+                    db,
+                    df_in,
+                    orthanc_id=instance.orthanc_id,
+                    content_hash=instance.content_hash,
+                    **instance.columns,
+                    **instance_columns(instance.fields, series_by_uid[series_uid]),
+                )
         except IntegrityError:
-            # in case a race slipped through
-            raise HTTPException(
+            series_by_uid.pop(series_uid, None)
+            reject(i, HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Duplicate datafile record"
-            )
+            ))
+        if n % settings.BATCH_COMMIT_SIZE == 0:
+            await db.commit()
+    await db.commit()
 
-        return df
+    for i, df in created.items():
+        previews.schedule(df)
+        results[i] = InstanceIngestResult(
+            filename=uploads[i].filename,
+            status_code=status.HTTP_201_CREATED,
+            datafile=DataFileRead.model_validate(df),
+        )
 
-    # ─── Generic file (PDF, JPG, etc.) ────────────────────────────────────
-    safe_name = data_name.replace(" ", "_")
-    filename  = f"{file_type.value}_{safe_name}_{upload.filename}"
-    path      = os.path.join(UPLOAD_DIR, filename)
-    with open(path, "wb") as buf:
-        shutil.copyfileobj(upload.file, buf)
+    accepted = sum(r.status_code == status.HTTP_201_CREATED for r in results)
+    return BatchIngestRead(
+        accepted=accepted,
+        rejected=len(results) - accepted,
+        results=results,
+    )
 
-    # No Orthanc step—just record `storage_path`
-    df = await create_datafile(
-        db,
-        df_in,
-        orthanc_id=None,
-        storage_path=path
+
+@router.get("/{datafile_id}/dicom")
+async def download_dicom(
+    datafile_id: int,
+    range_header: str | None = Header(None, alias="Range"),
+    accept:       str | None = Header(None),
+    db:        AsyncSession  = Depends(get_db),
+    orthanc:   OrthancClient = Depends(get_orthanc),
+    user_data: dict          = Depends(get_current_user_data),
+):
+    """
+    Stream the DICOM instance behind a DataFile from Orthanc as
+    application/dicom, honouring a single-range Range header. An Accept
+    transfer-syntax that only allows uncompressed data has Orthanc
+    decompress the instance.
+    """
+    df = await get_visible_datafile(db, datafile_id, user_data)
+    if not df or not df.orthanc_id:
+        raise HTTPException(status_code=404, detail="DICOM file not found")
+    return await instance_response(
+        orthanc, df.orthanc_id, range_header, df.stored_transfer_syntax, accept
+    )
+
+
+@router.get("/{datafile_id}/download")
+async def download_file(
+    datafile_id: int,
+    request:   Request,
+    db:        AsyncSession  = Depends(get_db),
+    orthanc:   OrthancClient = Depends(get_orthanc),
+    user_data: dict          = Depends(get_current_user_data),
+):
+    """
+    The stored bytes of a file. Local files are served with Range,
+    ETag/If-None-Match and Last-Modified; DICOM is proxied from Orthanc.
+    """
+    df = await get_visible_datafile(db, datafile_id, user_data)
+    if not df:
+        raise HTTPException(status_code=404, detail="File not found")
+    if df.orthanc_id:
+        return await instance_response(
+            orthanc, df.orthanc_id, request.headers.get("range"), df.stored_transfer_syntax
+        )
+    if not df.storage_path:
+        raise HTTPException(status_code=404, detail="File not found")
+    return await file_response(
+        request,
+        df.storage_path,
+        etag_key=df.content_hash,
+        media_type=MEDIA_TYPES.get(df.file_type, "application/octet-stream"),
+        filename=f"{df.data_name}.{df.file_type.value}",
+    )
+
+
+@router.get("/{datafile_id}/preview")
+async def get_preview(
+    datafile_id: int,
+    request:   Request,
+    db:        AsyncSession = Depends(get_db),
+    previews:  PreviewCache = Depends(get_previews),
+    user_data: dict         = Depends(get_current_user_data),
+):
+    """
+    Downsampled, windowed preview image of a DICOM or JPG file. Served from
+    the preview cache (rendered on a miss) with ETag/Cache-Control.
+    """
+    df = await get_visible_datafile(db, datafile_id, user_data)
+    if not df:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not previews.supports(df):
+        raise HTTPException(status_code=404, detail="No preview for this file type")
+
+    try:
+        path = await previews.get(df)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=404, detail="Preview not available")
+
+    return await file_response(
+        request, path, media_type=previews.media_type, cache_control="private, max-age=86400"
     )
-    return df
@@ -0,0 +1,193 @@
+# app/api/routers/dicomweb.py
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.dependencies import get_db, check_roles, get_orthanc
+from app.db.crud.crud_datafile import datafile_access_clause
+from app.db.crud.crud_study import (
+    search_studies, search_series, search_instances, get_study_modalities,
+    list_visible_instances,
+)
+from app.db.models import DataFile, DicomStudy, DicomSeries
+from app.services.dicomweb import (
+    STUDY_ATTRIBUTES, SERIES_ATTRIBUTES, INSTANCE_ATTRIBUTES,
+    build_conditions, to_dicom_json,
+)
+from app.services.orthanc import OrthancClient
+from app.services.wado import multipart_response
+
+router = APIRouter(prefix="/dicomweb", tags=["dicomweb"])
+
+DICOM_JSON = "application/dicom+json"
+QIDO_MAX_LIMIT = 1000
+
+
+def _dicom_json_response(objects: list[dict]) -> JSONResponse:
+    return JSONResponse(content=objects, media_type=DICOM_JSON)
+
+
+# ── QIDO-RS: studies ────────────────────────────────────────
+@router.get("/studies")
+async def qido_studies(
+    request: Request,
+    limit:   int = Query(100, ge=1, le=QIDO_MAX_LIMIT),
+    offset:  int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+    user_data: dict = Depends(check_roles(["admin", "researcher", "viewer"])),
+):
+    """
+    Search studies in the local index. Supports StudyInstanceUID, StudyDate
+    (single date or range), StudyTime, AccessionNumber, PatientName,
+    PatientID, ModalitiesInStudy and StudyDescription matching, plus
+    limit/offset/includefield. Only studies with visible instances match.
+    """
+    conditions, attributes = build_conditions(STUDY_ATTRIBUTES, request.query_params)
+    rows = await search_studies(
+        db, datafile_access_clause(user_data), conditions, limit=limit, offset=offset,
+    )
+    modalities = await get_study_modalities(db, [study.id for study, _, _ in rows])
+    return _dicom_json_response([
+        to_dicom_json({
+            "study": study,
+            "n_series": n_series,
+            "n_instances": n_instances,
+            "modalities": modalities.get(study.id, []),
+        }, attributes)
+        for study, n_series, n_instances in rows
+    ])
+
+
+# ── QIDO-RS: series ─────────────────────────────────────────
+async def _series(request, db, user_data, limit, offset, *scope):
+    conditions, attributes = build_conditions(SERIES_ATTRIBUTES, request.query_params)
+    rows = await search_series(
+        db, datafile_access_clause(user_data), [*scope, *conditions], limit=limit, offset=offset,
+    )
+    return _dicom_json_response([
+        to_dicom_json({"series": series, "study": study, "n_instances": n}, attributes)
+        for series, study, n in rows
+    ])
+
+@router.get("/series")
+async def qido_all_series(
+    request: Request,
+    limit:   int = Query(100, ge=1, le=QIDO_MAX_LIMIT),
+    offset:  int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+    user_data: dict = Depends(check_roles(["admin", "researcher", "viewer"])),
+):
+    return await _series(request, db, user_data, limit, offset)
+
+@router.get("/studies/{study_instance_uid}/series")
+async def qido_study_series(
+    study_instance_uid: str,
+    request: Request,
+    limit:   int = Query(100, ge=1, le=QIDO_MAX_LIMIT),
+    offset:  int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+    user_data: dict = Depends(check_roles(["admin", "researcher", "viewer"])),
+):
+    return await _series(
+        request, db, user_data, limit, offset,
+        DicomStudy.study_instance_uid == study_instance_uid,
+    )
+
+
+# ── QIDO-RS: instances ──────────────────────────────────────
+async def _instances(request, db, user_data, limit, offset, *scope):
+    conditions, attributes = build_conditions(INSTANCE_ATTRIBUTES, request.query_params)
+    rows = await search_instances(
+        db, datafile_access_clause(user_data), [*scope, *conditions], limit=limit, offset=offset,
+    )
+    return _dicom_json_response([
+        to_dicom_json({"instance": df, "series": series, "study": study}, attributes)
+        for df, series, study in rows
+    ])
+
+@router.get("/series/{series_instance_uid}/instances")
+async def qido_series_instances(
+    series_instance_uid: str,
+    request: Request,
+    limit:   int = Query(100, ge=1, le=QIDO_MAX_LIMIT),
+    offset:  int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+    user_data: dict = Depends(check_roles(["admin", "researcher", "viewer"])),
+):
+    return await _instances(
+        request, db, user_data, limit, offset,
+        DicomSeries.series_instance_uid == series_instance_uid,
+    )
+
+@router.get("/studies/{study_instance_uid}/series/{series_instance_uid}/instances")
+async def qido_study_series_instances(
+    study_instance_uid: str,
+    series_instance_uid: str,
+    request: Request,
+    limit:   int = Query(100, ge=1, le=QIDO_MAX_LIMIT),
+    offset:  int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+    user_data: dict = Depends(check_roles(["admin", "researcher", "viewer"])),
+):
+    return await _instances(
+        request, db, user_data, limit, offset,
+        DicomStudy.study_instance_uid == study_instance_uid,
+        DicomSeries.series_instance_uid == series_instance_uid,
+    )
+
+
+# ── WADO-RS: retrieve (streamed from Orthanc) ───────────────
+async def _retrieve(db, orthanc, user_data, accept, *scope):
+    instances = await list_visible_instances(db, datafile_access_clause(user_data), list(scope))
+    if not instances:
+        raise HTTPException(status_code=404, detail="No matching instances")
+    return await multipart_response(orthanc, instances, accept)
+
+@router.get("/studies/{study_instance_uid}")
+async def wado_study(
+    study_instance_uid: str,
+    db: AsyncSession = Depends(get_db),
+    accept: str | None = Header(None),
+    orthanc: OrthancClient = Depends(get_orthanc),
+    user_data: dict = Depends(check_roles(["admin", "researcher", "viewer"])),
+):
+    """
+    Retrieve every visible instance of a study as multipart/related. A
+    transfer-syntax in Accept selects stored or uncompressed instances.
+    """
+    return await _retrieve(
+        db, orthanc, user_data, accept,
+        DicomStudy.study_instance_uid == study_instance_uid,
+    )
+
+@router.get("/studies/{study_instance_uid}/series/{series_instance_uid}")
+async def wado_series(
+    study_instance_uid: str,
+    series_instance_uid: str,
+    db: AsyncSession = Depends(get_db),
+    accept: str | None = Header(None),
+    orthanc: OrthancClient = Depends(get_orthanc),
+    user_data: dict = Depends(check_roles(["admin", "researcher", "viewer"])),
+):
+    return await _retrieve(
+        db, orthanc, user_data, accept,
+        DicomStudy.study_instance_uid == study_instance_uid,
+        DicomSeries.series_instance_uid == series_instance_uid,
+    )
+
+@router.get("/studies/{study_instance_uid}/series/{series_instance_uid}/instances/{sop_instance_uid}")
+async def wado_instance(
+    study_instance_uid: str,
+    series_instance_uid: str,
+    sop_instance_uid: str,
+    db: AsyncSession = Depends(get_db),
+    accept: str | None = Header(None),
+    orthanc: OrthancClient = Depends(get_orthanc),
+    user_data: dict = Depends(check_roles(["admin", "researcher", "viewer"])),
+):
+    return await _retrieve(
+        db, orthanc, user_data, accept,
+        DicomStudy.study_instance_uid == study_instance_uid,
+        DicomSeries.series_instance_uid == series_instance_uid,
+        DataFile.sop_instance_uid == sop_instance_uid,
+    )
@@ -1,8 +1,7 @@
 # app/api/routers/patients.py
-import os, shutil
 from fastapi import (
     APIRouter, Depends, HTTPException, status,
-    UploadFile, File, Form
+    UploadFile, File, Form, Request
 )
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
@@ -18,27 +17,17 @@ from app.db.crud.crud_patient import (
 from app.api.dependencies import (
     get_db, get_current_user_data, check_roles,
 )
+from app.services.storage import store_upload
+from app.services.downloads import file_response, sniff_media_type
 
 router = APIRouter(prefix="/patients", tags=["patients"])
 
-# ensure upload dir exists
-PATIENT_UPLOAD_DIR = "uploads/patients"
-os.makedirs(PATIENT_UPLOAD_DIR, exist_ok=True)
-
-def save_patient_file(
-    file: UploadFile,
-    first_name: str,
-    last_name: str,
-    suffix: str
-) -> Optional[str]:
+async def save_patient_file(file: Optional[UploadFile]) -> Optional[str]:
+    """Store a patient document in the blob store; returns its path."""
     if not file:
         return None
-    ext = os.path.splitext(file.filename)[1] or ".pdf"
-    filename = f"{first_name}_{last_name}_{suffix}{ext}"
-    path = os.path.join(PATIENT_UPLOAD_DIR, filename)
-    with open(path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    return path
+    stored = await store_upload(file, "document")
+    return stored.path
 
 # ── LIST ────────────────────────────────────────────────────
 @router.get("", response_model=List[PatientRead])
@@ -71,9 +60,9 @@ async def register_patient(
     db: AsyncSession = Depends(get_db),
     user_data=Depends(get_current_user_data),
 ):
-    # save files with <first>_<last>_consent.pdf and _related.pdf
-    consent_path = save_patient_file(informed_consent_doc, first_name, last_name, "consent")
-    related_path = save_patient_file(related_reports_doc,    first_name, last_name, "related")
+    # documents go to the content-addressed blob store
+    consent_path = await save_patient_file(informed_consent_doc)
+    related_path = await save_patient_file(related_reports_doc)
 
     create_data = PatientCreate(
         first_name=first_name,
@@ -120,3 +109,29 @@ async def read_patient(
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     return PatientRead.from_orm(patient).model_dump()
+
+# ── DOCUMENTS ───────────────────────────────────────────────
+PATIENT_DOCUMENTS = {
+    "informed-consent": "informed_consent_doc",
+    "related-reports":  "related_reports_doc",
+}
+
+@router.get("/{patient_id}/documents/{document}")
+async def download_patient_document(
+    patient_id: int,
+    document: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    _ = Depends(check_roles(["admin", "researcher", "viewer"]))
+):
+    """Download a patient document (informed-consent or related-reports)."""
+    column = PATIENT_DOCUMENTS.get(document)
+    if not column:
+        raise HTTPException(status_code=404, detail="Unknown document")
+    patient = await get_patient_by_id(db, patient_id)
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    path = getattr(patient, column)
+    if not path:
+        raise HTTPException(status_code=404, detail="Document not uploaded")
+    return await file_response(request, path, media_type=await sniff_media_type(path))
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
@@ -13,7 +14,10 @@ from app.db.crud.crud_project import (
     update_project,
 )
 from app.db.crud.crud_user import get_all_users
-from app.api.dependencies import get_db, check_roles
+from app.db.crud.crud_datafile import list_project_export_rows
+from app.api.dependencies import get_db, check_roles, get_orthanc
+from app.services.orthanc import OrthancClient
+from app.services.zip_export import stream_zip
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
@@ -84,3 +88,26 @@ async def edit_project(
 async def list_project_users(db: AsyncSession = Depends(get_db)):
     users = await get_all_users(db)
     return [UserSummary.from_orm(u).model_dump() for u in users]
+
+
+# ── Export a project's files as a ZIP ───────────────────────
+@router.get("/{project_id}/export")
+async def export_project(
+    project_id: int,
+    db: AsyncSession = Depends(get_db),
+    orthanc: OrthancClient = Depends(get_orthanc),
+    user_data: dict = Depends(check_roles(["admin", "researcher"]))
+):
+    """
+    Stream every file of the project the caller may see as one ZIP,
+    built on the fly; DICOM instances are pulled from Orthanc.
+    """
+    project = await get_project_by_id(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    rows = await list_project_export_rows(db, project_id, user_data)
+    return StreamingResponse(
+        stream_zip(orthanc, rows),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="project-{project_id}.zip"'},
+    )
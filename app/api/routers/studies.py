@@ -0,0 +1,79 @@
+# app/api/routers/studies.py
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from app.api.dependencies import get_db, check_roles
+from app.db.crud.crud_datafile import datafile_access_clause
+from app.db.crud.crud_study import get_study_by_uid, list_studies, list_series_for_study
+from app.schemas.study import StudyRead, SeriesRead
+
+router = APIRouter(prefix="/studies", tags=["studies"])
+
+
+def _serialize_study(study, n_series: int, n_instances: int) -> dict:
+    """
+    Convert a DicomStudy ORM instance plus its counts into a StudyRead dict.
+    """
+    return StudyRead.model_validate({
+        "id": study.id,
+        "study_instance_uid": study.study_instance_uid,
+        "project_id": study.project_id,
+        "patient_id": study.patient_id,
+        "study_date": study.study_date,
+        "study_time": study.study_time,
+        "study_description": study.study_description,
+        "accession_number": study.accession_number,
+        "dicom_patient_id": study.dicom_patient_id,
+        "dicom_patient_name": study.dicom_patient_name,
+        "number_of_series": n_series,
+        "number_of_instances": n_instances,
+        "created_at": study.created_at,
+    }).model_dump()
+
+
+def _serialize_series(series, n_instances: int) -> dict:
+    return SeriesRead.model_validate({
+        "id": series.id,
+        "series_instance_uid": series.series_instance_uid,
+        "study_id": series.study_id,
+        "modality": series.modality,
+        "series_number": series.series_number,
+        "series_description": series.series_description,
+        "body_part_examined": series.body_part_examined,
+        "number_of_instances": n_instances,
+        "created_at": series.created_at,
+    }).model_dump()
+
+
+# ── List studies ────────────────────────────────────────────
+@router.get("", response_model=List[StudyRead])
+async def get_studies(
+    project_id: int | None = None,
+    patient_id: int | None = None,
+    db: AsyncSession = Depends(get_db),
+    user_data: dict = Depends(check_roles(["admin", "researcher"])),
+):
+    """
+    List studies from the local index that contain at least one file the
+    caller may see, with series/instance counts over those files.
+    """
+    rows = await list_studies(
+        db, datafile_access_clause(user_data), project_id=project_id, patient_id=patient_id,
+    )
+    return [_serialize_study(*row) for row in rows]
+
+
+# ── List series of a study ──────────────────────────────────
+@router.get("/{study_instance_uid}/series", response_model=List[SeriesRead])
+async def get_study_series(
+    study_instance_uid: str,
+    db: AsyncSession = Depends(get_db),
+    user_data: dict = Depends(check_roles(["admin", "researcher"])),
+):
+    access = datafile_access_clause(user_data)
+    study = await get_study_by_uid(db, study_instance_uid, access)
+    if not study:
+        raise HTTPException(status_code=404, detail="Study not found")
+    rows = await list_series_for_study(db, access, study.id)
+    return [_serialize_series(*row) for row in rows]
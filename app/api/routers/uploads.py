@@ -0,0 +1,111 @@
+# app/api/routers/uploads.py
+
+from fastapi import APIRouter, Depends, Form, Header, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.dependencies import get_db, check_roles, get_current_user_data, get_uploads
+from app.api.routers.datafiles import datafile_form
+from app.schemas.datafile import DataFileCreate, DataFileRead, UploadSessionRead
+from app.services.resumable import ResumableUploads
+
+OFFSET_CONTENT_TYPE = "application/offset+octet-stream"
+
+router = APIRouter(
+    prefix="/files/uploads",
+    tags=["files"],
+    dependencies=[Depends(check_roles(["admin", "researcher"]))],
+)
+
+
+def _progress_headers(response: Response, offset: int, length: int) -> None:
+    response.headers["Upload-Offset"] = str(offset)
+    response.headers["Upload-Length"] = str(length)
+    response.headers["Cache-Control"] = "no-store"
+
+
+@router.post("", response_model=UploadSessionRead, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    response:      Response,
+    df_in:         DataFileCreate   = Depends(datafile_form),
+    filename:      str | None       = Form(None),
+    upload_length: int              = Header(..., alias="Upload-Length", ge=0),
+    db:            AsyncSession     = Depends(get_db),
+    uploads:       ResumableUploads = Depends(get_uploads),
+    user_data:     dict             = Depends(get_current_user_data),
+):
+    """
+    Open a resumable upload with the same form fields as POST /files and
+    the total size in Upload-Length. Send the bytes with PATCH, then
+    POST /files/uploads/{id}/finalize.
+    """
+    session = await uploads.create(
+        db,
+        df_in,
+        upload_length=upload_length,
+        filename=filename,
+        owner_user_id=user_data.get("user_id"),
+    )
+    response.headers["Location"] = f"{router.prefix}/{session.id}"
+    _progress_headers(response, session.upload_offset, session.upload_length)
+    return session
+
+
+@router.head("/{session_id}")
+async def get_upload_offset(
+    session_id: str,
+    db:         AsyncSession     = Depends(get_db),
+    uploads:    ResumableUploads = Depends(get_uploads),
+    user_data:  dict             = Depends(get_current_user_data),
+):
+    """Where to resume: the number of bytes received so far."""
+    session  = await uploads.get(db, session_id, user_data.get("user_id"))
+    response = Response(status_code=status.HTTP_200_OK)
+    _progress_headers(response, session.upload_offset, session.upload_length)
+    return response
+
+
+@router.patch("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def append_upload_chunk(
+    session_id:    str,
+    request:       Request,
+    upload_offset: int              = Header(..., alias="Upload-Offset", ge=0),
+    content_type:  str | None       = Header(None),
+    db:            AsyncSession     = Depends(get_db),
+    uploads:       ResumableUploads = Depends(get_uploads),
+    user_data:     dict             = Depends(get_current_user_data),
+):
+    """Append the raw request body at Upload-Offset, which must match the server's offset."""
+    if content_type != OFFSET_CONTENT_TYPE:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type must be {OFFSET_CONTENT_TYPE}",
+        )
+    session = await uploads.get(db, session_id, user_data.get("user_id"))
+    offset  = await uploads.append(db, session, upload_offset, request.stream())
+    response = Response(status_code=status.HTTP_204_NO_CONTENT)
+    _progress_headers(response, offset, session.upload_length)
+    return response
+
+
+@router.post("/{session_id}/finalize", response_model=DataFileRead, status_code=status.HTTP_201_CREATED)
+async def finalize_upload(
+    session_id: str,
+    db:         AsyncSession     = Depends(get_db),
+    uploads:    ResumableUploads = Depends(get_uploads),
+    user_data:  dict             = Depends(get_current_user_data),
+):
+    """Ingest a complete upload exactly as POST /files would."""
+    session = await uploads.get(db, session_id, user_data.get("user_id"))
+    return await uploads.finalize(db, session)
+
+
+@router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(
+    session_id: str,
+    db:         AsyncSession     = Depends(get_db),
+    uploads:    ResumableUploads = Depends(get_uploads),
+    user_data:  dict             = Depends(get_current_user_data),
+):
+    """Abandon an upload and delete its partial bytes."""
+    session = await uploads.get(db, session_id, user_data.get("user_id"))
+    await uploads.abort(db, session)
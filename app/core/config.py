@@ -1,14 +1,161 @@
 # app/core/config.py
 from pydantic_settings import BaseSettings
 
+# Placeholder salt; de-identification refuses to start with it
+DEFAULT_DEIDENTIFY_SALT = "change-me"
+
 class Settings(BaseSettings):
     DATABASE_URL: str
     JWT_SECRET_KEY: str = "your_secret"  # Used later for JWT
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # Login throttling: token buckets per email and per client IP (burst size,
+    # then one attempt regained every N seconds). An empty email bucket also
+    # writes a lockout to the user row. Set a Redis URL to share the buckets
+    # between workers (requires the redis package)
+    LOGIN_EMAIL_BURST: int = 5
+    LOGIN_EMAIL_REFILL_SECONDS: float = 360.0
+    LOGIN_IP_BURST: int = 30
+    LOGIN_IP_REFILL_SECONDS: float = 10.0
+    LOGIN_LOCKOUT_MINUTES: int = 30
+    LOGIN_THROTTLE_MAX_KEYS: int = 100_000
+    LOGIN_THROTTLE_REDIS_URL: str | None = None
+    # Verified-token claims kept in memory (LRU), so repeat requests skip jwt.decode
+    TOKEN_CACHE_SIZE: int = 10_000
+    # bcrypt hashing pool: worker threads (about one per core to spare) and
+    # how many more calls may wait before requests are refused with 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE: int = 32
+
+    # Uploads are read and forwarded in fixed-size chunks
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    # Local upload writes: thread pool size, durability and per-type byte limits
+    UPLOAD_WRITE_WORKERS: int = 4
+    UPLOAD_FSYNC: bool = False
+    UPLOAD_MAX_BYTES: dict[str, int] = {
+        "dicom":    4 * 1024 ** 3,
+        "pdf":      200 * 1024 ** 2,
+        "jpg":      50 * 1024 ** 2,
+        "document": 50 * 1024 ** 2,   # registration and patient documents
+    }
+    # Resumable uploads: idle sessions expire after the TTL and are swept periodically
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 3600
+    UPLOAD_SESSION_GC_INTERVAL: int = 600
+    # Rows fetched per server-side cursor batch in metadata exports
+    EXPORT_BATCH_SIZE: int = 1000
+    # Project ZIP export: files fetched ahead of the writer, and chunks buffered per file
+    ZIP_EXPORT_PREFETCH: int = 4
+    ZIP_EXPORT_QUEUE_CHUNKS: int = 8
+    # Optional de-identification at ingest: the access levels it applies to
+    # (none by default, e.g. ["research", "public"]), whether the original
+    # is kept in Orthanc too, worker processes, and the secret salt behind
+    # pseudonyms and replacement UIDs. Enabling it requires a real salt
+    DEIDENTIFY_ACCESS_LEVELS: list[str] = []
+    DEIDENTIFY_KEEP_ORIGINAL: bool = False
+    DEIDENTIFY_WORKERS: int = 2
+    DEIDENTIFY_UID_SALT: str = DEFAULT_DEIDENTIFY_SALT
+    # Keyword-based profile, a subset of the DICOM PS3.15 basic profile
+    DEIDENTIFY_PROFILE: dict = {
+        "name": "basic",
+        "remove_private": True,
+        "remove": [
+            "OtherPatientIDs", "OtherPatientIDsSequence", "OtherPatientNames",
+            "PatientAddress", "PatientTelephoneNumbers", "PatientMotherBirthName",
+            "PatientComments", "AdditionalPatientHistory", "MilitaryRank",
+            "InstitutionName", "InstitutionAddress", "InstitutionalDepartmentName",
+            "StationName", "DeviceSerialNumber", "OperatorsName",
+            "PerformingPhysicianName", "PhysiciansOfRecord", "RequestingPhysician",
+            "NameOfPhysiciansReadingStudy",
+        ],
+        "replace": {
+            "PatientName":            "ANONYMIZED",
+            "PatientBirthDate":       "",
+            "ReferringPhysicianName": "",
+            "AccessionNumber":        "",
+            "StudyID":                "",
+        },
+        "remap_uids": [
+            "StudyInstanceUID", "SeriesInstanceUID", "SOPInstanceUID",
+            "FrameOfReferenceUID", "ReferencedSOPInstanceUID",
+        ],
+        "pseudonymize": ["PatientID"],
+    }
+    # Lossless transcoding before Orthanc: modality → target ("jpeg-ls",
+    # "jpeg2000", "rle" or "none"; "*" matches any modality), optionally
+    # overridden per project id. Empty means uploads are stored as is
+    TRANSCODE_BY_MODALITY: dict[str, str] = {}
+    TRANSCODE_BY_PROJECT: dict[int, dict[str, str]] = {}
+    TRANSCODE_WORKERS: int = 2
+    # Blob garbage collection: sweep interval, batch size, and how long a
+    # freshly stored blob is left alone while its referencing row commits
+    BLOB_GC_INTERVAL: float = 3600.0
+    BLOB_GC_BATCH: int = 500
+    BLOB_GC_GRACE: int = 3600
+    # Leading bytes of a DICOM upload used to validate the preamble and header
+    DICOM_HEADER_PREFIX_SIZE: int = 64 * 1024
+    # Headers are read in growing steps up to this size; larger ones are rejected
+    DICOM_HEADER_MAX_SIZE: int = 4 * 1024 * 1024
+    # Worker threads for header parsing; bounds how many parses run at once
+    DICOM_PARSE_WORKERS: int = 4
+
+    # Batch study ingest: parallel Orthanc forwards and max parts per request
+    BATCH_INGEST_CONCURRENCY: int = 8
+    BATCH_MAX_FILES: int = 5000
+    # Instances recorded per transaction; a failed row only loses its own result
+    BATCH_COMMIT_SIZE: int = 100
+
+    # Background ingest workers for 202-Accepted uploads
+    INGEST_WORKERS: int = 4
+    # Seconds after which a job still marked running is taken to be orphaned
+    # by a dead worker and claimed again
+    INGEST_JOB_LEASE: int = 3600
+
+    # Preview cache: rendered in a process pool, LRU-evicted over the byte cap
+    PREVIEW_CACHE_DIR: str = "uploads/previews"
+    PREVIEW_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    PREVIEW_MAX_SIZE: int = 256
+    PREVIEW_FORMAT: str = "webp"
+    PREVIEW_WORKERS: int = 2
+
+    # Orthanc REST endpoint and shared connection pool
+    ORTHANC_URL: str = "http://localhost:8042"
+    ORTHANC_USERNAME: str = "orthanc"
+    ORTHANC_PASSWORD: str = "orthanc"
+    ORTHANC_MAX_CONNECTIONS: int = 50
+    ORTHANC_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    ORTHANC_KEEPALIVE_EXPIRY: float = 30.0
+    ORTHANC_CONNECT_TIMEOUT: float = 5.0
+    ORTHANC_TIMEOUT: float = 30.0
+    # Max wait for a free pooled connection before answering 503
+    ORTHANC_POOL_TIMEOUT: float = 5.0
+    # Per-call budgets: cap retries plus backoff, and clip each attempt's timeouts
+    ORTHANC_READ_BUDGET: float = 10.0
+    ORTHANC_STORE_BUDGET: float = 60.0
+    # Retries of idempotent calls, with full-jitter exponential backoff
+    ORTHANC_RETRIES: int = 2
+    ORTHANC_BACKOFF_BASE: float = 0.2
+    ORTHANC_BACKOFF_MAX: float = 2.0
+    # Consecutive failures that open the circuit, and how long it stays open
+    ORTHANC_BREAKER_THRESHOLD: int = 5
+    ORTHANC_BREAKER_RESET: float = 30.0
+    # Change-feed reconciliation: poll interval, page size, and how long an
+    # unrecorded instance may wait for its DataFile before it counts as orphaned
+    ORTHANC_RECONCILE_INTERVAL: float = 60.0
+    ORTHANC_CHANGES_BATCH: int = 500
+    ORTHANC_ORPHAN_GRACE: int = 3600
+    # Delete orphans this service itself forwarded (see orthanc_forwarded);
+    # off by default, so orphans are only flagged
+    ORTHANC_DELETE_ORPHANS: bool = False
+    # Integrity scrubber: files checked per batch, read budget shared by blob
+    # hashing and Orthanc MD5 checks (bytes/s), pause after a full pass, and
+    # back-off after an error
+    INTEGRITY_SCRUB_ENABLED: bool = True
+    INTEGRITY_SCRUB_BATCH: int = 100
+    INTEGRITY_SCRUB_BYTES_PER_SECOND: int = 4 * 1024 * 1024
+    INTEGRITY_SCRUB_PASS_INTERVAL: float = 24 * 3600
+    INTEGRITY_SCRUB_RETRY_INTERVAL: float = 300.0
 
     class Config:
         env_file = ".env"
 
 settings = Settings()
-
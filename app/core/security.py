@@ -1,16 +1,56 @@
 # app/core/security.py
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta,timezone
+from types import MappingProxyType
+from typing import Mapping
+from fastapi import HTTPException, status
 from jose import jwt
 from app.core.config import settings
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+# bcrypt costs ~250 ms of CPU per call; it runs on its own bounded pool
+# (bcrypt releases the GIL) so logins never stall the event loop
+_hash_pool = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+# one slot per call running or queued on the pool; a slot is given back
+# when the bcrypt call itself ends, not when its caller stops waiting, so
+# disconnected clients cannot push more work onto the pool than the bound
+_hash_slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+
+async def _run_hash(fn, *args):
+    """Run a bcrypt call on the pool, or 503 if the pool and its queue are full."""
+    if not _hash_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent password checks, please retry",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        future = _hash_pool.submit(fn, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return await asyncio.wrap_future(future)
+
+async def get_password_hash(password: str) -> str:
+    return await _run_hash(pwd_context.hash, password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hash(pwd_context.verify, plain_password, hashed_password)
+
+def shutdown_hash_pool() -> None:
+    _hash_pool.shutdown(wait=False, cancel_futures=True)
 
 def create_access_token(data: dict) -> str:
     """Creates a JWT access token."""
@@ -19,3 +59,65 @@ def create_access_token(data: dict) -> str:
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified token claims keyed by the token's SHA-256, so
+    repeated requests with the same token skip jwt.decode. Entries expire
+    at the token's exp. Claims are read-only, with "roles" as a frozenset.
+    Only used from the event loop, so no locking.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits    = 0
+        self.misses  = 0
+        self._entries: OrderedDict[bytes, tuple[float, Mapping]] = OrderedDict()
+
+    def get(self, key: bytes) -> Mapping | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, claims = entry
+            if time.time() < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return claims
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: bytes, claims: Mapping, expires_at: float) -> None:
+        self._entries[key] = (expires_at, claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size":     len(self._entries),
+            "maxsize":  self.maxsize,
+            "hits":     self.hits,
+            "misses":   self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+
+
+def decode_access_token(token: str) -> Mapping:
+    """
+    Verify a JWT and return its claims, from the cache when possible.
+    Raises JWTError for invalid or expired tokens; those are never cached.
+    """
+    key    = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(key)
+    if claims is None:
+        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        payload["roles"] = frozenset(payload.get("roles") or ())
+        claims = MappingProxyType(payload)
+        if "exp" in payload:
+            token_cache.put(key, claims, float(payload["exp"]))
+    return claims
@@ -0,0 +1,69 @@
+# app/db/crud/crud_blob.py
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import union, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.models import DataFile, Patient, PendingRegistration, StoredBlob, User
+
+
+async def get_blob(db: AsyncSession, sha256: str) -> Optional[StoredBlob]:
+    result = await db.execute(select(StoredBlob).where(StoredBlob.sha256 == sha256))
+    return result.scalars().first()
+
+async def register_blob(db: AsyncSession, sha256: str, path: str, size: int, at: datetime) -> None:
+    """
+    Create the blob's row or refresh its last_stored_at. Blocks while the
+    collector holds the row, so a blob is never removed under a new store.
+    """
+    result = await db.execute(
+        update(StoredBlob).where(StoredBlob.sha256 == sha256).values(last_stored_at=at)
+    )
+    if result.rowcount > 0:
+        return
+    try:
+        async with db.begin_nested():
+            db.add(StoredBlob(sha256=sha256, path=path, size=size, last_stored_at=at))
+    except IntegrityError:
+        # another upload of the same content created it first
+        await db.execute(
+            update(StoredBlob).where(StoredBlob.sha256 == sha256).values(last_stored_at=at)
+        )
+
+def _referenced_paths():
+    """Every column that points into the blob store."""
+    columns = [
+        DataFile.storage_path,
+        Patient.informed_consent_doc,
+        Patient.related_reports_doc,
+        PendingRegistration.research_id_doc,
+        PendingRegistration.ethics_approval_doc,
+        PendingRegistration.confidentiality_agreement_doc,
+        User.research_id_doc,
+        User.ethics_approval_doc,
+        User.confidentiality_agreement_doc,
+    ]
+    return union(*(select(c).where(c.is_not(None)) for c in columns))
+
+def _unreferenced(stored_before: datetime):
+    return (
+        StoredBlob.last_stored_at < stored_before,
+        StoredBlob.path.not_in(_referenced_paths()),
+    )
+
+async def list_unreferenced_blobs(db: AsyncSession, stored_before: datetime, limit: int) -> List[str]:
+    result = await db.execute(
+        select(StoredBlob.sha256).where(*_unreferenced(stored_before)).limit(limit)
+    )
+    return result.scalars().all()
+
+async def lock_unreferenced_blob(db: AsyncSession, sha256: str, stored_before: datetime) -> Optional[StoredBlob]:
+    """Re-check and lock a collection candidate; None if it was stored or referenced meanwhile."""
+    result = await db.execute(
+        select(StoredBlob)
+        .where(StoredBlob.sha256 == sha256, *_unreferenced(stored_before))
+        .with_for_update()
+    )
+    return result.scalars().first()
@@ -1,18 +1,97 @@
 # app/db/crud/crud_datafile.py
 
+import base64
+from datetime import datetime
+from typing import AsyncIterator
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, exists, true, tuple_, RowMapping
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.exc import IntegrityError
-from app.db.models import DataFile
+from app.db.models import DataFile, Project, AccessLevelEnum, project_members
 from app.schemas.datafile import DataFileCreate
 
 
+def datafile_access_clause(user_data: dict):
+    """
+    SQL condition selecting the DataFile rows a token's user may see:
+      - admin      → everything
+      - public     → any authenticated user
+      - research   → researchers
+      - project    → members and the lead of the file's project
+      - private    → the lead of the file's project
+    """
+    roles = user_data.get("roles", [])
+    if "admin" in roles:
+        return true()
+
+    user_id = user_data.get("user_id")
+    is_lead = exists().where(
+        Project.id == DataFile.project_id,
+        Project.lead_user_id == user_id,
+    )
+    is_member = exists().where(
+        project_members.c.project_id == DataFile.project_id,
+        project_members.c.user_id == user_id,
+    )
+    clauses = [
+        DataFile.access_level == AccessLevelEnum.public,
+        and_(DataFile.access_level == AccessLevelEnum.project, or_(is_member, is_lead)),
+        and_(DataFile.access_level == AccessLevelEnum.private, is_lead),
+    ]
+    if "researcher" in roles:
+        clauses.append(DataFile.access_level == AccessLevelEnum.research)
+    return or_(*clauses)
+
+
+async def get_visible_datafile(db: AsyncSession, datafile_id: int, user_data: dict) -> DataFile | None:
+    """A DataFile by id, or None if it doesn't exist or the user may not see it."""
+    result = await db.execute(
+        select(DataFile).where(DataFile.id == datafile_id, datafile_access_clause(user_data))
+    )
+    return result.scalars().first()
+
 async def get_datafile_by_orthanc_id(db: AsyncSession, orthanc_id: str) -> DataFile | None:
     result = await db.execute(select(DataFile).where(DataFile.orthanc_id == orthanc_id))
     return result.scalars().first()
 
-async def create_datafile(db: AsyncSession, data_in, *, orthanc_id: str | None, storage_path: str | None):
-    df = DataFile(**data_in.model_dump(exclude_none=True), orthanc_id=orthanc_id, storage_path=storage_path)
+async def get_datafile_by_sop_instance_uid(db: AsyncSession, sop_instance_uid: str) -> DataFile | None:
+    result = await db.execute(select(DataFile).where(DataFile.sop_instance_uid == sop_instance_uid))
+    return result.scalars().first()
+
+async def get_datafile_by_content_hash(db: AsyncSession, project_id: int, content_hash: str) -> DataFile | None:
+    result = await db.execute(
+        select(DataFile).where(DataFile.project_id == project_id, DataFile.content_hash == content_hash)
+    )
+    return result.scalars().first()
+
+async def get_recorded_sop_instance_uids(db: AsyncSession, sop_instance_uids: list[str]) -> set[str]:
+    """Return the subset of sop_instance_uids that already have a DataFile row."""
+    if not sop_instance_uids:
+        return set()
+    result = await db.execute(
+        select(DataFile.sop_instance_uid).where(DataFile.sop_instance_uid.in_(sop_instance_uids))
+    )
+    return set(result.scalars().all())
+
+async def create_datafile(
+    db: AsyncSession,
+    data_in,
+    *,
+    orthanc_id: str | None,
+    storage_path: str | None,
+    **columns,
+):
+    """
+    `columns` carries the optional per-file columns (sop_instance_uid,
+    content_hash, series_id, ...).
+    """
+    df = DataFile(
+        **data_in.model_dump(exclude_none=True),
+        orthanc_id=orthanc_id,
+        storage_path=storage_path,
+        **columns,
+    )
     db.add(df)
     try:
         await db.commit()
@@ -25,6 +104,126 @@ async def create_datafile(db: AsyncSession, data_in, *, orthanc_id: str | None,
         raise
     return df
 
-async def list_datafiles(db: AsyncSession) -> list[DataFile]:
-    result = await db.execute(select(DataFile))
-    return result.scalars().all()
+async def get_recorded_orthanc_ids(db: AsyncSession, orthanc_ids: list[str]) -> set[str]:
+    """Return the subset of orthanc_ids that already have a DataFile row."""
+    if not orthanc_ids:
+        return set()
+    result = await db.execute(
+        select(DataFile.orthanc_id).where(DataFile.orthanc_id.in_(orthanc_ids))
+    )
+    return set(result.scalars().all())
+
+async def get_referenced_orthanc_ids(db: AsyncSession, orthanc_ids: list[str]) -> set[str]:
+    """
+    Like get_recorded_orthanc_ids, but also counts originals kept alongside
+    a de-identified copy (source_orthanc_id).
+    """
+    if not orthanc_ids:
+        return set()
+    result = await db.execute(
+        select(DataFile.orthanc_id, DataFile.source_orthanc_id).where(
+            or_(
+                DataFile.orthanc_id.in_(orthanc_ids),
+                DataFile.source_orthanc_id.in_(orthanc_ids),
+            )
+        )
+    )
+    return {oid for row in result.all() for oid in row if oid} & set(orthanc_ids)
+
+async def add_datafile(db: AsyncSession, data_in, *, orthanc_id: str, **columns) -> DataFile:
+    """
+    Flush one DICOM DataFile without committing, for callers that record
+    many instances in savepoints. `columns` as for create_datafile.
+    """
+    df = DataFile(**data_in.model_dump(exclude_none=True), orthanc_id=orthanc_id, storage_path=None, **columns)
+    db.add(df)
+    # server defaults come back via RETURNING (eager_defaults), no refresh needed
+    await db.flush()
+    return df
+
+def encode_cursor(df: DataFile) -> str:
+    """Opaque cursor pointing just past `df` in (uploaded_at, id) order."""
+    raw = f"{df.uploaded_at.isoformat()}|{df.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        uploaded_at, datafile_id = raw.split("|")
+        position = datetime.fromisoformat(uploaded_at), int(datafile_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # uploaded_at is timezone-aware; a naive value cannot be compared with it
+    if position[0].tzinfo is None:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+def _filter_datafiles(query, filters: dict, uploaded_from, uploaded_to):
+    for column, value in filters.items():
+        if value is not None:
+            query = query.where(getattr(DataFile, column) == value)
+    if uploaded_from is not None:
+        query = query.where(DataFile.uploaded_at >= uploaded_from)
+    if uploaded_to is not None:
+        query = query.where(DataFile.uploaded_at < uploaded_to)
+    return query
+
+async def list_datafiles(
+    db: AsyncSession,
+    *,
+    filters: dict,
+    uploaded_from: datetime | None = None,
+    uploaded_to:   datetime | None = None,
+    cursor: str | None = None,
+    limit: int = 100,
+) -> tuple[list[DataFile], str | None]:
+    """
+    Newest-first page of files matching the equality `filters` (column
+    name → value, None skipped) and upload date range. Keyset pagination on
+    (uploaded_at, id) keeps every page an index range scan. Returns the
+    page and the cursor for the next one, if any.
+    """
+    query = _filter_datafiles(
+        select(DataFile), filters, uploaded_from, uploaded_to
+    ).order_by(DataFile.uploaded_at.desc(), DataFile.id.desc())
+    if cursor:
+        query = query.where(tuple_(DataFile.uploaded_at, DataFile.id) < decode_cursor(cursor))
+
+    result = await db.execute(query.limit(limit + 1))
+    rows   = result.scalars().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+async def stream_datafile_rows(
+    db: AsyncSession,
+    *,
+    filters: dict,
+    uploaded_from: datetime | None = None,
+    uploaded_to:   datetime | None = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[list[RowMapping]]:
+    """
+    Yield matching data_files rows in batches from a server-side cursor,
+    oldest first. Plain row mappings, not ORM objects, so nothing
+    accumulates in the session while the export runs.
+    """
+    query = _filter_datafiles(
+        select(DataFile.__table__), filters, uploaded_from, uploaded_to
+    ).order_by(DataFile.uploaded_at, DataFile.id)
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    async for batch in result.mappings().partitions():
+        yield batch
+
+async def list_project_export_rows(db: AsyncSession, project_id: int, user_data: dict) -> list[RowMapping]:
+    """The columns a project export needs, for the files the user may see."""
+    result = await db.execute(
+        select(
+            DataFile.id, DataFile.data_name, DataFile.file_type,
+            DataFile.orthanc_id, DataFile.storage_path, DataFile.uploaded_at,
+        )
+        .where(DataFile.project_id == project_id, datafile_access_clause(user_data))
+        .order_by(DataFile.id)
+    )
+    return result.mappings().all()
@@ -0,0 +1,39 @@
+# app/db/crud/crud_deid.py
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.models import DeidUidMapping
+
+
+async def record_uid_mappings(db: AsyncSession, project_id: int, uid_map: dict[str, str]) -> None:
+    """
+    Add the mappings the project does not have yet. Flushed inside a
+    savepoint, not committed; a concurrent ingest inserting the same pair
+    only makes us retry row by row.
+    """
+    if not uid_map:
+        return
+    result = await db.execute(
+        select(DeidUidMapping.original_uid).where(
+            DeidUidMapping.project_id == project_id,
+            DeidUidMapping.original_uid.in_(list(uid_map)),
+        )
+    )
+    known   = set(result.scalars().all())
+    missing = {k: v for k, v in uid_map.items() if k not in known}
+    if not missing:
+        return
+    try:
+        async with db.begin_nested():
+            db.add_all(
+                DeidUidMapping(project_id=project_id, original_uid=k, deidentified_uid=v)
+                for k, v in missing.items()
+            )
+    except IntegrityError:
+        for k, v in missing.items():
+            try:
+                async with db.begin_nested():
+                    db.add(DeidUidMapping(project_id=project_id, original_uid=k, deidentified_uid=v))
+            except IntegrityError:
+                pass
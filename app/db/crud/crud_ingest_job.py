@@ -0,0 +1,104 @@
+# app/db/crud/crud_ingest_job.py
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import and_, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.models import IngestJob, IngestJobStatusEnum
+from app.schemas.datafile import DataFileCreate
+
+
+async def create_ingest_job(
+    db: AsyncSession,
+    data_in: DataFileCreate,
+    *,
+    filename: str | None,
+    spool_path: str,
+    content_hash: str,
+    submitted_by_user_id: int | None,
+) -> IngestJob:
+    job = IngestJob(
+        project_id=data_in.project_id,
+        params=data_in.model_dump(mode="json"),
+        filename=filename,
+        spool_path=spool_path,
+        content_hash=content_hash,
+        submitted_by_user_id=submitted_by_user_id,
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+async def get_ingest_job(db: AsyncSession, job_id: int) -> Optional[IngestJob]:
+    result = await db.execute(select(IngestJob).where(IngestJob.id == job_id))
+    return result.scalars().first()
+
+async def list_ingest_jobs(
+    db: AsyncSession,
+    project_id: int | None = None,
+    status: IngestJobStatusEnum | None = None,
+    submitted_by_user_id: int | None = None,
+) -> List[IngestJob]:
+    query = select(IngestJob).order_by(IngestJob.id.desc())
+    if submitted_by_user_id is not None:
+        query = query.where(IngestJob.submitted_by_user_id == submitted_by_user_id)
+    if project_id is not None:
+        query = query.where(IngestJob.project_id == project_id)
+    if status is not None:
+        query = query.where(IngestJob.status == status)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+async def get_unfinished_job_ids(db: AsyncSession) -> List[int]:
+    """Jobs still queued or interrupted mid-run, oldest first."""
+    result = await db.execute(
+        select(IngestJob.id)
+        .where(IngestJob.status.in_([IngestJobStatusEnum.queued, IngestJobStatusEnum.running]))
+        .order_by(IngestJob.id)
+    )
+    return result.scalars().all()
+
+async def get_stale_job_ids(db: AsyncSession, claimed_before: datetime) -> List[int]:
+    """Running jobs whose claim has lapsed, oldest first."""
+    result = await db.execute(
+        select(IngestJob.id)
+        .where(IngestJob.status == IngestJobStatusEnum.running, IngestJob.claimed_at < claimed_before)
+        .order_by(IngestJob.id)
+    )
+    return result.scalars().all()
+
+async def claim_ingest_job(
+    db: AsyncSession,
+    job_id: int,
+    now: datetime,
+    claimed_before: datetime,
+) -> Optional[IngestJob]:
+    """
+    Mark a job running if it is queued, or running under a claim older than
+    `claimed_before`. A single conditional UPDATE, so of several workers
+    racing for a job exactly one gets the row back; the others get None.
+    """
+    result = await db.execute(
+        update(IngestJob)
+        .where(
+            IngestJob.id == job_id,
+            or_(
+                IngestJob.status == IngestJobStatusEnum.queued,
+                and_(
+                    IngestJob.status == IngestJobStatusEnum.running,
+                    IngestJob.claimed_at < claimed_before,
+                ),
+            ),
+        )
+        .values(status=IngestJobStatusEnum.running, claimed_at=now, attempts=IngestJob.attempts + 1)
+        .returning(IngestJob)
+    )
+    job = result.scalars().first()
+    await db.commit()
+    return job
+
+async def update_ingest_job(db: AsyncSession, job_id: int, **fields) -> None:
+    await db.execute(update(IngestJob).where(IngestJob.id == job_id).values(**fields))
+    await db.commit()
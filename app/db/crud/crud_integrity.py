@@ -0,0 +1,75 @@
+# app/db/crud/crud_integrity.py
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import RowMapping
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.models import DataFile, IntegrityIssue, IntegrityIssueKindEnum
+
+
+async def list_scrub_rows(db: AsyncSession, after_id: int, limit: int) -> List[RowMapping]:
+    """The next `limit` files after `after_id`, in id order, with what the scrubber checks."""
+    result = await db.execute(
+        select(
+            DataFile.id,
+            DataFile.storage_path,
+            DataFile.content_hash,
+            DataFile.orthanc_id,
+            DataFile.stored_size,
+            DataFile.original_size,
+        )
+        .where(DataFile.id > after_id)
+        .order_by(DataFile.id)
+        .limit(limit)
+    )
+    return result.mappings().all()
+
+async def sync_issues(
+    db: AsyncSession,
+    datafile_id: int,
+    found: dict[IntegrityIssueKindEnum, str],
+    at: datetime,
+) -> None:
+    """
+    Record the issues just found for a file (refreshing open ones of the
+    same kind) and resolve open issues that are no longer present.
+    """
+    result = await db.execute(
+        select(IntegrityIssue).where(
+            IntegrityIssue.datafile_id == datafile_id,
+            IntegrityIssue.resolved_at.is_(None),
+        )
+    )
+    open_issues = {issue.kind: issue for issue in result.scalars().all()}
+    for kind, issue in open_issues.items():
+        if kind in found:
+            issue.detail       = found[kind]
+            issue.last_seen_at = at
+        else:
+            issue.resolved_at = at
+    for kind, detail in found.items():
+        if kind not in open_issues:
+            db.add(IntegrityIssue(
+                datafile_id=datafile_id,
+                kind=kind,
+                detail=detail,
+                first_seen_at=at,
+                last_seen_at=at,
+            ))
+
+async def list_integrity_issues(
+    db: AsyncSession,
+    *,
+    kind: Optional[IntegrityIssueKindEnum] = None,
+    include_resolved: bool = False,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[IntegrityIssue]:
+    query = select(IntegrityIssue).order_by(IntegrityIssue.last_seen_at.desc(), IntegrityIssue.id.desc())
+    if kind is not None:
+        query = query.where(IntegrityIssue.kind == kind)
+    if not include_resolved:
+        query = query.where(IntegrityIssue.resolved_at.is_(None))
+    result = await db.execute(query.offset(skip).limit(limit))
+    return result.scalars().all()
@@ -17,7 +17,7 @@ async def get_pending_by_email(db: AsyncSession, email: str):
     return result.scalars().first()
 
 async def create_pending_registration(db: AsyncSession, registration_data: dict) -> PendingRegistration:
-    hashed_password = get_password_hash(registration_data["password"])
+    hashed_password = await get_password_hash(registration_data["password"])
     pending = PendingRegistration(
         email=registration_data["email"],
         hashed_password=hashed_password,
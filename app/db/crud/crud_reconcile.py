@@ -0,0 +1,103 @@
+# app/db/crud/crud_reconcile.py
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.models import DataFile, OrthancForwarded, OrthancOrphan, OrphanStatusEnum, WorkerCheckpoint
+
+
+async def get_checkpoint(db: AsyncSession, name: str) -> Optional[str]:
+    result = await db.execute(select(WorkerCheckpoint.position).where(WorkerCheckpoint.name == name))
+    return result.scalars().first()
+
+async def set_checkpoint(db: AsyncSession, name: str, position: str) -> None:
+    """Stage the new position; committed with the caller's batch."""
+    checkpoint = await db.get(WorkerCheckpoint, name)
+    if checkpoint:
+        checkpoint.position = position
+    else:
+        db.add(WorkerCheckpoint(name=name, position=position))
+
+async def add_orphan_candidates(db: AsyncSession, orthanc_ids: set[str]) -> None:
+    """Record unrecorded Orthanc instances as pending; known ones are left as they are."""
+    if not orthanc_ids:
+        return
+    result = await db.execute(
+        select(OrthancOrphan.orthanc_id).where(OrthancOrphan.orthanc_id.in_(orthanc_ids))
+    )
+    for orthanc_id in orthanc_ids - set(result.scalars().all()):
+        db.add(OrthancOrphan(orthanc_id=orthanc_id))
+
+async def forget_orphans(db: AsyncSession, orthanc_ids: set[str]) -> None:
+    """Drop candidates that turned out recorded or gone; our own deletions stay on record."""
+    if orthanc_ids:
+        await db.execute(
+            delete(OrthancOrphan).where(
+                OrthancOrphan.orthanc_id.in_(orthanc_ids),
+                OrthancOrphan.status != OrphanStatusEnum.deleted,
+            )
+        )
+
+async def list_expired_candidates(db: AsyncSession, seen_before: datetime, limit: int) -> List[str]:
+    """Pending candidates whose grace period has run out, oldest first."""
+    result = await db.execute(
+        select(OrthancOrphan.orthanc_id)
+        .where(
+            OrthancOrphan.status == OrphanStatusEnum.pending,
+            OrthancOrphan.first_seen_at < seen_before,
+        )
+        .order_by(OrthancOrphan.first_seen_at)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+async def update_orphan(db: AsyncSession, orthanc_id: str, **fields) -> None:
+    await db.execute(
+        update(OrthancOrphan).where(OrthancOrphan.orthanc_id == orthanc_id).values(**fields)
+    )
+
+async def list_orphans(db: AsyncSession, status: OrphanStatusEnum | None = None) -> List[OrthancOrphan]:
+    query = select(OrthancOrphan).order_by(OrthancOrphan.first_seen_at.desc())
+    if status is not None:
+        query = query.where(OrthancOrphan.status == status)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+async def mark_missing_in_orthanc(db: AsyncSession, orthanc_ids: set[str], at: datetime) -> None:
+    if orthanc_ids:
+        await db.execute(
+            update(DataFile)
+            .where(DataFile.orthanc_id.in_(orthanc_ids), DataFile.missing_in_orthanc_at.is_(None))
+            .values(missing_in_orthanc_at=at)
+        )
+
+async def clear_missing_in_orthanc(db: AsyncSession, orthanc_ids: set[str]) -> None:
+    if orthanc_ids:
+        await db.execute(
+            update(DataFile)
+            .where(DataFile.orthanc_id.in_(orthanc_ids), DataFile.missing_in_orthanc_at.is_not(None))
+            .values(missing_in_orthanc_at=None)
+        )
+
+async def record_forwarded(db: AsyncSession, orthanc_id: str) -> None:
+    """Note that we stored `orthanc_id` in Orthanc; storing it again is a no-op."""
+    try:
+        async with db.begin_nested():
+            db.add(OrthancForwarded(orthanc_id=orthanc_id))
+    except IntegrityError:
+        pass
+
+async def get_forwarded_ids(db: AsyncSession, orthanc_ids: set[str]) -> set[str]:
+    if not orthanc_ids:
+        return set()
+    result = await db.execute(
+        select(OrthancForwarded.orthanc_id).where(OrthancForwarded.orthanc_id.in_(orthanc_ids))
+    )
+    return set(result.scalars().all())
+
+async def forget_forwarded(db: AsyncSession, orthanc_ids: set[str]) -> None:
+    if orthanc_ids:
+        await db.execute(delete(OrthancForwarded).where(OrthancForwarded.orthanc_id.in_(orthanc_ids)))
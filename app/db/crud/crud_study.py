@@ -0,0 +1,248 @@
+# app/db/crud/crud_study.py
+from typing import List, Optional
+from sqlalchemy import Row, exists, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.models import DataFile, DicomStudy, DicomSeries
+
+STUDY_FIELDS  = (
+    "study_date", "study_time", "study_description",
+    "accession_number", "dicom_patient_id", "dicom_patient_name",
+)
+SERIES_FIELDS = ("series_number", "series_description", "body_part_examined")
+
+
+async def get_study_by_uid(
+    db: AsyncSession,
+    study_instance_uid: str,
+    access=None,
+) -> Optional[DicomStudy]:
+    """
+    The study with this UID; with `access`, only if it contains at least one
+    instance passing it.
+    """
+    query = select(DicomStudy).where(DicomStudy.study_instance_uid == study_instance_uid)
+    if access is not None:
+        query = query.where(
+            exists()
+            .where(DataFile.series_id == DicomSeries.id, DicomSeries.study_id == DicomStudy.id)
+            .where(access)
+        )
+    result = await db.execute(query)
+    return result.scalars().first()
+
+async def get_series_by_uid(db: AsyncSession, series_instance_uid: str) -> Optional[DicomSeries]:
+    result = await db.execute(
+        select(DicomSeries).where(DicomSeries.series_instance_uid == series_instance_uid)
+    )
+    return result.scalars().first()
+
+async def _get_or_create(db: AsyncSession, getter, uid: str, make):
+    """
+    Look up a row by UID or insert it inside a savepoint. A concurrent ingest
+    inserting the same UID makes our insert fail; we then read theirs.
+    """
+    row = await getter(db, uid)
+    if row:
+        return row
+    try:
+        async with db.begin_nested():
+            row = make()
+            db.add(row)
+    except IntegrityError:
+        row = await getter(db, uid)
+    return row
+
+async def get_or_create_series(
+    db: AsyncSession,
+    fields: dict,
+    *,
+    project_id: int,
+    patient_id: int,
+) -> Optional[DicomSeries]:
+    """
+    Ensure the study and series described by extracted header `fields`
+    exist and return the series. Changes are flushed but not committed, so
+    they land in the same transaction as the DataFile rows.
+    """
+    study_uid  = fields.get("study_instance_uid")
+    series_uid = fields.get("series_instance_uid")
+    if not study_uid or not series_uid:
+        return None
+
+    study = await _get_or_create(
+        db, get_study_by_uid, study_uid,
+        lambda: DicomStudy(
+            study_instance_uid=study_uid,
+            project_id=project_id,
+            patient_id=patient_id,
+            **{f: fields.get(f) for f in STUDY_FIELDS},
+        ),
+    )
+    return await _get_or_create(
+        db, get_series_by_uid, series_uid,
+        lambda: DicomSeries(
+            series_instance_uid=series_uid,
+            study_id=study.id,
+            modality=fields.get("series_modality"),
+            **{f: fields.get(f) for f in SERIES_FIELDS},
+        ),
+    )
+
+def _visible_study_counts(access):
+    """Per study: series and instance counts over the instances passing `access`."""
+    return (
+        select(
+            DicomSeries.study_id,
+            func.count(func.distinct(DicomSeries.id)).label("n_series"),
+            func.count(DataFile.id).label("n_instances"),
+        )
+        .join(DataFile, DataFile.series_id == DicomSeries.id)
+        .where(access)
+        .group_by(DicomSeries.study_id)
+        .subquery()
+    )
+
+def _visible_series_counts(access):
+    """Per series: the number of instances passing `access`."""
+    return (
+        select(DataFile.series_id, func.count(DataFile.id).label("n_instances"))
+        .where(DataFile.series_id.is_not(None), access)
+        .group_by(DataFile.series_id)
+        .subquery()
+    )
+
+async def list_studies(
+    db: AsyncSession,
+    access,
+    project_id: int | None = None,
+    patient_id: int | None = None,
+) -> List[tuple[DicomStudy, int, int]]:
+    """
+    Studies containing at least one instance passing `access`, with series
+    and instance counts over the visible instances.
+    """
+    visible = _visible_study_counts(access)
+    query = (
+        select(DicomStudy, visible.c.n_series, visible.c.n_instances)
+        .join(visible, visible.c.study_id == DicomStudy.id)
+        .order_by(DicomStudy.id)
+    )
+    if project_id is not None:
+        query = query.where(DicomStudy.project_id == project_id)
+    if patient_id is not None:
+        query = query.where(DicomStudy.patient_id == patient_id)
+    result = await db.execute(query)
+    return result.all()
+
+async def list_series_for_study(
+    db: AsyncSession,
+    access,
+    study_id: int,
+) -> List[tuple[DicomSeries, int]]:
+    """Series of a study with at least one instance passing `access`, with their visible instance counts."""
+    visible = _visible_series_counts(access)
+    result = await db.execute(
+        select(DicomSeries, visible.c.n_instances)
+        .join(visible, visible.c.series_id == DicomSeries.id)
+        .where(DicomSeries.study_id == study_id)
+        .order_by(DicomSeries.series_number, DicomSeries.id)
+    )
+    return result.all()
+
+
+# ── QIDO-RS searches (visibility applied per instance) ──────
+
+async def search_studies(
+    db: AsyncSession,
+    access,
+    conditions: list,
+    *,
+    limit: int,
+    offset: int,
+) -> List[tuple[DicomStudy, int, int]]:
+    """
+    Studies matching `conditions` that contain at least one instance passing
+    `access`, with series/instance counts over the visible instances.
+    """
+    visible = _visible_study_counts(access)
+    result = await db.execute(
+        select(DicomStudy, visible.c.n_series, visible.c.n_instances)
+        .join(visible, visible.c.study_id == DicomStudy.id)
+        .where(*conditions)
+        .order_by(DicomStudy.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return result.all()
+
+async def get_study_modalities(db: AsyncSession, study_ids: List[int]) -> dict[int, List[str]]:
+    """Distinct series modalities per study, for ModalitiesInStudy."""
+    if not study_ids:
+        return {}
+    result = await db.execute(
+        select(DicomSeries.study_id, DicomSeries.modality)
+        .where(DicomSeries.study_id.in_(study_ids), DicomSeries.modality.is_not(None))
+        .distinct()
+        .order_by(DicomSeries.study_id, DicomSeries.modality)
+    )
+    modalities: dict[int, List[str]] = {}
+    for study_id, modality in result.all():
+        modalities.setdefault(study_id, []).append(modality)
+    return modalities
+
+async def search_series(
+    db: AsyncSession,
+    access,
+    conditions: list,
+    *,
+    limit: int,
+    offset: int,
+) -> List[tuple[DicomSeries, DicomStudy, int]]:
+    """Series matching `conditions` with their visible instance counts."""
+    visible = _visible_series_counts(access)
+    result = await db.execute(
+        select(DicomSeries, DicomStudy, visible.c.n_instances)
+        .join(visible, visible.c.series_id == DicomSeries.id)
+        .join(DicomStudy, DicomStudy.id == DicomSeries.study_id)
+        .where(*conditions)
+        .order_by(DicomSeries.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return result.all()
+
+async def search_instances(
+    db: AsyncSession,
+    access,
+    conditions: list,
+    *,
+    limit: int,
+    offset: int,
+) -> List[tuple[DataFile, DicomSeries, DicomStudy]]:
+    result = await db.execute(
+        select(DataFile, DicomSeries, DicomStudy)
+        .join(DicomSeries, DicomSeries.id == DataFile.series_id)
+        .join(DicomStudy, DicomStudy.id == DicomSeries.study_id)
+        .where(access, *conditions)
+        .order_by(DataFile.instance_number, DataFile.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return result.all()
+
+async def list_visible_instances(db: AsyncSession, access, conditions: list) -> List[Row]:
+    """
+    (orthanc_id, stored_transfer_syntax) of the visible instances matching
+    `conditions`, in series order.
+    """
+    result = await db.execute(
+        select(DataFile.orthanc_id, DataFile.stored_transfer_syntax)
+        .join(DicomSeries, DicomSeries.id == DataFile.series_id)
+        .join(DicomStudy, DicomStudy.id == DicomSeries.study_id)
+        .where(access, DataFile.orthanc_id.is_not(None), *conditions)
+        .order_by(DicomSeries.series_number, DicomSeries.id, DataFile.instance_number, DataFile.id)
+    )
+    return result.all()
@@ -0,0 +1,60 @@
+# app/db/crud/crud_upload_session.py
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.models import UploadSession
+from app.schemas.datafile import DataFileCreate
+
+
+async def create_upload_session(
+    db: AsyncSession,
+    data_in: DataFileCreate,
+    *,
+    session_id: str,
+    filename: str | None,
+    part_path: str,
+    upload_length: int,
+    expires_at: datetime,
+    owner_user_id: int | None,
+) -> UploadSession:
+    session = UploadSession(
+        id=session_id,
+        params=data_in.model_dump(mode="json"),
+        filename=filename,
+        part_path=part_path,
+        upload_length=upload_length,
+        expires_at=expires_at,
+        owner_user_id=owner_user_id,
+    )
+    db.add(session)
+    await db.commit()
+    await db.refresh(session)
+    return session
+
+async def get_upload_session(db: AsyncSession, session_id: str) -> Optional[UploadSession]:
+    result = await db.execute(select(UploadSession).where(UploadSession.id == session_id))
+    return result.scalars().first()
+
+async def update_upload_session(db: AsyncSession, session_id: str, **fields) -> None:
+    await db.execute(update(UploadSession).where(UploadSession.id == session_id).values(**fields))
+    await db.commit()
+
+async def delete_upload_session(
+    db: AsyncSession,
+    session_id: str,
+    expired_before: datetime | None = None,
+) -> bool:
+    """Delete a session (only if it expired before `expired_before`, when given); True if deleted."""
+    query = delete(UploadSession).where(UploadSession.id == session_id)
+    if expired_before is not None:
+        query = query.where(UploadSession.expires_at < expired_before)
+    result = await db.execute(query, execution_options={"synchronize_session": "fetch"})
+    await db.commit()
+    return result.rowcount > 0
+
+async def list_expired_upload_sessions(db: AsyncSession, now: datetime) -> List[UploadSession]:
+    result = await db.execute(select(UploadSession).where(UploadSession.expires_at < now))
+    return result.scalars().all()
@@ -24,7 +24,7 @@ async def create_user(
     role_objs: List[Role],
     hashed: bool = False
 ) -> User:
-    pwd = password if hashed else get_password_hash(password)
+    pwd = password if hashed else await get_password_hash(password)
     user = User(
         email=email,
         hashed_password=pwd,
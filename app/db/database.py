@@ -1,4 +1,9 @@
 # app/db/database.py
+import hashlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
@@ -7,3 +12,25 @@ engine = create_async_engine(settings.DATABASE_URL, echo=True)
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
+
+@asynccontextmanager
+async def try_advisory_lock(name: str) -> AsyncIterator[bool]:
+    """
+    Try to take the Postgres advisory lock `name` without waiting; yields
+    whether it was taken. Held on a connection of its own until exit, so it
+    also goes away with a dead worker. Other databases have no such lock and
+    always yield True.
+    """
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+    key = int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], "big", signed=True)
+    async with engine.connect() as conn:
+        taken = await conn.scalar(select(func.pg_try_advisory_lock(key)))
+        await conn.commit()
+        try:
+            yield taken
+        finally:
+            if taken:
+                await conn.scalar(select(func.pg_advisory_unlock(key)))
+                await conn.commit()
@@ -1,5 +1,5 @@
 # app/db/models.py
-from sqlalchemy import Table, Column, Integer, ForeignKey, String, DateTime, Boolean, Enum, Text
+from sqlalchemy import Table, Column, Index, UniqueConstraint, Integer, BigInteger, ForeignKey, String, DateTime, Date, Boolean, Enum, Text, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
@@ -202,6 +202,43 @@ class FileTypeEnum(str, enum.Enum):
     JPG   = "jpg"
     # add more as needed…
 
+# ─── DICOM Study / Series Index ────────────────────────────────────────────────
+
+class DicomStudy(Base):
+    __tablename__ = "dicom_studies"
+
+    id                 = Column(Integer, primary_key=True, index=True)
+    study_instance_uid = Column(String, unique=True, index=True, nullable=False)
+    project_id         = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    patient_id         = Column(Integer, ForeignKey("patients.id"), nullable=False, index=True)
+
+    study_date         = Column(Date,   nullable=True, index=True)
+    study_time         = Column(String, nullable=True)
+    study_description  = Column(String, nullable=True)
+    accession_number   = Column(String, nullable=True, index=True)
+    dicom_patient_id   = Column(String, nullable=True, index=True)
+    dicom_patient_name = Column(String, nullable=True)
+
+    created_at         = Column(DateTime(timezone=True), server_default=func.now())
+
+    series = relationship("DicomSeries", back_populates="study")
+
+class DicomSeries(Base):
+    __tablename__ = "dicom_series"
+
+    id                  = Column(Integer, primary_key=True, index=True)
+    series_instance_uid = Column(String, unique=True, index=True, nullable=False)
+    study_id            = Column(Integer, ForeignKey("dicom_studies.id"), nullable=False, index=True)
+
+    modality            = Column(String,  nullable=True, index=True)
+    series_number       = Column(Integer, nullable=True)
+    series_description  = Column(String,  nullable=True)
+    body_part_examined  = Column(String,  nullable=True)
+
+    created_at          = Column(DateTime(timezone=True), server_default=func.now())
+
+    study = relationship("DicomStudy", back_populates="series")
+
 # ─── DataFile Model ────────────────────────────────────────────────────────────
 
 class DataFile(Base):
@@ -221,4 +258,184 @@ class DataFile(Base):
     orthanc_id        = Column(String, unique=True, nullable=True)
     storage_path      = Column(String, nullable=True)
 
-    uploaded_at       = Column(DateTime(timezone=True), server_default=func.now())
+    # Local dedup index, filled from the DICOM header before forwarding
+    sop_instance_uid  = Column(String, unique=True, index=True, nullable=True)
+    content_hash      = Column(String(64), index=True, nullable=True)  # SHA-256 hex
+
+    # Position in the study/series index (DICOM only)
+    series_id         = Column(Integer, ForeignKey("dicom_series.id"), nullable=True, index=True)
+    sop_class_uid     = Column(String,  nullable=True)
+    instance_number   = Column(Integer, nullable=True)
+    number_of_frames  = Column(Integer, nullable=True)
+
+    uploaded_at       = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    # De-identified at ingest; the untouched original, if kept, lives in Orthanc only
+    deidentified      = Column(Boolean, nullable=False, default=False)
+    source_orthanc_id = Column(String, nullable=True, index=True)
+
+    # Transfer syntax and size as uploaded vs. as stored in Orthanc (DICOM only)
+    original_transfer_syntax = Column(String, nullable=True)
+    stored_transfer_syntax   = Column(String, nullable=True)
+    original_size            = Column(BigInteger, nullable=True)
+    stored_size              = Column(BigInteger, nullable=True)
+
+    # Set by the reconciler when Orthanc reports the instance deleted
+    missing_in_orthanc_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Keyset pagination walks (uploaded_at, id); the common filters lead
+    __table_args__ = (
+        Index("ix_data_files_uploaded_at_id",         "uploaded_at", "id"),
+        Index("ix_data_files_project_uploaded_at_id", "project_id", "uploaded_at", "id"),
+        Index("ix_data_files_patient_uploaded_at_id", "patient_id", "uploaded_at", "id"),
+    )
+
+    # Fetch server-generated columns on INSERT so bulk inserts skip a refresh
+    __mapper_args__ = {"eager_defaults": True}
+
+
+# ─── Content-Addressed Blobs ───────────────────────────────────────────────────
+
+class StoredBlob(Base):
+    """
+    One row per unique local file, keyed by SHA-256. Rows whose path no
+    row references any more are garbage-collected (see BlobCollector).
+    """
+    __tablename__ = "stored_blobs"
+
+    sha256         = Column(String(64), primary_key=True)
+    path           = Column(String,     nullable=False)
+    size           = Column(BigInteger, nullable=False)
+    created_at     = Column(DateTime(timezone=True), server_default=func.now())
+    # Touched by every store of this content; protects fresh blobs from GC
+    last_stored_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+# ─── Asynchronous Ingest Jobs ──────────────────────────────────────────────────
+
+class IngestJobStatusEnum(str, enum.Enum):
+    queued    = "queued"
+    running   = "running"
+    succeeded = "succeeded"
+    failed    = "failed"
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id           = Column(Integer, primary_key=True, index=True)
+    status       = Column(Enum(IngestJobStatusEnum), nullable=False, default=IngestJobStatusEnum.queued, index=True)
+    project_id   = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    submitted_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    # DataFileCreate fields, replayed by the worker
+    params       = Column(JSON,   nullable=False)
+    filename     = Column(String, nullable=True)
+    spool_path   = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the spooled upload
+
+    # Claiming: a running job whose claim is older than INGEST_JOB_LEASE is retried
+    attempts     = Column(Integer, nullable=False, default=0)
+    claimed_at   = Column(DateTime(timezone=True), nullable=True)
+
+    # Outcome
+    datafile_id  = Column(Integer, ForeignKey("data_files.id"), nullable=True)
+    status_code  = Column(Integer, nullable=True)
+    detail       = Column(Text,    nullable=True)
+
+    created_at   = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at   = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __mapper_args__ = {"eager_defaults": True}
+
+# ─── Resumable Uploads ─────────────────────────────────────────────────────────
+
+class UploadSession(Base):
+    """A partially received upload; bytes accumulate in `part_path`."""
+    __tablename__ = "upload_sessions"
+
+    id            = Column(String(32), primary_key=True)
+    owner_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    # DataFileCreate fields, replayed on finalize
+    params        = Column(JSON,   nullable=False)
+    filename      = Column(String, nullable=True)
+    part_path     = Column(String, nullable=False)
+
+    upload_length = Column(BigInteger, nullable=False)
+    upload_offset = Column(BigInteger, nullable=False, default=0)
+
+    created_at    = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at    = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    __mapper_args__ = {"eager_defaults": True}
+
+# ─── Orthanc Reconciliation ────────────────────────────────────────────────────
+
+class WorkerCheckpoint(Base):
+    """Resume position of a background worker (e.g. last Orthanc change seq)."""
+    __tablename__ = "worker_checkpoints"
+
+    name       = Column(String, primary_key=True)
+    position   = Column(String, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class OrphanStatusEnum(str, enum.Enum):
+    pending = "pending"   # seen in Orthanc without a DataFile, inside the grace period
+    orphan  = "orphan"    # still unrecorded after the grace period
+    deleted = "deleted"   # removed from Orthanc by the reconciler
+
+
+class OrthancOrphan(Base):
+    """An Orthanc instance with no DataFile row."""
+    __tablename__ = "orthanc_orphans"
+
+    orthanc_id    = Column(String, primary_key=True)
+    status        = Column(Enum(OrphanStatusEnum), nullable=False, default=OrphanStatusEnum.pending, index=True)
+    origin        = Column(String, nullable=True)   # Orthanc "Origin" metadata, e.g. RestApi
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at    = Column(DateTime(timezone=True), onupdate=func.now())
+
+class OrthancForwarded(Base):
+    """
+    An instance this service stored in Orthanc itself. Only these are ever
+    deleted as orphans; the entry is dropped once the instance is settled.
+    """
+    __tablename__ = "orthanc_forwarded"
+
+    orthanc_id   = Column(String, primary_key=True)
+    forwarded_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# ─── De-identification ─────────────────────────────────────────────────────────
+
+class DeidUidMapping(Base):
+    """Original → replacement UID, per project, for authorised re-identification."""
+    __tablename__ = "deid_uid_mappings"
+
+    id               = Column(Integer, primary_key=True, index=True)
+    project_id       = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    original_uid     = Column(String, nullable=False)
+    deidentified_uid = Column(String, nullable=False, index=True)
+    created_at       = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (UniqueConstraint("project_id", "original_uid"),)
+
+# ─── Integrity Scrubbing ───────────────────────────────────────────────────────
+
+class IntegrityIssueKindEnum(str, enum.Enum):
+    blob_missing         = "blob_missing"           # storage_path no longer on disk
+    checksum_mismatch    = "checksum_mismatch"      # blob SHA-256 differs from content_hash
+    orthanc_missing      = "orthanc_missing"        # Orthanc has no instance / attachment file
+    orthanc_md5_mismatch = "orthanc_md5_mismatch"   # Orthanc's verify-md5 failed
+
+
+class IntegrityIssue(Base):
+    """A problem found by the integrity scrubber; resolved when a later pass finds the file intact."""
+    __tablename__ = "integrity_issues"
+
+    id            = Column(Integer, primary_key=True, index=True)
+    datafile_id   = Column(Integer, ForeignKey("data_files.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind          = Column(Enum(IntegrityIssueKindEnum), nullable=False)
+    detail        = Column(Text, nullable=True)
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at  = Column(DateTime(timezone=True), server_default=func.now())
+    resolved_at   = Column(DateTime(timezone=True), nullable=True, index=True)
@@ -1,12 +1,81 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routers import auth, admin, patients, projects,datafiles
+from app.api.routers import auth, admin, patients, projects,datafiles, studies, dicomweb, uploads
 from app.db.database import async_session
 from app.db.models import Role
 from app.db.crud.crud_role import get_role_by_name
 from app.core.constants import DefaultRoles
+from app.core.security import shutdown_hash_pool
+from app.services.dicom import shutdown_parse_pool
+from app.services.orthanc import OrthancClient
+from app.services.ingest_queue import IngestQueue
+from app.services.previews import PreviewCache
+from app.services.resumable import ResumableUploads
+from app.services.reconcile import OrthancReconciler
+from app.services.storage import BlobCollector
+from app.services.login_throttle import LoginThrottle
+from app.services.scrub import IntegrityScrubber, shutdown_scrub_pool
+from app.services.upload_writer import shutdown_write_pool
+from app.services.deidentify import check_deidentify_settings, start_deid_pool, shutdown_deid_pool
+from app.services.transcode import start_transcode_pool, shutdown_transcode_pool
+
+
+# Seed default roles if they don't exist
+async def seed_roles():
+    async with async_session() as db:
+        missing = []
+        for role_name in (role.value for role in DefaultRoles):
+            if not await get_role_by_name(db, role_name):
+                missing.append(Role(name=role_name))
+        if missing:
+            for role in missing:
+                db.add(role)
+            await db.commit()
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_deidentify_settings()
+    start_deid_pool()
+    start_transcode_pool()
+    await seed_roles()
+    app.state.login_throttle = LoginThrottle()
+    # One pooled Orthanc client shared by every request
+    app.state.orthanc = OrthancClient()
+    app.state.previews = PreviewCache(app.state.orthanc)
+    await app.state.previews.start()
+    app.state.ingest_queue = IngestQueue(app.state.orthanc, app.state.previews)
+    await app.state.ingest_queue.start()
+    app.state.uploads = ResumableUploads(app.state.orthanc, app.state.previews)
+    await app.state.uploads.start()
+    app.state.reconciler = OrthancReconciler(app.state.orthanc)
+    await app.state.reconciler.start()
+    app.state.blob_collector = BlobCollector()
+    await app.state.blob_collector.start()
+    app.state.scrubber = IntegrityScrubber(app.state.orthanc)
+    await app.state.scrubber.start()
+    try:
+        yield
+    finally:
+        await app.state.scrubber.stop()
+        await app.state.blob_collector.stop()
+        await app.state.reconciler.stop()
+        await app.state.uploads.stop()
+        await app.state.ingest_queue.stop()
+        await app.state.previews.stop()
+        await app.state.orthanc.aclose()
+        await app.state.login_throttle.aclose()
+        shutdown_parse_pool()
+        shutdown_write_pool()
+        shutdown_deid_pool()
+        shutdown_transcode_pool()
+        shutdown_scrub_pool()
+        shutdown_hash_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS configuration (allow all for development)
 app.add_middleware(
@@ -22,20 +91,10 @@ app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(admin.router, prefix="/admin", tags=["admin"])
 app.include_router(patients.router)
 app.include_router(projects.router)
+app.include_router(uploads.router)
 app.include_router(datafiles.router)
-
-# Startup event: seed default roles if they don't exist
-@app.on_event("startup")
-async def seed_roles():
-    async with async_session() as db:
-        missing = []
-        for role_name in (role.value for role in DefaultRoles):
-            if not await get_role_by_name(db, role_name):
-                missing.append(Role(name=role_name))
-        if missing:
-            for role in missing:
-                db.add(role)
-            await db.commit()
+app.include_router(studies.router)
+app.include_router(dicomweb.router)
 
 if __name__ == "__main__":
     import uvicorn
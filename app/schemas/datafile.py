@@ -2,10 +2,11 @@
 
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 from app.db.models import (
     ModalityEnum, AccessLevelEnum,
-    BodyAreaEnum, FileTypeEnum
+    BodyAreaEnum, FileTypeEnum,
+    IngestJobStatusEnum,
 )
 
 class DataFileCreate(BaseModel):
@@ -32,7 +33,56 @@ class DataFileRead(BaseModel):
     file_type:         FileTypeEnum
     orthanc_id:        Optional[str]
     storage_path:      Optional[str]
+    sop_instance_uid:  Optional[str]
+    content_hash:      Optional[str]
+    series_id:         Optional[int]
+    instance_number:   Optional[int]
+    number_of_frames:  Optional[int]
     uploaded_at:       datetime
+    deidentified:      bool                    = False
+    original_transfer_syntax: Optional[str] = None
+    stored_transfer_syntax:   Optional[str] = None
+    original_size:            Optional[int] = None
+    stored_size:              Optional[int] = None
+    missing_in_orthanc_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class InstanceIngestResult(BaseModel):
+    filename:    Optional[str]
+    status_code: int
+    detail:      Optional[str]          = None
+    datafile:    Optional[DataFileRead] = None
+
+class BatchIngestRead(BaseModel):
+    accepted: int
+    rejected: int
+    results:  List[InstanceIngestResult]
+
+class IngestJobRead(BaseModel):
+    id:          int
+    status:      IngestJobStatusEnum
+    project_id:  int
+    filename:    Optional[str]
+    datafile_id: Optional[int]
+    status_code: Optional[int]
+    detail:      Optional[str]
+    created_at:  datetime
+    updated_at:  Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class UploadSessionRead(BaseModel):
+    id:            str
+    filename:      Optional[str]
+    upload_length: int
+    upload_offset: int
+    created_at:    datetime
+    expires_at:    datetime
 
     class Config:
         from_attributes = True
@@ -0,0 +1,17 @@
+# app/schemas/integrity.py
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+from app.db.models import IntegrityIssueKindEnum
+
+class IntegrityIssueRead(BaseModel):
+    id:            int
+    datafile_id:   int
+    kind:          IntegrityIssueKindEnum
+    detail:        Optional[str]
+    first_seen_at: datetime
+    last_seen_at:  datetime
+    resolved_at:   Optional[datetime]
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,15 @@
+# app/schemas/orthanc.py
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+from app.db.models import OrphanStatusEnum
+
+class OrthancOrphanRead(BaseModel):
+    orthanc_id:    str
+    status:        OrphanStatusEnum
+    origin:        Optional[str]
+    first_seen_at: datetime
+    updated_at:    Optional[datetime]
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,36 @@
+# app/schemas/study.py
+from pydantic import BaseModel
+from datetime import date, datetime
+from typing import Optional
+
+class StudyRead(BaseModel):
+    id:                  int
+    study_instance_uid:  str
+    project_id:          int
+    patient_id:          int
+    study_date:          Optional[date]
+    study_time:          Optional[str]
+    study_description:   Optional[str]
+    accession_number:    Optional[str]
+    dicom_patient_id:    Optional[str]
+    dicom_patient_name:  Optional[str]
+    number_of_series:    int
+    number_of_instances: int
+    created_at:          datetime
+
+    class Config:
+        from_attributes = True
+
+class SeriesRead(BaseModel):
+    id:                  int
+    series_instance_uid: str
+    study_id:            int
+    modality:            Optional[str]
+    series_number:       Optional[int]
+    series_description:  Optional[str]
+    body_part_examined:  Optional[str]
+    number_of_instances: int
+    created_at:          datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,74 @@
+# app/services/batch_form.py
+"""
+Multipart parsing for batch uploads. Starlette's parser keeps up to 1 MB of
+every file part in memory and has no per-part size limit; with thousands of
+parts that is gigabytes. Here file parts roll over to disk after a few KB,
+and a part over the upload limit stops being written and is reported as
+oversized, so only that part is rejected.
+"""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, NamedTuple
+
+from fastapi import HTTPException, Request, status
+from starlette.datastructures import FormData, UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+from app.services.upload_writer import size_limit
+
+
+class _LimitedPartParser(MultiPartParser):
+    spool_max_size = 16 * 1024
+
+    def __init__(self, *args, limit: int | None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.limit = limit
+        self.oversized: dict[int, int] = {}   # id(upload) → bytes received
+        self._part_bytes = 0
+
+    def on_part_begin(self) -> None:
+        super().on_part_begin()
+        self._part_bytes = 0
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        upload = self._current_part.file
+        if upload is None or self.limit is None:
+            return super().on_part_data(data, start, end)
+        self._part_bytes += end - start
+        if self._part_bytes > self.limit:
+            # keep parsing, but stop storing this part
+            self.oversized[id(upload)] = self._part_bytes
+            return
+        super().on_part_data(data, start, end)
+
+
+class BatchForm(NamedTuple):
+    form:      FormData
+    oversized: dict[int, int]   # id(upload) → bytes received, for parts over the limit
+
+    def received_size(self, upload: UploadFile) -> int | None:
+        """Bytes the client sent for `upload` (more than was kept if it was oversized)."""
+        return self.oversized.get(id(upload), upload.size)
+
+
+@asynccontextmanager
+async def batch_form(request: Request, kind: str, max_files: int) -> AsyncIterator[BatchForm]:
+    """Parse a multipart batch upload; the parts' temp files are closed on exit."""
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected a multipart/form-data body"
+        )
+    parser = _LimitedPartParser(
+        request.headers,
+        request.stream(),
+        max_files=max_files,
+        limit=size_limit(kind),
+    )
+    try:
+        form = await parser.parse()
+    except MultiPartException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    try:
+        yield BatchForm(form, parser.oversized)
+    finally:
+        await form.close()
@@ -0,0 +1,125 @@
+# app/services/deidentify.py
+"""
+DICOM de-identification stage for ingest. Files whose access level is in
+DEIDENTIFY_ACCESS_LEVELS are rewritten in a process pool according to
+DEIDENTIFY_PROFILE before they reach Orthanc. Replacement UIDs are derived
+from (salt, project, original UID), so every worker and every request maps a
+UID the same way without coordination; the pairs are also recorded per
+project for authorised re-identification.
+"""
+import hashlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, NamedTuple
+
+import pydicom
+from fastapi import HTTPException, UploadFile, status
+
+from app.core.config import settings, DEFAULT_DEIDENTIFY_SALT
+from app.schemas.datafile import DataFileCreate
+from app.services.dicom import extract_header_fields
+from app.services.rewrite import RewriteFailed, RewritePool, rewritten
+
+_deid_pool = RewritePool("De-identification")
+
+
+class DeidentifiedInstance(NamedTuple):
+    upload:  UploadFile       # the de-identified file, open for forwarding
+    fields:  dict             # header fields of the de-identified dataset
+    uid_map: dict[str, str]   # original UID → replacement UID
+
+
+def check_deidentify_settings() -> None:
+    """
+    Refuse to start with de-identification enabled but the public default
+    salt: pseudonyms and replacement UIDs could be reversed by hashing
+    candidate identifiers.
+    """
+    if settings.DEIDENTIFY_ACCESS_LEVELS and settings.DEIDENTIFY_UID_SALT in ("", DEFAULT_DEIDENTIFY_SALT):
+        raise RuntimeError(
+            "DEIDENTIFY_ACCESS_LEVELS is set but DEIDENTIFY_UID_SALT is not; "
+            "configure a secret salt before enabling de-identification"
+        )
+
+
+def needs_deidentification(df_in: DataFileCreate) -> bool:
+    return df_in.access_level.value in settings.DEIDENTIFY_ACCESS_LEVELS
+
+
+def deidentified_uid(project_id: int, uid: str, salt: str | None = None) -> str:
+    """Stable replacement for `uid` within a project."""
+    salt   = settings.DEIDENTIFY_UID_SALT if salt is None else salt
+    digest = hashlib.sha256(f"{salt}|{project_id}|{uid}".encode()).digest()
+    # 2.25.<128-bit integer>, as for UUID-derived UIDs (PS3.5 B.2)
+    return f"2.25.{int.from_bytes(digest[:16], 'big')}"
+
+
+def _pseudonym(salt: str, project_id: int, value: str) -> str:
+    digest = hashlib.sha256(f"{salt}|{project_id}|{value}".encode()).hexdigest()
+    return f"ANON-{digest[:16].upper()}"
+
+
+def deidentify_file(src: str, dst: str, profile: dict, project_id: int, salt: str) -> tuple[dict, dict]:
+    """
+    Apply `profile` to the DICOM file at `src` and write the result to
+    `dst`. Runs in a worker process. Returns the de-identified header
+    fields and the UID mapping used.
+    """
+    ds = pydicom.dcmread(src)
+    if profile.get("remove_private", True):
+        ds.remove_private_tags()
+
+    remove       = set(profile.get("remove", []))
+    replace      = profile.get("replace", {})
+    remap        = set(profile.get("remap_uids", []))
+    pseudonymize = set(profile.get("pseudonymize", []))
+    uid_map: dict[str, str] = {}
+
+    def remap_uid(uid: str) -> str:
+        if uid not in uid_map:
+            uid_map[uid] = deidentified_uid(project_id, uid, salt)
+        return uid_map[uid]
+
+    def apply(dataset, elem) -> None:
+        keyword = elem.keyword
+        if keyword in remove:
+            del dataset[elem.tag]
+        elif keyword in replace:
+            elem.value = replace[keyword]
+        elif keyword in remap and elem.value:
+            elem.value = [remap_uid(v) for v in elem.value] if elem.VM > 1 else remap_uid(elem.value)
+        elif keyword in pseudonymize and elem.value:
+            elem.value = _pseudonym(salt, project_id, str(elem.value))
+
+    ds.walk(apply)
+    ds.PatientIdentityRemoved = "YES"
+    ds.DeidentificationMethod = profile.get("name", "custom")
+    if "SOPInstanceUID" in ds:
+        ds.file_meta.MediaStorageSOPInstanceUID = ds.SOPInstanceUID
+    ds.save_as(dst)
+    return extract_header_fields(ds), uid_map
+
+
+@asynccontextmanager
+async def deidentified(upload: UploadFile, project_id: int) -> AsyncIterator[DeidentifiedInstance]:
+    """De-identify `upload` in the process pool and yield the result."""
+    try:
+        async with rewritten(
+            upload, _deid_pool, deidentify_file,
+            settings.DEIDENTIFY_PROFILE, project_id, settings.DEIDENTIFY_UID_SALT,
+        ) as out:
+            fields, uid_map = out.result
+            yield DeidentifiedInstance(out.upload, fields, uid_map)
+    except RewriteFailed as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"De-identification failed: {e}"
+        )
+
+
+def start_deid_pool() -> None:
+    if settings.DEIDENTIFY_ACCESS_LEVELS:
+        _deid_pool.start(settings.DEIDENTIFY_WORKERS)
+
+
+def shutdown_deid_pool() -> None:
+    _deid_pool.shutdown()
@@ -0,0 +1,158 @@
+# app/services/dicom.py
+import asyncio
+import io
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import AsyncIterator
+
+import pydicom
+from fastapi import UploadFile
+from pydicom.errors import BytesLengthException, InvalidDicomError
+from pydicom.filereader import read_partial
+from pydicom.misc import size_in_bytes
+from pydicom.tag import BaseTag, Tag
+
+from app.core.config import settings
+
+DICOM_PREAMBLE_LENGTH = 128
+DICOM_MAGIC           = b"DICM"
+
+# Elements larger than this are skipped rather than loaded while parsing
+DEFER_SIZE = "1 KB"
+
+# The data set tags extract_header_fields reads. Parsing keeps only these
+# and stops at the first tag past them, so large values further on
+# (PixelData, encapsulated documents, SR content) are never needed
+HEADER_KEYWORDS = (
+    "SpecificCharacterSet",
+    "StudyInstanceUID", "StudyDate", "StudyTime", "StudyDescription",
+    "AccessionNumber", "PatientID", "PatientName",
+    "SeriesInstanceUID", "SeriesNumber", "SeriesDescription", "Modality",
+    "BodyPartExamined", "SOPInstanceUID", "SOPClassUID", "InstanceNumber",
+    "NumberOfFrames",
+)
+_HEADER_TAGS     = [Tag(keyword) for keyword in HEADER_KEYWORDS]
+_LAST_HEADER_TAG = max(_HEADER_TAGS)
+
+# What pydicom raises when the bytes run out mid-element (zlib: deflated syntaxes)
+_EOF_ERRORS = (EOFError, OSError, struct.error, zlib.error, BytesLengthException)
+
+# Header parsing is CPU-bound; keep it off the event loop in a bounded pool
+_parse_pool = ThreadPoolExecutor(
+    max_workers=settings.DICOM_PARSE_WORKERS,
+    thread_name_prefix="dicom-parse",
+)
+
+
+class TruncatedHeaderError(InvalidDicomError):
+    """The prefix ended before the header did; more bytes are needed."""
+
+
+def _past_header(tag: BaseTag, vr: str | None, length: int) -> bool:
+    return tag > _LAST_HEADER_TAG
+
+
+def parse_dicom_prefix(prefix: bytes, complete: bool = False) -> pydicom.Dataset:
+    """
+    Validate the preamble and parse the header from the leading bytes of a
+    DICOM file: the file meta header and the HEADER_KEYWORDS tags, stopping
+    at the first tag past them. Other values are skipped, not read, so only
+    the prefix is held in memory. Unless `prefix` is the `complete` file, a
+    header that runs to (or past) its end raises TruncatedHeaderError:
+    pydicom would silently stop there. Any other parse error is an
+    InvalidDicomError.
+    """
+    magic_end = DICOM_PREAMBLE_LENGTH + len(DICOM_MAGIC)
+    if prefix[DICOM_PREAMBLE_LENGTH:magic_end] != DICOM_MAGIC:
+        raise InvalidDicomError("Missing DICM preamble")
+
+    fp = io.BytesIO(prefix)
+    try:
+        ds = read_partial(
+            fp,
+            _past_header,
+            defer_size=size_in_bytes(DEFER_SIZE),
+            specific_tags=_HEADER_TAGS,
+        )
+    except Exception as e:
+        # running out of bytes means the prefix was too short; any other
+        # error, or one inside the prefix, means the file itself is corrupt
+        if not complete and isinstance(e, _EOF_ERRORS) and fp.tell() >= len(prefix):
+            raise TruncatedHeaderError(str(e)) from e
+        raise InvalidDicomError(str(e)) from e
+    # stopping at the first tag past the header leaves the position at it, inside the prefix
+    if not complete and fp.tell() >= len(prefix):
+        raise TruncatedHeaderError("Header extends past the bytes read")
+    if "TransferSyntaxUID" not in ds.file_meta:
+        raise InvalidDicomError("Missing transfer syntax in file meta header")
+    return ds
+
+
+def _text(ds: pydicom.Dataset, keyword: str) -> str | None:
+    value = ds.get(keyword)
+    if value is None or value == "":
+        return None
+    return str(value).strip() or None
+
+def _int(ds: pydicom.Dataset, keyword: str) -> int | None:
+    try:
+        return int(ds.get(keyword))
+    except (TypeError, ValueError):
+        return None
+
+def _date(ds: pydicom.Dataset, keyword: str) -> date | None:
+    value = _text(ds, keyword)
+    try:
+        return datetime.strptime(value, "%Y%m%d").date() if value else None
+    except ValueError:
+        return None
+
+
+def extract_header_fields(ds: pydicom.Dataset) -> dict:
+    """
+    Pull the study/series/instance identifiers and descriptive tags we index
+    locally out of a parsed header. Missing or malformed tags become None.
+    """
+    return {
+        "study_instance_uid":  _text(ds, "StudyInstanceUID"),
+        "study_date":          _date(ds, "StudyDate"),
+        "study_time":          _text(ds, "StudyTime"),
+        "study_description":   _text(ds, "StudyDescription"),
+        "accession_number":    _text(ds, "AccessionNumber"),
+        "dicom_patient_id":    _text(ds, "PatientID"),
+        "dicom_patient_name":  _text(ds, "PatientName"),
+        "series_instance_uid": _text(ds, "SeriesInstanceUID"),
+        "series_number":       _int(ds, "SeriesNumber"),
+        "series_description":  _text(ds, "SeriesDescription"),
+        "series_modality":     _text(ds, "Modality"),
+        "body_part_examined":  _text(ds, "BodyPartExamined"),
+        "sop_instance_uid":    _text(ds, "SOPInstanceUID"),
+        "sop_class_uid":       _text(ds, "SOPClassUID"),
+        "instance_number":     _int(ds, "InstanceNumber"),
+        "number_of_frames":    _int(ds, "NumberOfFrames") or 1,
+        "transfer_syntax_uid": _text(getattr(ds, "file_meta", {}), "TransferSyntaxUID"),
+    }
+
+
+async def read_dicom_header(prefix: bytes, complete: bool = False) -> pydicom.Dataset:
+    """Run parse_dicom_prefix on the parse pool without blocking the loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_parse_pool, parse_dicom_prefix, prefix, complete)
+
+
+def shutdown_parse_pool() -> None:
+    _parse_pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def iter_upload(upload: UploadFile, hasher=None) -> AsyncIterator[bytes]:
+    """
+    Yield an upload chunk by chunk from its current position, feeding each
+    chunk to `hasher` if given. Peak memory is bounded by UPLOAD_CHUNK_SIZE
+    regardless of file size.
+    """
+    while chunk := await upload.read(settings.UPLOAD_CHUNK_SIZE):
+        if hasher is not None:
+            hasher.update(chunk)
+        yield chunk
@@ -0,0 +1,163 @@
+# app/services/dicomweb.py
+"""
+QIDO-RS helpers: map DICOM attributes onto the local study/series/instance
+index, turn query parameters into SQL conditions and rows into DICOM JSON.
+"""
+from datetime import date, datetime
+from typing import Any, Callable, NamedTuple
+
+from fastapi import HTTPException, status
+from pydicom.datadict import dictionary_VR, keyword_for_tag, tag_for_keyword
+from sqlalchemy import exists
+
+from app.db.models import DataFile, DicomSeries, DicomStudy
+
+# Query parameters that control the search rather than match attributes
+CONTROL_PARAMS = {"limit", "offset", "includefield", "fuzzymatching"}
+
+
+class Attribute(NamedTuple):
+    keyword: str
+    value:   Callable[[dict], Any]   # row context → value
+    column:  Any  = None             # column to match on, None = not matchable
+    default: bool = True             # returned without includefield
+
+
+STUDY_ATTRIBUTES = [
+    Attribute("StudyInstanceUID",              lambda r: r["study"].study_instance_uid, DicomStudy.study_instance_uid),
+    Attribute("StudyDate",                     lambda r: r["study"].study_date,         DicomStudy.study_date),
+    Attribute("StudyTime",                     lambda r: r["study"].study_time,         DicomStudy.study_time),
+    Attribute("AccessionNumber",               lambda r: r["study"].accession_number,   DicomStudy.accession_number),
+    Attribute("PatientName",                   lambda r: r["study"].dicom_patient_name, DicomStudy.dicom_patient_name),
+    Attribute("PatientID",                     lambda r: r["study"].dicom_patient_id,   DicomStudy.dicom_patient_id),
+    Attribute("ModalitiesInStudy",             lambda r: r["modalities"],               DicomSeries.modality),
+    Attribute("NumberOfStudyRelatedSeries",    lambda r: r["n_series"]),
+    Attribute("NumberOfStudyRelatedInstances", lambda r: r["n_instances"]),
+    Attribute("StudyDescription",              lambda r: r["study"].study_description,  DicomStudy.study_description, default=False),
+]
+
+SERIES_ATTRIBUTES = [
+    Attribute("StudyInstanceUID",               lambda r: r["study"].study_instance_uid),
+    Attribute("SeriesInstanceUID",              lambda r: r["series"].series_instance_uid, DicomSeries.series_instance_uid),
+    Attribute("Modality",                       lambda r: r["series"].modality,            DicomSeries.modality),
+    Attribute("SeriesNumber",                   lambda r: r["series"].series_number,       DicomSeries.series_number),
+    Attribute("NumberOfSeriesRelatedInstances", lambda r: r["n_instances"]),
+    Attribute("SeriesDescription",              lambda r: r["series"].series_description,  DicomSeries.series_description, default=False),
+    Attribute("BodyPartExamined",               lambda r: r["series"].body_part_examined,  DicomSeries.body_part_examined, default=False),
+]
+
+INSTANCE_ATTRIBUTES = [
+    Attribute("StudyInstanceUID",  lambda r: r["study"].study_instance_uid),
+    Attribute("SeriesInstanceUID", lambda r: r["series"].series_instance_uid),
+    Attribute("SOPClassUID",       lambda r: r["instance"].sop_class_uid,    DataFile.sop_class_uid),
+    Attribute("SOPInstanceUID",    lambda r: r["instance"].sop_instance_uid, DataFile.sop_instance_uid),
+    Attribute("InstanceNumber",    lambda r: r["instance"].instance_number,  DataFile.instance_number),
+    Attribute("NumberOfFrames",    lambda r: r["instance"].number_of_frames, DataFile.number_of_frames, default=False),
+]
+
+
+def _keyword(key: str) -> str:
+    """Accept either an attribute keyword or its 8-digit hex tag."""
+    if len(key) == 8:
+        try:
+            return keyword_for_tag(int(key, 16)) or key
+        except ValueError:
+            pass
+    return key
+
+
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def _parse_da(value: str) -> date:
+    try:
+        return datetime.strptime(value, "%Y%m%d").date()
+    except ValueError:
+        raise _bad_request(f"Invalid DA value: {value}")
+
+
+def _match(column, vr: str, value: str, fuzzy: bool):
+    """One QIDO matching condition for a column, following the VR rules."""
+    if vr == "DA":
+        if "-" not in value:
+            return column == _parse_da(value)
+        start, end = value.split("-", 1)
+        conditions = []
+        if start:
+            conditions.append(column >= _parse_da(start))
+        if end:
+            conditions.append(column <= _parse_da(end))
+        return conditions
+    if vr == "UI":
+        # UID list matching
+        return column.in_([v for v in value.replace("\\", ",").split(",") if v])
+    if vr in ("IS", "US", "UL"):
+        try:
+            return column == int(value)
+        except ValueError:
+            raise _bad_request(f"Invalid integer value: {value}")
+    if "*" in value or "?" in value or (vr == "PN" and fuzzy):
+        pattern = value.replace("*", "%").replace("?", "_")
+        if vr == "PN" and fuzzy and "%" not in pattern:
+            pattern += "%"
+        return column.ilike(pattern) if vr == "PN" else column.like(pattern)
+    return column == value
+
+
+def build_conditions(attributes: list[Attribute], query_params) -> tuple[list, list[Attribute]]:
+    """
+    Translate QIDO query parameters into SQL conditions, and work out which
+    attributes to return (defaults plus any includefield).
+    """
+    by_keyword = {a.keyword: a for a in attributes}
+    fuzzy      = query_params.get("fuzzymatching", "false").lower() == "true"
+    conditions = []
+    included   = {a.keyword for a in attributes if a.default}
+
+    for key, value in query_params.multi_items():
+        if key == "includefield":
+            for field in value.split(","):
+                if field == "all":
+                    included.update(by_keyword)
+                elif _keyword(field) in by_keyword:
+                    included.add(_keyword(field))
+            continue
+        if key in CONTROL_PARAMS or not value:
+            continue
+
+        attribute = by_keyword.get(_keyword(key))
+        if attribute is None or attribute.column is None:
+            # Unsupported matching keys are ignored, as QIDO-RS allows
+            continue
+        condition = _match(attribute.column, dictionary_VR(attribute.keyword), value, fuzzy)
+        if attribute.keyword == "ModalitiesInStudy":
+            condition = exists().where(DicomSeries.study_id == DicomStudy.id, condition)
+        if isinstance(condition, list):
+            conditions.extend(condition)
+        else:
+            conditions.append(condition)
+
+    return conditions, [a for a in attributes if a.keyword in included]
+
+
+def _json_value(vr: str, value):
+    if vr == "DA" and isinstance(value, date):
+        return value.strftime("%Y%m%d")
+    if vr == "PN":
+        return {"Alphabetic": str(value)}
+    return value
+
+
+def to_dicom_json(row: dict, attributes: list[Attribute]) -> dict:
+    """Render one result row as a DICOM JSON object."""
+    out = {}
+    for attribute in attributes:
+        vr    = dictionary_VR(attribute.keyword)
+        value = attribute.value(row)
+        element = {"vr": vr}
+        if value is not None and value != []:
+            values = value if isinstance(value, list) else [value]
+            element["Value"] = [_json_value(vr, v) for v in values]
+        out[f"{tag_for_keyword(attribute.keyword):08X}"] = element
+    return out
@@ -0,0 +1,94 @@
+# app/services/downloads.py
+"""
+Conditional file responses for anything served from local disk. Range and
+If-Range are handled by Starlette's FileResponse, which also hands the path
+to the server via the ASGI pathsend extension (sendfile) when supported.
+"""
+import os
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+
+# Leading bytes of the document types accepted at upload
+_SIGNATURES = (
+    (b"%PDF",              "application/pdf"),
+    (b"\xff\xd8\xff",       "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+)
+
+
+def _sniff(path: str) -> str:
+    with open(path, "rb") as f:
+        head = f.read(8)
+    for magic, media_type in _SIGNATURES:
+        if head.startswith(magic):
+            return media_type
+    return "application/octet-stream"
+
+
+async def sniff_media_type(path: str) -> str:
+    """Media type of a stored document; blob paths carry no extension."""
+    try:
+        return await run_in_threadpool(_sniff, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [t.strip() for t in if_none_match.split(",")]
+    # weak comparison, as RFC 9110 requires for If-None-Match
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def _not_modified_since(if_modified_since: str, mtime: float) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(mtime) <= since
+
+
+async def file_response(
+    request: Request,
+    path: str,
+    *,
+    etag_key: str | None = None,
+    media_type: str | None = None,
+    filename: str | None = None,
+    cache_control: str = "private, no-cache",
+) -> Response:
+    """
+    Serve `path` with ETag and Last-Modified, answering 304 when the
+    client's copy is current. `etag_key` (e.g. a content hash) makes the
+    ETag independent of the file's mtime.
+    """
+    try:
+        st = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    etag = f'"{etag_key}"' if etag_key else f'"{st.st_size:x}-{int(st.st_mtime):x}"'
+    headers = {
+        "ETag":          etag,
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+    }
+
+    if_none_match     = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if (if_none_match and _etag_matches(if_none_match, etag)) or (
+        not if_none_match and if_modified_since and _not_modified_since(if_modified_since, st.st_mtime)
+    ):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return FileResponse(
+        path,
+        media_type=media_type,
+        filename=filename,
+        content_disposition_type="inline",
+        headers=headers,
+        stat_result=st,
+    )
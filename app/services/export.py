@@ -0,0 +1,67 @@
+# app/services/export.py
+"""
+Incremental NDJSON / CSV encoding of the DataFile catalogue. Rows come from
+a server-side cursor in batches and each batch is encoded and yielded as
+one chunk, so memory is bounded by the batch size, not the table.
+"""
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator
+
+from app.core.config import settings
+from app.db.database import async_session
+from app.db.crud.crud_datafile import stream_datafile_rows
+from app.schemas.datafile import DataFileRead
+
+EXPORT_FIELDS = list(DataFileRead.model_fields)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv":    "text/csv; charset=utf-8",
+}
+
+
+def _encode_ndjson(batch) -> bytes:
+    return b"".join(
+        DataFileRead.model_validate(dict(row)).model_dump_json().encode() + b"\n"
+        for row in batch
+    )
+
+
+def _encode_csv(batch) -> bytes:
+    buf    = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_FIELDS)
+    for row in batch:
+        writer.writerow(DataFileRead.model_validate(dict(row)).model_dump(mode="json"))
+    return buf.getvalue().encode()
+
+
+async def export_datafiles(
+    fmt: str,
+    *,
+    filters: dict,
+    uploaded_from: datetime | None = None,
+    uploaded_to:   datetime | None = None,
+) -> AsyncIterator[bytes]:
+    """
+    Encoded export chunks. The generator opens its own session because it
+    runs while the response is being sent, after request dependencies have
+    been torn down.
+    """
+    if fmt == "csv":
+        buf = io.StringIO()
+        csv.DictWriter(buf, fieldnames=EXPORT_FIELDS).writeheader()
+        # header goes out before the query runs, so the first byte is immediate
+        yield buf.getvalue().encode()
+    encode = _encode_csv if fmt == "csv" else _encode_ndjson
+
+    async with async_session() as db:
+        async for batch in stream_datafile_rows(
+            db,
+            filters=filters,
+            uploaded_from=uploaded_from,
+            uploaded_to=uploaded_to,
+            batch_size=settings.EXPORT_BATCH_SIZE,
+        ):
+            yield encode(batch)
@@ -0,0 +1,240 @@
+# app/services/ingest.py
+import hashlib
+from contextlib import AsyncExitStack
+from typing import NamedTuple
+
+import pydicom
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db.crud.crud_datafile import (
+    create_datafile,
+    get_datafile_by_content_hash,
+    get_datafile_by_orthanc_id,
+    get_datafile_by_sop_instance_uid,
+)
+from app.db.crud.crud_study import get_or_create_series
+from app.db.crud.crud_deid import record_uid_mappings
+from app.db.crud.crud_reconcile import record_forwarded
+from app.db.database import async_session
+from app.db.models import DataFile, DicomSeries, FileTypeEnum
+from app.schemas.datafile import DataFileCreate
+from app.services.dicom import TruncatedHeaderError, read_dicom_header, iter_upload, extract_header_fields
+from app.services.deidentify import deidentified, deidentified_uid, needs_deidentification
+from app.services.transcode import transcoded, transcode_target
+from app.services.orthanc import OrthancClient
+from app.services.storage import store_upload
+from app.services.upload_writer import check_declared_size
+
+
+async def read_upload_header(upload: UploadFile) -> pydicom.Dataset:
+    """
+    Validate an uploaded DICOM instance from its leading bytes and return the
+    parsed header (the HEADER_KEYWORDS tags). A header longer than the
+    bytes read so far is read again with twice as many, up to
+    DICOM_HEADER_MAX_SIZE.
+    """
+    await upload.seek(0)
+    want   = settings.DICOM_HEADER_PREFIX_SIZE
+    prefix = await upload.read(want)
+    while True:
+        try:
+            return await read_dicom_header(prefix, complete=len(prefix) < want)
+        except TruncatedHeaderError:
+            if want >= settings.DICOM_HEADER_MAX_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"DICOM header exceeds {settings.DICOM_HEADER_MAX_SIZE} bytes"
+                )
+            prefix += await upload.read(want)
+            want   *= 2
+        except Exception:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Not a valid DICOM file"
+            )
+
+
+def instance_columns(fields: dict, series: DicomSeries | None) -> dict:
+    """DataFile columns taken from extracted header fields."""
+    return {
+        "sop_instance_uid": fields.get("sop_instance_uid"),
+        "sop_class_uid":    fields.get("sop_class_uid"),
+        "instance_number":  fields.get("instance_number"),
+        "number_of_frames": fields.get("number_of_frames"),
+        "series_id":        series.id if series else None,
+    }
+
+
+async def forward_dicom(upload: UploadFile, orthanc: OrthancClient) -> tuple[str, str]:
+    """
+    Stream a validated upload to Orthanc chunk by chunk, hashing it on the
+    way. Returns the Orthanc instance ID and the SHA-256 of the content.
+    The ID is noted as forwarded by us (in its own transaction, so it
+    survives a failed ingest) — the reconciler only ever deletes those.
+    """
+    await upload.seek(0)
+    hasher = hashlib.sha256()
+    orthanc_id = await orthanc.store_instance(
+        iter_upload(upload, hasher=hasher),
+        content_length=upload.size,
+    )
+    async with async_session() as db:
+        await record_forwarded(db, orthanc_id)
+        await db.commit()
+    return orthanc_id, hasher.hexdigest()
+
+
+class ForwardedInstance(NamedTuple):
+    orthanc_id:   str
+    content_hash: str
+    fields:       dict             # header fields of the instance as stored in Orthanc
+    columns:      dict             # extra DataFile columns
+    uid_map:      dict[str, str]   # de-identification UID mapping, if any
+
+
+def recorded_sop_uid(df_in: DataFileCreate, fields: dict) -> str | None:
+    """The SOPInstanceUID the DataFile will carry (replaced when de-identified)."""
+    sop_uid = fields.get("sop_instance_uid")
+    if sop_uid and needs_deidentification(df_in):
+        return deidentified_uid(df_in.project_id, sop_uid)
+    return sop_uid
+
+
+async def forward_instance(
+    upload: UploadFile,
+    df_in: DataFileCreate,
+    orthanc: OrthancClient,
+    fields: dict,
+) -> ForwardedInstance:
+    """
+    Forward a validated instance to Orthanc, de-identifying it first when
+    its access level requires it (and also storing the original when
+    DEIDENTIFY_KEEP_ORIGINAL is set), then transcoding it if configured.
+    """
+    columns = {
+        "original_transfer_syntax": fields.get("transfer_syntax_uid"),
+        "original_size":            upload.size,
+    }
+    stored, uid_map = upload, {}
+    async with AsyncExitStack() as stack:
+        if needs_deidentification(df_in):
+            deid = await stack.enter_async_context(deidentified(upload, df_in.project_id))
+            stored, fields, uid_map = deid.upload, deid.fields, deid.uid_map
+            columns["deidentified"] = True
+            if settings.DEIDENTIFY_KEEP_ORIGINAL:
+                columns["source_orthanc_id"], _ = await forward_dicom(upload, orthanc)
+
+        transfer_syntax = fields.get("transfer_syntax_uid")
+        if target := transcode_target(df_in):
+            stored, transfer_syntax = await stack.enter_async_context(
+                transcoded(stored, target, transfer_syntax)
+            )
+
+        orthanc_id, content_hash = await forward_dicom(stored, orthanc)
+        columns["stored_transfer_syntax"] = transfer_syntax
+        columns["stored_size"]            = stored.size
+    return ForwardedInstance(orthanc_id, content_hash, fields, columns, uid_map)
+
+
+async def find_recorded_datafile(
+    db: AsyncSession,
+    df_in: DataFileCreate,
+    upload: UploadFile,
+    content_hash: str,
+) -> DataFile | None:
+    """
+    The DataFile an earlier, interrupted run of the same upload already
+    recorded: one with the upload's content hash or, for a DICOM instance
+    stored rewritten (de-identified or transcoded), one with the SOP
+    Instance UID it was recorded under and the same original size.
+    """
+    df = await get_datafile_by_content_hash(db, df_in.project_id, content_hash)
+    if df or df_in.file_type is not FileTypeEnum.DICOM:
+        return df
+    fields  = extract_header_fields(await read_upload_header(upload))
+    sop_uid = recorded_sop_uid(df_in, fields)
+    df      = await get_datafile_by_sop_instance_uid(db, sop_uid) if sop_uid else None
+    if df and df.project_id == df_in.project_id and df.original_size == upload.size:
+        return df
+    return None
+
+
+async def ingest_file(
+    db: AsyncSession,
+    orthanc: OrthancClient,
+    df_in: DataFileCreate,
+    upload: UploadFile,
+) -> DataFile:
+    """
+    Dispatch based on file_type:
+      - DICOM → validate + forward to Orthanc, guard against duplicates
+      - else  → save locally
+    """
+    if df_in.file_type is FileTypeEnum.DICOM:
+        check_declared_size(upload.size, FileTypeEnum.DICOM.value)
+
+        # ─── 1) Validate preamble + header from the first chunk ─────────────
+        fields  = extract_header_fields(await read_upload_header(upload))
+        sop_uid = recorded_sop_uid(df_in, fields)
+
+        # ─── 2) Reject known instances before anything goes to Orthanc ──────
+        if sop_uid and await get_datafile_by_sop_instance_uid(db, sop_uid):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="This DICOM instance has already been recorded locally"
+            )
+
+        # ─── 3) De-identify / transcode as configured, stream to Orthanc ────
+        forwarded  = await forward_instance(upload, df_in, orthanc, fields)
+        orthanc_id = forwarded.orthanc_id
+
+        # ─── 4) App-level guard against duplicate orthanc_id in our DB ──────
+        existing = await get_datafile_by_orthanc_id(db, orthanc_id)
+        if existing:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="This DICOM instance has already been recorded locally"
+            )
+
+        # ─── 5) Persist to our DB, translating any race-condition errors ────
+        try:
+            series = await get_or_create_series(
+                db,
+                forwarded.fields,
+                project_id=df_in.project_id,
+                patient_id=df_in.patient_id,
+            )
+            await record_uid_mappings(db, df_in.project_id, forwarded.uid_map)
+            df = await create_datafile(
+                db,
+                df_in,
+                orthanc_id=orthanc_id,
+                storage_path=None,
+                content_hash=forwarded.content_hash,
+                **forwarded.columns,
+                **instance_columns(forwarded.fields, series),
+            )
+        except IntegrityError:
+            # in case a race slipped through
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Duplicate datafile record"
+            )
+
+        return df
+
+    # ─── Generic file (PDF, JPG, etc.) ────────────────────────────────────
+    stored = await store_upload(upload, df_in.file_type.value)
+
+    # No Orthanc step—just record `storage_path` to the shared blob
+    df = await create_datafile(
+        db,
+        df_in,
+        orthanc_id=None,
+        storage_path=stored.path,
+        content_hash=stored.sha256,
+    )
+    return df
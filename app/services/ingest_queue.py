@@ -0,0 +1,173 @@
+# app/services/ingest_queue.py
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException, UploadFile, status
+
+from app.core.config import settings
+from app.db.database import async_session
+from app.db.crud.crud_ingest_job import (
+    claim_ingest_job,
+    create_ingest_job,
+    get_stale_job_ids,
+    get_unfinished_job_ids,
+    update_ingest_job,
+)
+from app.db.models import DataFile, IngestJob, IngestJobStatusEnum
+from app.schemas.datafile import DataFileCreate
+from app.services.ingest import find_recorded_datafile, ingest_file
+from app.services.orthanc import OrthancClient
+from app.services.previews import PreviewCache
+from app.services.upload_writer import write_upload
+
+logger = logging.getLogger(__name__)
+
+SPOOL_DIR = os.path.join("uploads", "spool")
+os.makedirs(SPOOL_DIR, exist_ok=True)
+
+
+class IngestQueue:
+    """
+    Background ingest: uploads are spooled to disk and recorded as IngestJob
+    rows, then a fixed pool of worker tasks validates, forwards and records
+    them. Job ids are queued in memory; the rows are the source of truth.
+    A worker claims a job atomically before running it; unfinished jobs are
+    queued again on startup and jobs whose claim outlived INGEST_JOB_LEASE
+    (their worker died) are re-queued periodically.
+    """
+
+    def __init__(
+        self,
+        orthanc: OrthancClient,
+        previews: PreviewCache,
+        workers: int = settings.INGEST_WORKERS,
+    ) -> None:
+        self._orthanc  = orthanc
+        self._previews = previews
+        self._workers = workers
+        self._queue: asyncio.Queue[int] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        async with async_session() as db:
+            for job_id in await get_unfinished_job_ids(db):
+                self._queue.put_nowait(job_id)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"ingest-worker-{i}")
+            for i in range(self._workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._requeue_stale(), name="ingest-requeue"))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(
+        self,
+        db,
+        df_in: DataFileCreate,
+        upload: UploadFile,
+        submitted_by_user_id: int | None,
+    ) -> IngestJob:
+        """Spool the upload, create its job row and queue it."""
+        spool_path = os.path.join(SPOOL_DIR, uuid.uuid4().hex)
+        hasher     = hashlib.sha256()
+        await write_upload(upload, spool_path, kind=df_in.file_type.value, hasher=hasher)
+        job = await create_ingest_job(
+            db,
+            df_in,
+            filename=upload.filename,
+            spool_path=spool_path,
+            content_hash=hasher.hexdigest(),
+            submitted_by_user_id=submitted_by_user_id,
+        )
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception("Ingest job %s crashed", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _requeue_stale(self) -> None:
+        while True:
+            await asyncio.sleep(settings.INGEST_JOB_LEASE / 2)
+            try:
+                async with async_session() as db:
+                    for job_id in await get_stale_job_ids(db, self._lease_cutoff()):
+                        logger.warning("Ingest job %s was abandoned; retrying", job_id)
+                        self._queue.put_nowait(job_id)
+            except Exception:
+                logger.exception("Requeueing stale ingest jobs failed")
+
+    @staticmethod
+    def _lease_cutoff() -> datetime:
+        return datetime.now(timezone.utc) - timedelta(seconds=settings.INGEST_JOB_LEASE)
+
+    async def _ingest(self, job: IngestJob, df_in: DataFileCreate, upload: UploadFile) -> DataFile:
+        """Ingest the upload; on a retry, a 409 for what the last attempt recorded counts as done."""
+        async with async_session() as db:
+            try:
+                return await ingest_file(db, self._orthanc, df_in, upload)
+            except HTTPException as e:
+                if e.status_code != status.HTTP_409_CONFLICT or job.attempts < 2 or not job.content_hash:
+                    raise
+            df = await find_recorded_datafile(db, df_in, upload, job.content_hash)
+            if df is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="This file has already been recorded by another upload"
+                )
+            return df
+
+    async def _run(self, job_id: int) -> None:
+        async with async_session() as db:
+            job = await claim_ingest_job(db, job_id, datetime.now(timezone.utc), self._lease_cutoff())
+            if job is None:
+                # finished, or being run by another worker
+                return
+            df_in      = DataFileCreate.model_validate(job.params)
+            spool_path = job.spool_path
+
+        outcome = {}
+        try:
+            with open(spool_path, "rb") as f:
+                upload = UploadFile(f, size=os.path.getsize(spool_path), filename=job.filename)
+                df = await self._ingest(job, df_in, upload)
+            self._previews.schedule(df)
+            outcome = dict(
+                status=IngestJobStatusEnum.succeeded,
+                datafile_id=df.id,
+                status_code=status.HTTP_201_CREATED,
+            )
+        except HTTPException as e:
+            outcome = dict(status=IngestJobStatusEnum.failed, status_code=e.status_code, detail=str(e.detail))
+        except FileNotFoundError:
+            outcome = dict(
+                status=IngestJobStatusEnum.failed,
+                status_code=status.HTTP_410_GONE,
+                detail="Spooled upload is missing",
+            )
+        except Exception as e:
+            logger.exception("Ingest job %s failed", job_id)
+            outcome = dict(
+                status=IngestJobStatusEnum.failed,
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Ingest failed unexpectedly",
+            )
+
+        if os.path.exists(spool_path):
+            os.remove(spool_path)
+        async with async_session() as db:
+            await update_ingest_job(db, job_id, spool_path=None, **outcome)
@@ -0,0 +1,193 @@
+# app/services/login_throttle.py
+"""
+Login throttling with token buckets keyed by email and by client IP. Each
+attempt takes a token from both buckets before any password hashing or
+database work; a success gives them back, a failure keeps them spent. An
+empty email bucket is the lockout threshold: only then is a lock written
+to the user row. Buckets live in memory, or in Redis
+(LOGIN_THROTTLE_REDIS_URL, needs the optional `redis` package) when
+several workers must share them.
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+
+class Bucket(NamedTuple):
+    key:      str
+    capacity: float
+    rate:     float   # tokens regained per second
+
+
+def _refill(tokens: float, ts: float, bucket: Bucket, now: float) -> float:
+    return min(bucket.capacity, tokens + (now - ts) * bucket.rate)
+
+
+class MemoryBackend:
+    """Per-process buckets; the least recently used are dropped past `max_keys`."""
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        self._state: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def _level(self, bucket: Bucket, now: float) -> float:
+        tokens, ts = self._state.get(bucket.key, (bucket.capacity, now))
+        return _refill(tokens, ts, bucket, now)
+
+    def _set(self, key: str, tokens: float, now: float) -> None:
+        self._state[key] = (tokens, now)
+        self._state.move_to_end(key)
+        while len(self._state) > self.max_keys:
+            self._state.popitem(last=False)
+
+    async def take(self, buckets: list[Bucket], now: float) -> float:
+        levels = [self._level(b, now) for b in buckets]
+        wait = max((1 - level) / b.rate for b, level in zip(buckets, levels))
+        if wait > 0:
+            return wait
+        for b, level in zip(buckets, levels):
+            self._set(b.key, level - 1, now)
+        return 0.0
+
+    async def give(self, buckets: list[Bucket], now: float) -> None:
+        for b in buckets:
+            self._set(b.key, min(b.capacity, self._level(b, now) + 1), now)
+
+    async def level(self, bucket: Bucket, now: float) -> float:
+        return self._level(bucket, now)
+
+    async def reset(self, key: str) -> None:
+        self._state.pop(key, None)
+
+    async def aclose(self) -> None:
+        pass
+
+
+# Same algorithm as MemoryBackend.take, atomic across workers.
+# KEYS: bucket keys; ARGV: now, then capacity and rate per key.
+_TAKE = """
+local now, wait, levels = tonumber(ARGV[1]), 0, {}
+for i, key in ipairs(KEYS) do
+  local cap, rate = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+  local state = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(state[1]) or cap
+  local ts = tonumber(state[2]) or now
+  levels[i] = math.min(cap, tokens + (now - ts) * rate)
+  if levels[i] < 1 then wait = math.max(wait, (1 - levels[i]) / rate) end
+end
+if wait > 0 then return tostring(wait) end
+for i, key in ipairs(KEYS) do
+  local cap, rate = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+  redis.call('HSET', key, 'tokens', tostring(levels[i] - 1), 'ts', ARGV[1])
+  redis.call('EXPIRE', key, math.ceil(cap / rate) + 1)
+end
+return '0'
+"""
+
+_GIVE = """
+local now = tonumber(ARGV[1])
+for i, key in ipairs(KEYS) do
+  local cap, rate = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+  local state = redis.call('HMGET', key, 'tokens', 'ts')
+  if state[1] then
+    local tokens = math.min(cap, tonumber(state[1]) + (now - tonumber(state[2])) * rate + 1)
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', ARGV[1])
+  end
+end
+return 0
+"""
+
+
+class RedisBackend:
+    """Buckets shared by every worker through Redis hashes, updated by Lua scripts."""
+
+    def __init__(self, url: str) -> None:
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("LOGIN_THROTTLE_REDIS_URL is set but the 'redis' package is not installed")
+        self._redis = redis.from_url(url)
+        self._take  = self._redis.register_script(_TAKE)
+        self._give  = self._redis.register_script(_GIVE)
+
+    @staticmethod
+    def _args(buckets: list[Bucket], now: float) -> list:
+        return [now, *(v for b in buckets for v in (b.capacity, b.rate))]
+
+    async def take(self, buckets: list[Bucket], now: float) -> float:
+        keys = [b.key for b in buckets]
+        return float(await self._take(keys=keys, args=self._args(buckets, now)))
+
+    async def give(self, buckets: list[Bucket], now: float) -> None:
+        await self._give(keys=[b.key for b in buckets], args=self._args(buckets, now))
+
+    async def level(self, bucket: Bucket, now: float) -> float:
+        tokens, ts = await self._redis.hmget(bucket.key, "tokens", "ts")
+        if tokens is None:
+            return bucket.capacity
+        return _refill(float(tokens), float(ts), bucket, now)
+
+    async def reset(self, key: str) -> None:
+        await self._redis.delete(key)
+
+    async def aclose(self) -> None:
+        await self._redis.aclose()
+
+
+class LoginThrottle:
+    """
+    acquire() before checking credentials, then exactly one of
+    succeeded(), failed() or release() once the outcome is known.
+    """
+
+    def __init__(self) -> None:
+        if settings.LOGIN_THROTTLE_REDIS_URL:
+            self._backend = RedisBackend(settings.LOGIN_THROTTLE_REDIS_URL)
+        else:
+            self._backend = MemoryBackend(settings.LOGIN_THROTTLE_MAX_KEYS)
+
+    @staticmethod
+    def _email(email: str) -> Bucket:
+        return Bucket(
+            f"login:email:{email.strip().lower()}",
+            settings.LOGIN_EMAIL_BURST,
+            1 / settings.LOGIN_EMAIL_REFILL_SECONDS,
+        )
+
+    @staticmethod
+    def _ip(ip: str | None) -> Bucket:
+        return Bucket(
+            f"login:ip:{ip or 'unknown'}",
+            settings.LOGIN_IP_BURST,
+            1 / settings.LOGIN_IP_REFILL_SECONDS,
+        )
+
+    async def acquire(self, email: str, ip: str | None) -> None:
+        """Take one attempt from both buckets, or answer 429 if either is empty."""
+        wait = await self._backend.take([self._email(email), self._ip(ip)], time.time())
+        if wait > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts, please retry later",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    async def succeeded(self, email: str, ip: str | None) -> None:
+        await self._backend.reset(self._email(email).key)
+        await self._backend.give([self._ip(ip)], time.time())
+
+    async def failed(self, email: str, ip: str | None) -> bool:
+        """Keep the attempt spent; True once the email's bucket is empty (lockout threshold)."""
+        return await self._backend.level(self._email(email), time.time()) < 1
+
+    async def release(self, email: str, ip: str | None) -> None:
+        """Give the attempt back when it neither failed nor completed (e.g. TOTP still needed)."""
+        await self._backend.give([self._email(email), self._ip(ip)], time.time())
+
+    async def aclose(self) -> None:
+        await self._backend.aclose()
@@ -0,0 +1,351 @@
+# app/services/orthanc.py
+import asyncio
+import logging
+import time
+from typing import AsyncIterable
+
+import httpx
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.services.resilience import CircuitBreaker, CircuitOpen, LatencyHistogram, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+# Upstream statuses worth retrying on an idempotent call
+RETRY_STATUSES = {502, 503, 504}
+# Orthanc error code reported when an attachment fails its MD5 check
+ORTHANC_CORRUPTED_FILE = 20
+
+
+class OrthancClient:
+    """
+    Thin wrapper around one pooled httpx.AsyncClient talking to Orthanc.
+    A single instance is created by the app lifespan and shared by all
+    routers, so connections are kept alive between requests.
+
+    Every call goes through `_send`, which applies the call's timeout
+    budget, retries idempotent calls with jittered backoff, trips a circuit
+    breaker after repeated upstream failures (then answers 503 at once) and
+    records latency per operation.
+    """
+
+    def __init__(self) -> None:
+        self._client = httpx.AsyncClient(
+            base_url=settings.ORTHANC_URL,
+            auth=(settings.ORTHANC_USERNAME, settings.ORTHANC_PASSWORD),
+            limits=httpx.Limits(
+                max_connections=settings.ORTHANC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ORTHANC_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.ORTHANC_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                settings.ORTHANC_TIMEOUT,
+                connect=settings.ORTHANC_CONNECT_TIMEOUT,
+                pool=settings.ORTHANC_POOL_TIMEOUT,
+            ),
+        )
+        self.breaker = CircuitBreaker(
+            settings.ORTHANC_BREAKER_THRESHOLD, settings.ORTHANC_BREAKER_RESET
+        )
+        self.metrics = LatencyHistogram()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def metrics_snapshot(self) -> dict:
+        return {"circuit": self.breaker.state, "operations": self.metrics.snapshot()}
+
+    async def _send(
+        self,
+        op: str,
+        method: str,
+        url: str,
+        *,
+        budget: float,
+        idempotent: bool,
+        stream: bool = False,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Send one logical call. `budget` caps the time spent across all
+        attempts and backoff, and every phase timeout of an attempt is
+        clipped to what is left of it. Responses are returned whatever
+        their status; transport failures become 502/504, an open circuit
+        503.
+        """
+        deadline = time.monotonic() + budget
+        attempt  = 0
+        while True:
+            attempt  += 1
+            remaining = deadline - time.monotonic()
+            try:
+                probe = self.breaker.before_call()
+            except CircuitOpen as e:
+                self.metrics.count(op, "rejected")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Orthanc unavailable (circuit open)",
+                    headers={"Retry-After": str(max(1, round(e.retry_after)))},
+                )
+
+            timeout = httpx.Timeout(
+                min(settings.ORTHANC_TIMEOUT, remaining),
+                connect=min(settings.ORTHANC_CONNECT_TIMEOUT, remaining),
+                pool=min(settings.ORTHANC_POOL_TIMEOUT, remaining),
+            )
+            started = time.monotonic()
+            try:
+                request = self._client.build_request(method, url, timeout=timeout, **kwargs)
+                resp    = await self._client.send(request, stream=stream)
+            except httpx.PoolTimeout:
+                # local congestion, not an Orthanc failure
+                if probe:
+                    self.breaker.release()
+                self.metrics.observe(op, time.monotonic() - started, "pool_timeout")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many concurrent Orthanc requests",
+                )
+            except httpx.HTTPError as e:
+                self.breaker.record_failure()
+                outcome = "timeout" if isinstance(e, httpx.TimeoutException) else "error"
+                self.metrics.observe(op, time.monotonic() - started, outcome)
+                delay = self._retry_delay(op, attempt, deadline) if idempotent else None
+                if delay is None:
+                    logger.warning("Orthanc %s failed: %r", op, e)
+                    raise HTTPException(
+                        status_code=(
+                            status.HTTP_504_GATEWAY_TIMEOUT if outcome == "timeout"
+                            else status.HTTP_502_BAD_GATEWAY
+                        ),
+                        detail="Orthanc unreachable",
+                    )
+            except BaseException:
+                # cancelled (client gone, task cancelled) or a local error:
+                # no verdict on Orthanc, but don't leave the probe slot taken
+                if probe:
+                    self.breaker.release()
+                raise
+            else:
+                elapsed = time.monotonic() - started
+                if resp.status_code < 500:
+                    self.breaker.record_success()
+                    self.metrics.observe(op, elapsed, "ok")
+                    return resp
+                self.breaker.record_failure()
+                self.metrics.observe(op, elapsed, f"http_{resp.status_code}")
+                delay = (
+                    self._retry_delay(op, attempt, deadline)
+                    if idempotent and resp.status_code in RETRY_STATUSES
+                    else None
+                )
+                if delay is None:
+                    return resp
+                await resp.aclose()
+
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, op: str, attempt: int, deadline: float) -> float | None:
+        """Backoff before the next attempt, or None if it would not fit."""
+        if attempt > settings.ORTHANC_RETRIES:
+            return None
+        delay = backoff_delay(attempt, settings.ORTHANC_BACKOFF_BASE, settings.ORTHANC_BACKOFF_MAX)
+        if time.monotonic() + delay >= deadline:
+            return None
+        self.metrics.count(op, "retry")
+        return delay
+
+    async def store_instance(
+        self,
+        content: bytes | AsyncIterable[bytes],
+        content_length: int | None = None,
+    ) -> str:
+        """POST a DICOM instance to /instances and return its Orthanc ID."""
+        headers = {"Content-Type": "application/dicom"}
+        if content_length is not None:
+            # A known length avoids chunked transfer-encoding towards Orthanc
+            headers["Content-Length"] = str(content_length)
+
+        # Storing is idempotent in Orthanc, but a streamed body cannot be replayed
+        resp = await self._send(
+            "store_instance", "POST", "/instances",
+            budget=settings.ORTHANC_STORE_BUDGET,
+            idempotent=isinstance(content, bytes),
+            content=content,
+            headers=headers,
+        )
+
+        # Catch an Orthanc‐side conflict
+        if resp.status_code == status.HTTP_409_CONFLICT:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="This DICOM instance already exists in Orthanc"
+            )
+        if resp.status_code != status.HTTP_200_OK:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Orthanc error {resp.status_code}: {resp.text}"
+            )
+
+        try:
+            orthanc_id = resp.json().get("ID")
+        except ValueError:
+            orthanc_id = None
+        if not orthanc_id:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Orthanc did not return an instance ID"
+            )
+        return orthanc_id
+
+    async def open_instance_file(
+        self,
+        orthanc_id: str,
+        range_header: str | None = None,
+        transcode: str | None = None,
+    ) -> httpx.Response:
+        """
+        Start streaming GET /instances/{id}/file, transcoded by Orthanc to
+        the `transcode` transfer syntax if given. The caller must consume the
+        body with aiter_raw() and close the response.
+        """
+        # Bodies are relayed raw (byte ranges refer to the file), so they must not be encoded
+        headers = {"Accept-Encoding": "identity"}
+        if range_header:
+            headers["Range"] = range_header
+        params  = {"transcode": transcode} if transcode else {}
+        resp = await self._send(
+            "open_instance_file", "GET", f"/instances/{orthanc_id}/file",
+            budget=settings.ORTHANC_READ_BUDGET,
+            idempotent=True,
+            stream=True,
+            headers=headers,
+            params=params,
+        )
+
+        if resp.status_code in (status.HTTP_200_OK, status.HTTP_206_PARTIAL_CONTENT):
+            return resp
+        await resp.aclose()
+        if resp.status_code == status.HTTP_404_NOT_FOUND:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Instance not found in Orthanc"
+            )
+        if resp.status_code == status.HTTP_416_RANGE_NOT_SATISFIABLE:
+            raise HTTPException(
+                status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+                detail="Requested range not satisfiable"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Orthanc error {resp.status_code}"
+        )
+
+    @staticmethod
+    def _json(resp: httpx.Response):
+        if resp.status_code != status.HTTP_200_OK:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Orthanc error {resp.status_code}"
+            )
+        try:
+            return resp.json()
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Orthanc returned invalid JSON"
+            )
+
+    async def get_changes(self, since: int, limit: int) -> dict:
+        """One page of the change feed: {"Changes": [...], "Done": bool, "Last": seq}."""
+        resp = await self._send(
+            "get_changes", "GET", "/changes",
+            budget=settings.ORTHANC_READ_BUDGET,
+            idempotent=True,
+            params={"since": since, "limit": limit},
+        )
+        return self._json(resp)
+
+    async def get_last_change(self) -> int:
+        """Sequence number of the newest entry in the change feed."""
+        resp = await self._send(
+            "get_changes", "GET", "/changes",
+            budget=settings.ORTHANC_READ_BUDGET,
+            idempotent=True,
+            params={"last": ""},
+        )
+        return int(self._json(resp).get("Last", 0))
+
+    async def instance_exists(self, orthanc_id: str) -> bool:
+        resp = await self._send(
+            "instance_exists", "GET", f"/instances/{orthanc_id}",
+            budget=settings.ORTHANC_READ_BUDGET,
+            idempotent=True,
+        )
+        if resp.status_code == status.HTTP_404_NOT_FOUND:
+            return False
+        if resp.status_code != status.HTTP_200_OK:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Orthanc error {resp.status_code}"
+            )
+        return True
+
+    async def get_instance_origin(self, orthanc_id: str) -> str | None:
+        """The instance's "Origin" metadata (RestApi, DicomProtocol, …); None if it is gone."""
+        resp = await self._send(
+            "get_instance_origin", "GET", f"/instances/{orthanc_id}/metadata/Origin",
+            budget=settings.ORTHANC_READ_BUDGET,
+            idempotent=True,
+        )
+        if resp.status_code == status.HTTP_404_NOT_FOUND:
+            return None
+        if resp.status_code != status.HTTP_200_OK:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Orthanc error {resp.status_code}"
+            )
+        return resp.text
+
+    async def verify_instance_md5(self, orthanc_id: str) -> bool | None:
+        """
+        Have Orthanc re-check the stored file against its recorded MD5.
+        True if intact, False if corrupted, None if the instance or its
+        file is gone.
+        """
+        resp = await self._send(
+            "verify_instance_md5", "POST", f"/instances/{orthanc_id}/attachments/dicom/verify-md5",
+            budget=settings.ORTHANC_READ_BUDGET,
+            idempotent=True,
+        )
+        if resp.status_code == status.HTTP_200_OK:
+            return True
+        if resp.status_code == status.HTTP_404_NOT_FOUND:
+            return None
+        try:
+            orthanc_status = resp.json().get("OrthancStatus")
+        except ValueError:
+            orthanc_status = None
+        if orthanc_status == ORTHANC_CORRUPTED_FILE:
+            return False
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Orthanc error {resp.status_code}"
+        )
+
+    async def delete_instance(self, orthanc_id: str) -> bool:
+        """DELETE an instance; False if it was already gone."""
+        resp = await self._send(
+            "delete_instance", "DELETE", f"/instances/{orthanc_id}",
+            budget=settings.ORTHANC_READ_BUDGET,
+            idempotent=True,
+        )
+        if resp.status_code == status.HTTP_404_NOT_FOUND:
+            return False
+        if resp.status_code != status.HTTP_200_OK:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Orthanc error {resp.status_code}"
+            )
+        return True
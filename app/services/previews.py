@@ -0,0 +1,225 @@
+# app/services/previews.py
+"""
+Pre-rendered previews: a downsampled, windowed image per DataFile, rendered
+in a process pool and kept in a size-bounded on-disk cache with LRU
+eviction. Misses are rendered lazily on request.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+import pydicom
+from PIL import Image
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.models import DataFile, FileTypeEnum
+from app.services.orthanc import OrthancClient
+from app.services.rewrite import RewritePool
+from app.services.wado import iter_response
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_MEDIA_TYPES = {"webp": "image/webp", "png": "image/png"}
+
+
+# ─── Pixel work (runs in worker processes) ──────────────────────────────────
+
+def _first(value):
+    """WindowCenter/Width may be multi-valued; use the first."""
+    if isinstance(value, pydicom.multival.MultiValue):
+        return float(value[0])
+    return float(value)
+
+
+def _window(pixels: np.ndarray, ds: pydicom.Dataset) -> np.ndarray:
+    """Apply rescale and VOI windowing, returning uint8 pixels."""
+    pixels = pixels.astype(np.float32, copy=False)
+    slope     = float(ds.get("RescaleSlope", 1) or 1)
+    intercept = float(ds.get("RescaleIntercept", 0) or 0)
+    if slope != 1 or intercept != 0:
+        pixels = pixels * slope + intercept
+
+    if "WindowCenter" in ds and "WindowWidth" in ds:
+        center, width = _first(ds.WindowCenter), max(_first(ds.WindowWidth), 1.0)
+        low, high = center - width / 2, center + width / 2
+    else:
+        # No stored window: stretch the central 99% of intensities
+        low, high = np.percentile(pixels, (0.5, 99.5))
+        if high <= low:
+            high = low + 1
+
+    out = np.clip((pixels - low) * (255.0 / (high - low)), 0, 255).astype(np.uint8)
+    if ds.get("PhotometricInterpretation") == "MONOCHROME1":
+        out = 255 - out
+    return out
+
+
+def _dicom_image(src_path: str) -> Image.Image:
+    ds     = pydicom.dcmread(src_path)
+    pixels = ds.pixel_array
+    frames = int(ds.get("NumberOfFrames", 1) or 1)
+    color  = int(ds.get("SamplesPerPixel", 1)) > 1
+    if frames > 1:
+        pixels = pixels[frames // 2]   # middle frame
+
+    if color:
+        if ds.get("PhotometricInterpretation", "").startswith("YBR"):
+            pixels = pydicom.pixels.convert_color_space(pixels, ds.PhotometricInterpretation, "RGB")
+        return Image.fromarray(pixels.astype(np.uint8), mode="RGB")
+    return Image.fromarray(_window(pixels, ds), mode="L")
+
+
+def render_preview(src_path: str, dst_path: str, is_dicom: bool, max_size: int, fmt: str) -> int:
+    """Render `src_path` into a preview at `dst_path`; returns its size in bytes."""
+    image = _dicom_image(src_path) if is_dicom else Image.open(src_path)
+    image.thumbnail((max_size, max_size), Image.Resampling.BILINEAR)
+    if image.mode not in ("L", "RGB"):
+        image = image.convert("RGB")
+
+    tmp_path = f"{dst_path}.tmp{os.getpid()}"
+    image.save(tmp_path, format=fmt.upper())
+    os.replace(tmp_path, dst_path)
+    return os.path.getsize(dst_path)
+
+
+# ─── Cache ──────────────────────────────────────────────────────────────────
+
+class PreviewCache:
+    """
+    Previews live under PREVIEW_CACHE_DIR, sharded by id. Recency is tracked
+    in memory (seeded from mtimes at startup) so file stats stay stable for
+    ETags; the least recently used previews are evicted over the size cap.
+    """
+
+    def __init__(self, orthanc: OrthancClient) -> None:
+        self._orthanc  = orthanc
+        self._dir      = settings.PREVIEW_CACHE_DIR
+        self._fmt      = settings.PREVIEW_FORMAT
+        self._pool     = RewritePool("Preview")
+        self._lru: OrderedDict[str, int] = OrderedDict()
+        self._bytes    = 0
+        self._inflight: dict[int, asyncio.Task] = {}
+        self._background: set[asyncio.Task] = set()
+        os.makedirs(self._dir, exist_ok=True)
+
+    @property
+    def media_type(self) -> str:
+        return PREVIEW_MEDIA_TYPES[self._fmt]
+
+    async def start(self) -> None:
+        self._pool.start(settings.PREVIEW_WORKERS)
+        self._load_index()
+
+    async def stop(self) -> None:
+        for task in self._background:
+            task.cancel()
+        self._pool.shutdown()
+
+    def _load_index(self) -> None:
+        entries = []
+        for root, _, files in os.walk(self._dir):
+            for name in files:
+                if ".tmp" in name:
+                    continue
+                st = os.stat(os.path.join(root, name))
+                entries.append((st.st_mtime, os.path.join(root, name), st.st_size))
+        for _, path, size in sorted(entries):
+            self._lru[path] = size
+            self._bytes += size
+
+    def path_for(self, df: DataFile) -> str:
+        return os.path.join(self._dir, f"{df.id % 256:02x}", f"{df.id}.{self._fmt}")
+
+    def supports(self, df: DataFile) -> bool:
+        return df.file_type in (FileTypeEnum.DICOM, FileTypeEnum.JPG)
+
+    async def get(self, df: DataFile) -> str:
+        """Path of the preview for `df`, rendering it on a miss."""
+        path = self.path_for(df)
+        if path in self._lru and os.path.exists(path):
+            self._lru.move_to_end(path)
+            return path
+        return await self._render_once(df)
+
+    def schedule(self, df: DataFile) -> None:
+        """Render a preview in the background, e.g. right after ingest."""
+        if not self.supports(df):
+            return
+        task = asyncio.create_task(self._render_quietly(df))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _render_quietly(self, df: DataFile) -> None:
+        try:
+            await self._render_once(df)
+        except Exception:
+            logger.warning("Preview rendering failed for DataFile %s", df.id, exc_info=True)
+
+    async def _render_once(self, df: DataFile) -> str:
+        # Collapse concurrent misses for the same file into one render
+        task = self._inflight.get(df.id)
+        if task is None:
+            task = asyncio.create_task(self._render(df))
+            self._inflight[df.id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(df.id, None))
+        return await asyncio.shield(task)
+
+    async def _render(self, df: DataFile) -> str:
+        path = self.path_for(df)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        loop = asyncio.get_running_loop()
+
+        if df.file_type is FileTypeEnum.DICOM:
+            src = await self._fetch_instance(df.orthanc_id)
+            try:
+                size = await loop.run_in_executor(
+                    self._pool.executor, render_preview, src, path, True, settings.PREVIEW_MAX_SIZE, self._fmt,
+                )
+            finally:
+                os.remove(src)
+        else:
+            size = await loop.run_in_executor(
+                self._pool.executor, render_preview, df.storage_path, path, False, settings.PREVIEW_MAX_SIZE, self._fmt,
+            )
+
+        self._bytes += size - self._lru.pop(path, 0)
+        self._lru[path] = size
+        evicted = self._evict()
+        if evicted:
+            await run_in_threadpool(_remove_all, evicted)
+        return path
+
+    async def _fetch_instance(self, orthanc_id: str) -> str:
+        """Stream an instance from Orthanc into a temporary file for the pool."""
+        fd, tmp_path = tempfile.mkstemp(suffix=".dcm")
+        try:
+            # wrap the fd first, so it is closed however the fetch ends
+            with os.fdopen(fd, "wb") as f:
+                resp = await self._orthanc.open_instance_file(orthanc_id)
+                async for chunk in iter_response(resp):
+                    await run_in_threadpool(f.write, chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return tmp_path
+
+    def _evict(self) -> list[str]:
+        """Drop least recently used entries over the cap; returns their paths."""
+        evicted = []
+        while self._bytes > settings.PREVIEW_CACHE_MAX_BYTES and len(self._lru) > 1:
+            path, size = self._lru.popitem(last=False)
+            self._bytes -= size
+            evicted.append(path)
+        return evicted
+
+
+def _remove_all(paths: list[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
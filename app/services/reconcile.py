@@ -0,0 +1,144 @@
+# app/services/reconcile.py
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.db.database import async_session
+from app.db.crud.crud_datafile import get_referenced_orthanc_ids
+from app.db.crud.crud_reconcile import (
+    get_checkpoint,
+    set_checkpoint,
+    add_orphan_candidates,
+    forget_orphans,
+    list_expired_candidates,
+    update_orphan,
+    get_forwarded_ids,
+    forget_forwarded,
+    mark_missing_in_orthanc,
+    clear_missing_in_orthanc,
+)
+from app.db.models import OrphanStatusEnum
+from app.services.orthanc import OrthancClient
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT = "orthanc_changes"
+# Orthanc's "Origin" metadata for instances stored through the REST API (by us or
+# any other REST client); deletion also requires an orthanc_forwarded entry
+REST_API_ORIGIN = "RestApi"
+
+
+class OrthancReconciler:
+    """
+    Keeps data_files and Orthanc in step by tailing Orthanc's /changes feed
+    from a persisted checkpoint instead of scanning the archive:
+      - NewInstance without a DataFile → pending orphan candidate
+      - Deleted instance with a DataFile → missing_in_orthanc_at is set
+    Candidates still unrecorded after ORTHANC_ORPHAN_GRACE (an upload whose
+    DB commit failed after the Orthanc POST) become orphans; those this
+    service forwarded itself (orthanc_forwarded) are deleted from Orthanc
+    when ORTHANC_DELETE_ORPHANS is set, the rest are only flagged. On the
+    first run the feed is picked up at its current end, not replayed.
+    """
+
+    def __init__(self, orthanc: OrthancClient) -> None:
+        self._orthanc = orthanc
+        self._task: asyncio.Task | None = None
+        # the poll loop and on-demand runs must not interleave
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._loop(), name="orthanc-reconciler")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except HTTPException as e:
+                logger.warning("Orthanc reconciliation skipped: %s", e.detail)
+            except Exception:
+                logger.exception("Orthanc reconciliation failed")
+            await asyncio.sleep(settings.ORTHANC_RECONCILE_INTERVAL)
+
+    async def run_once(self) -> None:
+        async with self._lock:
+            await self._tail_changes()
+            await self._settle_candidates()
+
+    async def _tail_changes(self) -> None:
+        """Apply change-feed pages; each page and its checkpoint commit together."""
+        async with async_session() as db:
+            checkpoint = await get_checkpoint(db, CHECKPOINT)
+            if checkpoint is None:
+                # first run: history predating this service is not ours to judge
+                await set_checkpoint(db, CHECKPOINT, str(await self._orthanc.get_last_change()))
+                await db.commit()
+                return
+            since = int(checkpoint)
+
+        while True:
+            page    = await self._orthanc.get_changes(since, settings.ORTHANC_CHANGES_BATCH)
+            changes = page.get("Changes", [])
+            created, deleted = set(), set()
+            for change in changes:
+                if change.get("ResourceType") != "Instance":
+                    continue
+                orthanc_id = change["ID"]
+                # the latest change for an instance wins
+                if change["ChangeType"] == "NewInstance":
+                    created.add(orthanc_id)
+                    deleted.discard(orthanc_id)
+                elif change["ChangeType"] == "Deleted":
+                    deleted.add(orthanc_id)
+                    created.discard(orthanc_id)
+
+            last = int(page.get("Last", since))
+            async with async_session() as db:
+                recorded = await get_referenced_orthanc_ids(db, list(created))
+                await add_orphan_candidates(db, created - recorded)
+                await clear_missing_in_orthanc(db, recorded)
+                await mark_missing_in_orthanc(db, deleted, datetime.now(timezone.utc))
+                await forget_orphans(db, deleted)
+                await forget_forwarded(db, recorded | deleted)
+                await set_checkpoint(db, CHECKPOINT, str(last))
+                await db.commit()
+
+            since = last
+            if page.get("Done", True) or not changes:
+                return
+
+    async def _settle_candidates(self) -> None:
+        """Decide on candidates whose grace period is over."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.ORTHANC_ORPHAN_GRACE)
+        async with async_session() as db:
+            candidates = await list_expired_candidates(db, cutoff, settings.ORTHANC_CHANGES_BATCH)
+            for orthanc_id in candidates:
+                # re-check each one right before acting on it
+                if await get_referenced_orthanc_ids(db, [orthanc_id]):
+                    await forget_orphans(db, {orthanc_id})
+                    await forget_forwarded(db, {orthanc_id})
+                    await db.commit()
+                    continue
+
+                origin    = await self._orthanc.get_instance_origin(orthanc_id)
+                forwarded = bool(await get_forwarded_ids(db, {orthanc_id}))
+                if origin is None:
+                    await forget_orphans(db, {orthanc_id})
+                    await forget_forwarded(db, {orthanc_id})
+                elif settings.ORTHANC_DELETE_ORPHANS and forwarded and origin == REST_API_ORIGIN:
+                    await self._orthanc.delete_instance(orthanc_id)
+                    await update_orphan(db, orthanc_id, status=OrphanStatusEnum.deleted, origin=origin)
+                    await forget_forwarded(db, {orthanc_id})
+                    logger.info("Deleted orphaned Orthanc instance %s", orthanc_id)
+                else:
+                    await update_orphan(db, orthanc_id, status=OrphanStatusEnum.orphan, origin=origin)
+                await db.commit()
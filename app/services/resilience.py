@@ -0,0 +1,110 @@
+# app/services/resilience.py
+"""
+Small building blocks for calling flaky upstreams: a consecutive-failure
+circuit breaker, full-jitter exponential backoff and in-process latency
+histograms. Everything here runs on the event loop, so no locking.
+"""
+import bisect
+import random
+import time
+from collections import defaultdict
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling the upstream while the breaker is open."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"circuit open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    closed    → calls pass; `threshold` consecutive failures open it
+    open      → calls fail fast until `reset_timeout` has elapsed
+    half-open → one probe call passes; success closes, failure re-opens
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float) -> None:
+        self.threshold     = threshold
+        self.reset_timeout = reset_timeout
+        self._failures     = 0
+        self._opened_at: float | None = None
+        self._probing      = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """Admit a call or raise CircuitOpen; True if the call is the half-open probe."""
+        state = self.state
+        if state == "open":
+            raise CircuitOpen(self.reset_timeout - (time.monotonic() - self._opened_at))
+        if state == "half-open":
+            if self._probing:
+                raise CircuitOpen(self.reset_timeout)
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures  = 0
+        self._opened_at = None
+        self._probing   = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self.threshold:
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self) -> None:
+        """End a half-open probe that neither succeeded nor failed upstream."""
+        self._probing = False
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (1-based)."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class LatencyHistogram:
+    """Per-operation latency buckets (seconds) and outcome counters."""
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self) -> None:
+        self._counts   = defaultdict(lambda: [0] * (len(self.BUCKETS) + 1))
+        self._sums     = defaultdict(float)
+        self._outcomes = defaultdict(lambda: defaultdict(int))
+
+    def observe(self, op: str, seconds: float, outcome: str) -> None:
+        self._counts[op][bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self._sums[op] += seconds
+        self._outcomes[op][outcome] += 1
+
+    def count(self, op: str, outcome: str) -> None:
+        """Record an outcome that has no latency (rejections, retries)."""
+        self._outcomes[op][outcome] += 1
+
+    def snapshot(self) -> dict:
+        """Cumulative bucket counts per operation, Prometheus-style ("le")."""
+        ops = {}
+        for op in set(self._counts) | set(self._outcomes):
+            counts = self._counts[op]
+            cumulative, buckets = 0, {}
+            for bound, n in zip([*map(str, self.BUCKETS), "+Inf"], counts):
+                cumulative += n
+                buckets[bound] = cumulative
+            ops[op] = {
+                "count":       cumulative,
+                "sum_seconds": round(self._sums[op], 6),
+                "buckets":     buckets,
+                "outcomes":    dict(self._outcomes[op]),
+            }
+        return ops
@@ -0,0 +1,202 @@
+# app/services/resumable.py
+import asyncio
+import logging
+import os
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.exc import InvalidRequestError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.database import async_session, try_advisory_lock
+from app.db.crud.crud_upload_session import (
+    create_upload_session,
+    get_upload_session,
+    update_upload_session,
+    delete_upload_session,
+    list_expired_upload_sessions,
+)
+from app.db.models import DataFile, UploadSession
+from app.schemas.datafile import DataFileCreate
+from app.services.ingest import ingest_file
+from app.services.orthanc import OrthancClient
+from app.services.previews import PreviewCache
+from app.services.upload_writer import check_declared_size, write_stream
+
+logger = logging.getLogger(__name__)
+
+PART_DIR = os.path.join("uploads", "parts")
+os.makedirs(PART_DIR, exist_ok=True)
+
+
+def _expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS)
+
+
+def _touch(path: str) -> None:
+    open(path, "wb").close()
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ResumableUploads:
+    """
+    tus-style resumable uploads: a session is created with the final length,
+    chunks are appended at the current offset, and once complete the part
+    file is handed to the same ingest dispatch as POST /files. Idle sessions
+    are swept after UPLOAD_SESSION_TTL_SECONDS. A PATCH, finalize, abort or
+    sweep holds the session's advisory lock, so they never interleave, even
+    across workers.
+    """
+
+    def __init__(self, orthanc: OrthancClient, previews: PreviewCache) -> None:
+        self._orthanc  = orthanc
+        self._previews = previews
+        self._gc_task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._gc_task = asyncio.create_task(self._gc_loop(), name="upload-session-gc")
+
+    async def stop(self) -> None:
+        if self._gc_task:
+            self._gc_task.cancel()
+            await asyncio.gather(self._gc_task, return_exceptions=True)
+            self._gc_task = None
+
+    async def create(
+        self,
+        db,
+        df_in: DataFileCreate,
+        *,
+        upload_length: int,
+        filename: str | None,
+        owner_user_id: int | None,
+    ) -> UploadSession:
+        check_declared_size(upload_length, df_in.file_type.value)
+        session_id = uuid.uuid4().hex
+        part_path  = os.path.join(PART_DIR, session_id)
+        await run_in_threadpool(_touch, part_path)
+        return await create_upload_session(
+            db,
+            df_in,
+            session_id=session_id,
+            filename=filename,
+            part_path=part_path,
+            upload_length=upload_length,
+            expires_at=_expiry(),
+            owner_user_id=owner_user_id,
+        )
+
+    async def get(self, db, session_id: str, user_id: int | None) -> UploadSession:
+        """Fetch a session owned by `user_id`; anything else is a 404."""
+        session = await get_upload_session(db, session_id)
+        if not session or session.owner_user_id != user_id:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        return session
+
+    @asynccontextmanager
+    async def _claimed(self, db, session: UploadSession) -> AsyncIterator[None]:
+        """
+        Hold the session's lock, or 409 if another request holds it. The
+        session is re-read under the lock, so its offset is current.
+        """
+        async with try_advisory_lock(f"upload_session:{session.id}") as taken:
+            if not taken:
+                raise HTTPException(status_code=409, detail="Upload session is busy")
+            try:
+                await db.refresh(session)
+            except InvalidRequestError:
+                # finalized or aborted while we waited for the lock
+                raise HTTPException(status_code=404, detail="Upload session not found")
+            yield
+
+    async def append(
+        self,
+        db,
+        session: UploadSession,
+        offset: int,
+        chunks: AsyncIterator[bytes],
+    ) -> int:
+        """
+        Append a chunk at `offset` and return the new offset. If the client
+        drops mid-chunk, whatever reached disk still counts, so the next
+        HEAD reports where to resume.
+        """
+        async with self._claimed(db, session):
+            if offset != session.upload_offset:
+                raise HTTPException(status_code=409, detail="Upload-Offset does not match")
+            try:
+                await write_stream(
+                    chunks,
+                    session.part_path,
+                    limit=session.upload_length,
+                    append=True,
+                    already_written=session.upload_offset,
+                )
+            finally:
+                new_offset = await run_in_threadpool(os.path.getsize, session.part_path)
+                await update_upload_session(
+                    db, session.id, upload_offset=new_offset, expires_at=_expiry()
+                )
+        return new_offset
+
+    async def finalize(self, db, session: UploadSession) -> DataFile:
+        """Ingest a complete upload. The session is kept only on a 5xx, so it can be retried."""
+        session_id, part_path = session.id, session.part_path
+        async with self._claimed(db, session):
+            if session.upload_offset != session.upload_length:
+                raise HTTPException(status_code=409, detail="Upload is incomplete")
+            df_in = DataFileCreate.model_validate(session.params)
+            upload_length, filename = session.upload_length, session.filename
+            try:
+                f = await run_in_threadpool(open, part_path, "rb")
+                try:
+                    upload = UploadFile(f, size=upload_length, filename=filename)
+                    df = await ingest_file(db, self._orthanc, df_in, upload)
+                finally:
+                    await run_in_threadpool(f.close)
+            except HTTPException as e:
+                if e.status_code < 500:
+                    await db.rollback()
+                    await self._discard(db, session_id, part_path)
+                raise
+            await self._discard(db, session_id, part_path)
+        self._previews.schedule(df)
+        return df
+
+    async def abort(self, db, session: UploadSession) -> None:
+        async with self._claimed(db, session):
+            await self._discard(db, session.id, session.part_path)
+
+    async def _discard(self, db, session_id: str, part_path: str) -> None:
+        await run_in_threadpool(_remove, part_path)
+        await delete_upload_session(db, session_id)
+
+    async def _sweep(self, db, session: UploadSession) -> None:
+        """Discard an expired session unless a request holds it or has just extended it."""
+        session_id, part_path = session.id, session.part_path
+        try:
+            async with self._claimed(db, session):
+                if await delete_upload_session(db, session_id, expired_before=datetime.now(timezone.utc)):
+                    await run_in_threadpool(_remove, part_path)
+        except HTTPException:
+            pass   # busy or already gone
+
+    async def _gc_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.UPLOAD_SESSION_GC_INTERVAL)
+            try:
+                async with async_session() as db:
+                    for session in await list_expired_upload_sessions(db, datetime.now(timezone.utc)):
+                        await self._sweep(db, session)
+            except Exception:
+                logger.exception("Upload session sweep failed")
@@ -0,0 +1,106 @@
+# app/services/rewrite.py
+"""
+Shared plumbing for the ingest stages that rewrite a DICOM upload in a
+worker process (de-identification, transcoding): spool the upload to a temp
+file, run the rewrite in a process pool and reopen its output for
+forwarding. Pools are created and shut down by the app lifespan.
+"""
+import asyncio
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, NamedTuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.services.upload_writer import write_upload
+
+REWRITE_TMP_DIR = os.path.join("uploads", "rewrite")
+os.makedirs(REWRITE_TMP_DIR, exist_ok=True)
+
+
+class RewritePool:
+    """
+    A process pool started by the app lifespan. Workers come from a
+    forkserver: forking the server itself, which already runs several
+    thread pools, can deadlock.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._executor: ProcessPoolExecutor | None = None
+
+    def start(self, workers: int) -> None:
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            raise RuntimeError(f"{self.name} pool not started")
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+class RewriteFailed(Exception):
+    """The rewrite function raised (or its worker died); the cause is chained."""
+
+
+class Rewritten(NamedTuple):
+    upload: UploadFile | None   # the rewritten file, open for forwarding; None if none was written
+    result: Any                 # what the rewrite function returned
+
+
+def _remove(*paths: str) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+@asynccontextmanager
+async def rewritten(
+    upload: UploadFile,
+    pool: RewritePool,
+    fn: Callable[..., Any],
+    *args: Any,
+) -> AsyncIterator[Rewritten]:
+    """
+    Spool `upload`, run `fn(src, dst, *args)` in `pool` and yield its
+    result with `dst` reopened. A failure of `fn` is raised as
+    RewriteFailed; temp files are removed on exit.
+    """
+    name = uuid.uuid4().hex
+    src  = os.path.join(REWRITE_TMP_DIR, f"{name}.src")
+    dst  = os.path.join(REWRITE_TMP_DIR, f"{name}.dcm")
+    try:
+        await upload.seek(0)
+        await write_upload(upload, src, kind="dicom")
+        loop     = asyncio.get_running_loop()
+        executor = pool.executor
+        try:
+            result = await loop.run_in_executor(executor, fn, src, dst, *args)
+        except Exception as e:
+            raise RewriteFailed(str(e)) from e
+        try:
+            f = await run_in_threadpool(open, dst, "rb")
+        except FileNotFoundError:
+            yield Rewritten(None, result)
+            return
+        try:
+            size = await run_in_threadpool(os.path.getsize, dst)
+            yield Rewritten(UploadFile(f, size=size, filename=upload.filename), result)
+        finally:
+            await run_in_threadpool(f.close)
+    finally:
+        await run_in_threadpool(_remove, src, dst)
@@ -0,0 +1,177 @@
+# app/services/scrub.py
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import RowMapping
+
+from app.core.config import settings
+from app.db.database import async_session, try_advisory_lock
+from app.db.crud.crud_integrity import list_scrub_rows, sync_issues
+from app.db.crud.crud_reconcile import get_checkpoint, set_checkpoint
+from app.db.models import IntegrityIssueKindEnum as Kind
+from app.services.orthanc import OrthancClient
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT = "integrity_scrub"
+# When the last full pass finished, so the next worker to hold the lock
+# does not start another one before INTEGRITY_SCRUB_PASS_INTERVAL is up
+PASSED     = "integrity_scrub_passed"
+
+# One thread of its own, so scrub reads never occupy the threads serving requests
+_scrub_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="integrity-scrub")
+
+
+class _IOBudget:
+    """Byte-rate limiter: spend() sleeps once more than `rate` bytes/s has been used."""
+
+    def __init__(self, rate: int) -> None:
+        self.rate    = rate
+        self._tokens = float(rate)
+        self._last   = time.monotonic()
+
+    async def spend(self, n: int) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._last) * self.rate) - n
+        self._last   = now
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+def _open(path: str):
+    f = open(path, "rb")
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    return f
+
+
+def _read_into(f, hasher, size: int) -> int:
+    chunk = f.read(size)
+    hasher.update(chunk)
+    if not chunk and hasattr(os, "posix_fadvise"):
+        # done with this file: don't leave it crowding hot pages out of the cache
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    return len(chunk)
+
+
+class IntegrityScrubber:
+    """
+    Low-priority background check of everything data_files points at. Rows
+    are walked in id order from a persisted checkpoint; local blobs are
+    re-hashed against content_hash and Orthanc is asked to verify each
+    instance's MD5. All reads are paced by INTEGRITY_SCRUB_BYTES_PER_SECOND
+    (Orthanc instances are charged their recorded size), so a pass is slow
+    by design. Findings are kept in integrity_issues and resolved once a
+    later pass finds the file intact. On an Orthanc error the batch stops
+    and resumes from the checkpoint after INTEGRITY_SCRUB_RETRY_INTERVAL.
+    Every worker runs a scrubber, but batches only run under an advisory
+    lock, so one worker scrubs at a time.
+    """
+
+    def __init__(self, orthanc: OrthancClient) -> None:
+        self._orthanc = orthanc
+        self._budget  = _IOBudget(settings.INTEGRITY_SCRUB_BYTES_PER_SECOND)
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if settings.INTEGRITY_SCRUB_ENABLED:
+            self._task = asyncio.create_task(self._loop(), name="integrity-scrubber")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            # another worker holds the lock: look again after the retry interval
+            delay = settings.INTEGRITY_SCRUB_RETRY_INTERVAL
+            try:
+                async with try_advisory_lock(CHECKPOINT) as taken:
+                    if taken:
+                        delay = settings.INTEGRITY_SCRUB_PASS_INTERVAL if await self.run_batch() else 0
+            except HTTPException as e:
+                logger.warning("Integrity scrub paused: %s", e.detail)
+                delay = settings.INTEGRITY_SCRUB_RETRY_INTERVAL
+            except Exception:
+                logger.exception("Integrity scrub failed")
+                delay = settings.INTEGRITY_SCRUB_RETRY_INTERVAL
+            await asyncio.sleep(delay)
+
+    async def run_batch(self) -> bool:
+        """
+        Check the next batch of files; True when a full pass has just
+        completed or the next one is not due yet.
+        """
+        now = datetime.now(timezone.utc)
+        async with async_session() as db:
+            after = int(await get_checkpoint(db, CHECKPOINT) or 0)
+            passed = None if after else await get_checkpoint(db, PASSED)
+            due    = now - timedelta(seconds=settings.INTEGRITY_SCRUB_PASS_INTERVAL)
+            if passed and datetime.fromisoformat(passed) > due:
+                return True
+            rows = await list_scrub_rows(db, after, settings.INTEGRITY_SCRUB_BATCH)
+
+        if not rows:
+            async with async_session() as db:
+                await set_checkpoint(db, CHECKPOINT, "0")
+                await set_checkpoint(db, PASSED, now.isoformat())
+                await db.commit()
+            if after:
+                logger.info("Integrity scrub pass complete")
+            return True
+
+        for row in rows:
+            found = await self._check(row)
+            async with async_session() as db:
+                await sync_issues(db, row["id"], found, datetime.now(timezone.utc))
+                await set_checkpoint(db, CHECKPOINT, str(row["id"]))
+                await db.commit()
+            if found:
+                logger.warning("Integrity issues for file %s: %s", row["id"], ", ".join(k.value for k in found))
+        return False
+
+    async def _check(self, row: RowMapping) -> dict[Kind, str]:
+        found = {}
+        if row["storage_path"]:
+            digest = await self._hash_blob(row["storage_path"])
+            if digest is None:
+                found[Kind.blob_missing] = row["storage_path"]
+            elif row["content_hash"] and digest != row["content_hash"]:
+                found[Kind.checksum_mismatch] = f"expected {row['content_hash']}, got {digest}"
+        if row["orthanc_id"]:
+            await self._budget.spend(row["stored_size"] or row["original_size"] or settings.UPLOAD_CHUNK_SIZE)
+            intact = await self._orthanc.verify_instance_md5(row["orthanc_id"])
+            if intact is None:
+                found[Kind.orthanc_missing] = row["orthanc_id"]
+            elif not intact:
+                found[Kind.orthanc_md5_mismatch] = row["orthanc_id"]
+        return found
+
+    async def _hash_blob(self, path: str) -> str | None:
+        """SHA-256 of a local blob read at the budgeted rate; None if it is missing."""
+        loop = asyncio.get_running_loop()
+        try:
+            f = await loop.run_in_executor(_scrub_pool, _open, path)
+        except FileNotFoundError:
+            return None
+        try:
+            hasher = hashlib.sha256()
+            while n := await loop.run_in_executor(
+                _scrub_pool, _read_into, f, hasher, settings.UPLOAD_CHUNK_SIZE
+            ):
+                await self._budget.spend(n)
+            return hasher.hexdigest()
+        finally:
+            await loop.run_in_executor(_scrub_pool, f.close)
+
+
+def shutdown_scrub_pool() -> None:
+    _scrub_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,125 @@
+# app/services/storage.py
+"""
+Content-addressed storage for non-DICOM files. Each blob is named by the
+SHA-256 of its content and placed in two levels of sharded directories
+(uploads/blobs/ab/cd/abcd…), so identical uploads share one file and no
+directory grows past a few thousand entries. Blobs are not reference
+counted: BlobCollector removes those no row points at any more.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.database import async_session
+from app.db.crud.crud_blob import register_blob, list_unreferenced_blobs, lock_unreferenced_blob
+from app.services.upload_writer import write_upload
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = os.path.join("uploads", "blobs")
+# Partial writes live next to the blobs so the final rename stays on one filesystem
+BLOB_TMP_DIR = os.path.join(BLOB_DIR, "tmp")
+os.makedirs(BLOB_TMP_DIR, exist_ok=True)
+
+
+class StoredFile(NamedTuple):
+    path:   str
+    sha256: str
+    size:   int
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(BLOB_DIR, sha256[:2], sha256[2:4], sha256)
+
+
+def _place_blob(tmp_path: str, sha256: str) -> str:
+    """Move a fully written temp file to its blob path, or drop it if known."""
+    path = blob_path(sha256)
+    if os.path.exists(path):
+        # identical content already stored
+        os.remove(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+    return path
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def store_upload(upload: UploadFile, kind: str) -> StoredFile:
+    """
+    Store an upload in the blob store. The content is hashed while it is
+    written; `kind` selects the size limit. The blob row is registered
+    (committed on its own) before the file is placed, so content whose
+    referencing row never commits is still found and collected later.
+    """
+    hasher   = hashlib.sha256()
+    tmp_path = os.path.join(BLOB_TMP_DIR, uuid.uuid4().hex)
+    size     = await write_upload(upload, tmp_path, kind=kind, hasher=hasher)
+    digest   = hasher.hexdigest()
+    try:
+        async with async_session() as db:
+            await register_blob(db, digest, blob_path(digest), size, datetime.now(timezone.utc))
+            await db.commit()
+    except BaseException:
+        await run_in_threadpool(_remove, tmp_path)
+        raise
+    path = await run_in_threadpool(_place_blob, tmp_path, digest)
+    return StoredFile(path=path, sha256=digest, size=size)
+
+
+class BlobCollector:
+    """
+    Periodically removes blobs that no DataFile, patient, user or pending
+    registration references and that have not been stored again within
+    BLOB_GC_GRACE. Each blob is re-checked and deleted under a row lock,
+    which a concurrent store of the same content waits for.
+    """
+
+    def __init__(self) -> None:
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._loop(), name="blob-gc")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.BLOB_GC_INTERVAL)
+            try:
+                removed = await self.collect()
+                if removed:
+                    logger.info("Removed %d unreferenced blobs", removed)
+            except Exception:
+                logger.exception("Blob collection failed")
+
+    async def collect(self) -> int:
+        cutoff  = datetime.now(timezone.utc) - timedelta(seconds=settings.BLOB_GC_GRACE)
+        removed = 0
+        async with async_session() as db:
+            for sha256 in await list_unreferenced_blobs(db, cutoff, settings.BLOB_GC_BATCH):
+                blob = await lock_unreferenced_blob(db, sha256, cutoff)
+                if blob is not None:
+                    await run_in_threadpool(_remove, blob.path)
+                    await db.delete(blob)
+                    removed += 1
+                await db.commit()
+        return removed
@@ -0,0 +1,120 @@
+# app/services/transcode.py
+"""
+Optional lossless transcoding of pixel data at ingest. The target transfer
+syntax is chosen per project and modality (TRANSCODE_BY_PROJECT, falling
+back to TRANSCODE_BY_MODALITY); the work runs in a process pool, started
+only when a target is configured. Codecs are optional dependencies, listed
+commented out in requirements.txt: pyjpegls for JPEG-LS, pylibjpeg +
+pylibjpeg-openjpeg for JPEG 2000; RLE only needs numpy. Transcoding never
+fails an ingest: if the codec is missing (a warning is logged once per
+target), the data cannot be encoded or the result is not smaller, the
+instance is stored as uploaded.
+"""
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, NamedTuple
+
+import pydicom
+from fastapi import UploadFile
+from pydicom.pixels.encoders import (
+    JPEGLSLosslessEncoder,
+    JPEG2000LosslessEncoder,
+    RLELosslessEncoder,
+)
+
+from app.core.config import settings
+from app.schemas.datafile import DataFileCreate
+from app.services.rewrite import RewriteFailed, RewritePool, rewritten
+
+logger = logging.getLogger(__name__)
+
+ENCODERS = {
+    "jpeg-ls":  JPEGLSLosslessEncoder,
+    "jpeg2000": JPEG2000LosslessEncoder,
+    "rle":      RLELosslessEncoder,
+}
+
+_transcode_pool = RewritePool("Transcoding")
+# targets already reported as unavailable, so the warning is logged once
+_unavailable: set[str] = set()
+
+
+class TranscodedInstance(NamedTuple):
+    upload:          UploadFile   # what to forward: the transcoded file or the original
+    transfer_syntax: str | None   # transfer syntax of `upload`
+
+
+def transcode_target(df_in: DataFileCreate) -> str | None:
+    """Configured target for this project/modality, or None to keep the upload as is."""
+    modality = df_in.modality.value
+    rules    = settings.TRANSCODE_BY_PROJECT.get(df_in.project_id)
+    target   = None
+    if rules is not None:
+        target = rules.get(modality, rules.get("*"))
+    if target is None:
+        target = settings.TRANSCODE_BY_MODALITY.get(modality, settings.TRANSCODE_BY_MODALITY.get("*"))
+    return None if target in (None, "none") else target
+
+
+def _encoder_available(target: str) -> bool:
+    encoder = ENCODERS.get(target)
+    if encoder is not None and encoder.is_available:
+        return True
+    if target not in _unavailable:
+        _unavailable.add(target)
+        if encoder is None:
+            logger.warning("Unknown transcode target %r; storing uploads as is", target)
+        else:
+            logger.warning(
+                "Transcode target %r unavailable (%s); storing uploads as is",
+                target, "; ".join(encoder.missing_dependencies),
+            )
+    return False
+
+
+def transcode_file(src: str, dst: str, transfer_syntax: str) -> bool:
+    """
+    Re-encode the pixel data of `src` losslessly into `dst`. Runs in a
+    worker process. Returns False when there is nothing to do (no pixel
+    data, or already compressed).
+    """
+    ds = pydicom.dcmread(src)
+    if "PixelData" not in ds or ds.file_meta.TransferSyntaxUID.is_compressed:
+        return False
+    ds.compress(transfer_syntax)
+    ds.save_as(dst, enforce_file_format=True)
+    return True
+
+
+@asynccontextmanager
+async def transcoded(
+    upload: UploadFile,
+    target: str,
+    transfer_syntax: str | None,
+) -> AsyncIterator[TranscodedInstance]:
+    """
+    Yield `upload` transcoded to `target`, or the upload itself (with its
+    current `transfer_syntax`) when transcoding does not apply.
+    """
+    if _encoder_available(target):
+        uid = str(ENCODERS[target].UID)
+        try:
+            async with rewritten(upload, _transcode_pool, transcode_file, uid) as out:
+                smaller = out.upload is not None and (upload.size is None or out.upload.size < upload.size)
+                if smaller:
+                    yield TranscodedInstance(out.upload, uid)
+                else:
+                    yield TranscodedInstance(upload, transfer_syntax)
+                return
+        except RewriteFailed:
+            logger.warning("Transcoding %s to %s failed; storing as is", upload.filename, target, exc_info=True)
+    yield TranscodedInstance(upload, transfer_syntax)
+
+
+def start_transcode_pool() -> None:
+    if settings.TRANSCODE_BY_MODALITY or settings.TRANSCODE_BY_PROJECT:
+        _transcode_pool.start(settings.TRANSCODE_WORKERS)
+
+
+def shutdown_transcode_pool() -> None:
+    _transcode_pool.shutdown()
@@ -0,0 +1,104 @@
+# app/services/upload_writer.py
+"""
+Shared writer for every upload that lands on local disk (blobs, spooled
+ingest jobs, resumable chunks). Chunks are written on a dedicated thread
+pool so the event loop never blocks on disk, size limits are enforced as
+bytes arrive, and fsync happens only when UPLOAD_FSYNC is set.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, BinaryIO
+
+from fastapi import HTTPException, UploadFile, status
+
+from app.core.config import settings
+from app.services.dicom import iter_upload
+
+_write_pool = ThreadPoolExecutor(
+    max_workers=settings.UPLOAD_WRITE_WORKERS,
+    thread_name_prefix="upload-write",
+)
+
+
+def size_limit(kind: str) -> int | None:
+    """Configured byte limit for an upload kind (file type or "document")."""
+    return settings.UPLOAD_MAX_BYTES.get(kind)
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Upload exceeds the {limit} byte limit",
+    )
+
+
+def check_declared_size(size: int | None, kind: str) -> None:
+    """Reject early when the declared size is already over the limit."""
+    limit = size_limit(kind)
+    if limit and size is not None and size > limit:
+        raise _too_large(limit)
+
+
+def _write_chunk(f: BinaryIO, chunk: bytes, hasher) -> None:
+    if hasher is not None:
+        hasher.update(chunk)
+    f.write(chunk)
+
+
+def _finish(f: BinaryIO, fsync: bool) -> None:
+    if fsync:
+        f.flush()
+        os.fsync(f.fileno())
+    f.close()
+
+
+def _discard(f: BinaryIO, path: str) -> None:
+    f.close()
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def write_stream(
+    chunks: AsyncIterator[bytes],
+    path: str,
+    *,
+    limit: int | None = None,
+    hasher=None,
+    append: bool = False,
+    already_written: int = 0,
+) -> int:
+    """
+    Write an async byte stream to `path` off the event loop. Returns the
+    number of bytes written. With `append`, a failed write keeps the bytes
+    already on disk; otherwise the partial file is removed.
+    """
+    loop = asyncio.get_running_loop()
+    f = await loop.run_in_executor(_write_pool, open, path, "ab" if append else "wb")
+    written = 0
+    try:
+        async for chunk in chunks:
+            written += len(chunk)
+            if limit and already_written + written > limit:
+                raise _too_large(limit)
+            await loop.run_in_executor(_write_pool, _write_chunk, f, chunk, hasher)
+    except BaseException:
+        if append:
+            await loop.run_in_executor(_write_pool, _finish, f, settings.UPLOAD_FSYNC)
+        else:
+            await loop.run_in_executor(_write_pool, _discard, f, path)
+        raise
+    await loop.run_in_executor(_write_pool, _finish, f, settings.UPLOAD_FSYNC)
+    return written
+
+
+async def write_upload(upload: UploadFile, path: str, *, kind: str, hasher=None) -> int:
+    """Write an UploadFile to `path`, enforcing the size limit for `kind`."""
+    check_declared_size(upload.size, kind)
+    return await write_stream(iter_upload(upload), path, limit=size_limit(kind), hasher=hasher)
+
+
+def shutdown_write_pool() -> None:
+    _write_pool.shutdown(wait=True)
@@ -0,0 +1,249 @@
+# app/services/wado.py
+"""
+WADO-RS helpers: stream instances from Orthanc to the client without
+buffering them, either as raw application/dicom (with Range) or wrapped in
+a multipart/related body. Each instance is labelled with the transfer
+syntax it is sent in: as stored, unless the Accept header only allows an
+uncompressed syntax, in which case Orthanc transcodes it on the way out.
+"""
+import asyncio
+import re
+import uuid
+from typing import AsyncIterator, Iterable, NamedTuple
+
+import httpx
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from app.services.orthanc import OrthancClient
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_DICOM_RE = re.compile(r"application/dicom(?![+\w])")
+_TS_RE    = re.compile(r'transfer-syntax\s*=\s*"?([0-9.]+|\*)"?')
+
+# Existence checks in flight at once before a multipart response starts
+_VERIFY_CONCURRENCY = 8
+
+# Syntaxes Orthanc is asked to transcode to, in order of preference
+UNCOMPRESSED_SYNTAXES = (
+    "1.2.840.10008.1.2.1",   # Explicit VR Little Endian
+    "1.2.840.10008.1.2",     # Implicit VR Little Endian
+)
+
+
+class Delivery(NamedTuple):
+    orthanc_id:      str
+    transfer_syntax: str | None   # what the client receives; None if unknown
+    transcode:       bool         # whether Orthanc must transcode to it
+
+
+def accepted_transfer_syntaxes(accept: str | None) -> set[str] | None:
+    """
+    Transfer syntaxes an Accept header allows for DICOM content, from the
+    transfer-syntax parameters of its application/dicom ranges (direct or
+    as multipart/related type). None when any syntax will do.
+    """
+    if not accept:
+        return None
+    accepted = set()
+    for media_range in accept.split(","):
+        if not _DICOM_RE.search(media_range):
+            continue
+        match = _TS_RE.search(media_range)
+        if not match or match.group(1) == "*":
+            return None
+        accepted.add(match.group(1))
+    return accepted or None
+
+
+def plan_delivery(orthanc_id: str, stored: str | None, accepted: set[str] | None) -> Delivery:
+    """Send the stored syntax if acceptable, else have Orthanc decompress; 406 otherwise."""
+    if accepted is None or stored in accepted:
+        return Delivery(orthanc_id, stored, False)
+    for uid in UNCOMPRESSED_SYNTAXES:
+        if uid in accepted:
+            return Delivery(orthanc_id, uid, True)
+    raise HTTPException(
+        status_code=status.HTTP_406_NOT_ACCEPTABLE,
+        detail="Instances are only available as stored or uncompressed",
+    )
+
+
+def dicom_media_type(transfer_syntax: str | None) -> str:
+    if transfer_syntax:
+        return f"application/dicom; transfer-syntax={transfer_syntax}"
+    return "application/dicom"
+
+
+def parse_byte_range(header: str, size: int) -> tuple[int, int]:
+    """
+    Parse a single-range `Range: bytes=a-b` header against a resource of
+    `size` bytes. Returns the inclusive (start, end) offsets.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        raise HTTPException(
+            status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+            detail="Only a single byte range is supported",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    first, last = match.groups()
+    if first == "":
+        # suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end   = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+async def iter_response(resp: httpx.Response) -> AsyncIterator[bytes]:
+    """Relay a streamed Orthanc response chunk by chunk, then close it."""
+    try:
+        async for chunk in resp.aiter_raw():
+            yield chunk
+    finally:
+        await resp.aclose()
+
+
+async def slice_stream(chunks: AsyncIterator[bytes], start: int, end: int) -> AsyncIterator[bytes]:
+    """Yield only bytes start..end (inclusive) of a chunk stream."""
+    offset = 0
+    async for chunk in chunks:
+        chunk_end = offset + len(chunk)
+        if chunk_end > start and offset <= end:
+            yield chunk[max(start - offset, 0):end - offset + 1]
+        offset = chunk_end
+        if offset > end:
+            break
+    await chunks.aclose()
+
+
+async def multipart_related(
+    orthanc: OrthancClient,
+    parts: Iterable[Delivery],
+    boundary: str,
+) -> AsyncIterator[bytes]:
+    """
+    Build a multipart/related; type="application/dicom" body by streaming
+    each instance from Orthanc in turn. Only one instance is open at a time.
+    """
+    for part in parts:
+        resp = await orthanc.open_instance_file(
+            part.orthanc_id, transcode=part.transfer_syntax if part.transcode else None
+        )
+        yield (
+            f"--{boundary}\r\n"
+            f"Content-Type: {dicom_media_type(part.transfer_syntax)}\r\n"
+            f"\r\n"
+        ).encode()
+        async for chunk in iter_response(resp):
+            yield chunk
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode()
+
+
+def new_boundary() -> str:
+    return uuid.uuid4().hex
+
+
+async def _existing(orthanc: OrthancClient, parts: list[Delivery]) -> list[Delivery]:
+    """The parts whose instance Orthanc still has, in order."""
+    limit = asyncio.Semaphore(_VERIFY_CONCURRENCY)
+
+    async def exists(part: Delivery) -> bool:
+        async with limit:
+            return await orthanc.instance_exists(part.orthanc_id)
+
+    found = await asyncio.gather(*(exists(part) for part in parts))
+    return [part for part, ok in zip(parts, found) if ok]
+
+
+async def multipart_response(
+    orthanc: OrthancClient,
+    instances: list[tuple[str, str | None]],
+    accept: str | None = None,
+) -> StreamingResponse:
+    """
+    Multipart response for (orthanc_id, stored transfer syntax) pairs.
+    Every instance is checked before the response starts, so a missing one
+    is reported in the status (206 with a Warning, or 404 if none are
+    left) rather than by a body cut short after 200.
+    """
+    accepted = accepted_transfer_syntaxes(accept)
+    parts    = [plan_delivery(orthanc_id, stored, accepted) for orthanc_id, stored in instances]
+    found    = await _existing(orthanc, parts)
+    if not found:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Instance not found in Orthanc"
+        )
+    status_code, headers = status.HTTP_200_OK, {}
+    if len(found) < len(parts):
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Warning"] = f'299 - "{len(parts) - len(found)} instance(s) missing from storage"'
+    boundary = new_boundary()
+    return StreamingResponse(
+        multipart_related(orthanc, found, boundary),
+        status_code=status_code,
+        media_type=f'multipart/related; type="application/dicom"; boundary={boundary}',
+        headers=headers,
+    )
+
+
+async def instance_response(
+    orthanc: OrthancClient,
+    orthanc_id: str,
+    range_header: str | None = None,
+    stored_syntax: str | None = None,
+    accept: str | None = None,
+) -> StreamingResponse:
+    """
+    Stream one instance as application/dicom. A Range header is forwarded to
+    Orthanc; if Orthanc ignores it (or transcodes), the range is cut out of
+    the stream here.
+    """
+    part = plan_delivery(orthanc_id, stored_syntax, accepted_transfer_syntaxes(accept))
+    if part.transcode:
+        resp = await orthanc.open_instance_file(orthanc_id, transcode=part.transfer_syntax)
+    else:
+        resp = await orthanc.open_instance_file(orthanc_id, range_header)
+    media_type = dicom_media_type(part.transfer_syntax)
+    headers    = {"Accept-Ranges": "bytes"}
+    size    = resp.headers.get("Content-Length")
+
+    if resp.status_code == status.HTTP_206_PARTIAL_CONTENT:
+        headers["Content-Range"] = resp.headers.get("Content-Range", "")
+        if size is not None:
+            headers["Content-Length"] = size
+        return StreamingResponse(
+            iter_response(resp),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers=headers,
+        )
+
+    if range_header and size is not None:
+        try:
+            start, end = parse_byte_range(range_header, int(size))
+        except HTTPException:
+            await resp.aclose()
+            raise
+        headers["Content-Range"]  = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            slice_stream(iter_response(resp), start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers=headers,
+        )
+
+    if size is not None:
+        headers["Content-Length"] = size
+    return StreamingResponse(iter_response(resp), media_type=media_type, headers=headers)
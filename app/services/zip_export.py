@@ -0,0 +1,172 @@
+# app/services/zip_export.py
+"""
+On-the-fly ZIP of a project's files. Entries are written with zipfile into
+an in-memory, non-seekable sink that is drained after every write, so
+nothing is staged on disk and memory is bounded by the prefetch window.
+Up to ZIP_EXPORT_PREFETCH files are fetched concurrently (local blobs via
+the thread pool, DICOM from Orthanc), each into a bounded chunk queue, and
+written to the archive in order.
+"""
+import asyncio
+import logging
+import re
+import zipfile
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import RowMapping
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.models import FileTypeEnum
+from app.services.orthanc import OrthancClient
+from app.services.wado import iter_response
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class _Sink:
+    """Write-only, non-seekable file object; zipfile falls back to data descriptors."""
+
+    def __init__(self) -> None:
+        self._parts: list[bytes] = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def seekable(self) -> bool:
+        return False
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def entry_name(row: RowMapping) -> str:
+    """Archive path of a file: <file_type>/<id>-<data_name>.<ext>."""
+    safe = re.sub(r"[^A-Za-z0-9._-]+", "_", row["data_name"]).strip("._") or "file"
+    ext  = "dcm" if row["file_type"] is FileTypeEnum.DICOM else row["file_type"].value
+    if not safe.lower().endswith(f".{ext}"):
+        safe = f"{safe}.{ext}"
+    return f"{row['file_type'].value}/{row['id']}-{safe}"
+
+
+async def _read_blob(path: str) -> AsyncIterator[bytes]:
+    f = await run_in_threadpool(open, path, "rb")
+    try:
+        while chunk := await run_in_threadpool(f.read, settings.UPLOAD_CHUNK_SIZE):
+            yield chunk
+    finally:
+        await run_in_threadpool(f.close)
+
+
+async def _source(orthanc: OrthancClient, row: RowMapping) -> AsyncIterator[bytes]:
+    if row["orthanc_id"]:
+        resp = await orthanc.open_instance_file(row["orthanc_id"])
+        async for chunk in iter_response(resp):
+            yield chunk
+    elif row["storage_path"]:
+        async for chunk in _read_blob(row["storage_path"]):
+            yield chunk
+    else:
+        raise FileNotFoundError("No stored content")
+
+
+async def _prefetch(orthanc: OrthancClient, row: RowMapping, queue: asyncio.Queue) -> None:
+    """Fill `queue` with the file's chunks, then _DONE or the exception."""
+    try:
+        async for chunk in _source(orthanc, row):
+            await queue.put(chunk)
+        await queue.put(_DONE)
+    except Exception as e:
+        await queue.put(e)
+
+
+def _describe(name: str, exc: Exception) -> str:
+    """
+    A generic reason for errors.txt: the archive goes to the client, so
+    paths and upstream messages are only logged here.
+    """
+    logger.warning("Export of %s failed", name, exc_info=exc)
+    if isinstance(exc, FileNotFoundError) or (isinstance(exc, HTTPException) and exc.status_code == 404):
+        return "file not found in storage"
+    return "file could not be read"
+
+
+async def stream_zip(orthanc: OrthancClient, rows: Sequence[RowMapping]) -> AsyncIterator[bytes]:
+    """
+    Yield the ZIP archive for `rows` (id, data_name, file_type, orthanc_id,
+    storage_path, uploaded_at). Files that cannot be fetched are listed in
+    a trailing errors.txt entry; an entry that fails midway is kept
+    truncated and flagged there too.
+    """
+    sink   = _Sink()
+    zf     = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+    window: deque[tuple[RowMapping, asyncio.Queue, asyncio.Task]] = deque()
+    errors: list[str] = []
+    pending = iter(rows)
+
+    def fill_window() -> None:
+        while len(window) < settings.ZIP_EXPORT_PREFETCH:
+            row = next(pending, None)
+            if row is None:
+                return
+            queue = asyncio.Queue(maxsize=settings.ZIP_EXPORT_QUEUE_CHUNKS)
+            window.append((row, queue, asyncio.create_task(_prefetch(orthanc, row, queue))))
+
+    try:
+        fill_window()
+        while window:
+            row, queue, _task = window[0]
+            name  = entry_name(row)
+            entry = None
+            while (item := await queue.get()) is not _DONE:
+                if isinstance(item, Exception):
+                    errors.append(f"{name}: {'truncated, ' if entry else ''}{_describe(name, item)}")
+                    break
+                if entry is None:
+                    info = zipfile.ZipInfo(name, date_time=_zip_time(row["uploaded_at"]))
+                    # sizes are unknown up front, so always reserve ZIP64 fields
+                    entry = zf.open(info, mode="w", force_zip64=True)
+                entry.write(item)
+                if data := sink.drain():
+                    yield data
+            if entry is not None:
+                entry.close()
+            elif item is _DONE:
+                # empty file
+                zf.writestr(zipfile.ZipInfo(name, date_time=_zip_time(row["uploaded_at"])), b"")
+            window.popleft()
+            fill_window()
+            if data := sink.drain():
+                yield data
+
+        if errors:
+            zf.writestr("errors.txt", "\n".join(errors) + "\n")
+        zf.close()
+        yield sink.drain()
+    finally:
+        for _row, _queue, task in window:
+            task.cancel()
+        await asyncio.gather(*(task for _r, _q, task in window), return_exceptions=True)
+
+
+def _zip_time(ts: datetime | None) -> tuple:
+    # ZIP timestamps cannot predate 1980
+    if ts is None or ts.year < 1980:
+        return (1980, 1, 1, 0, 0, 0)
+    return ts.timetuple()[:6]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Login load benchmark. Fires concurrent POST /auth/login requests at a
+running server while probing an unrelated endpoint, then reports login
+throughput and the probe's latency percentiles. With bcrypt on the event
+loop the probe latency tracks the login backlog; with the hashing pool it
+should stay flat while excess logins are refused with 503.
+
+Login throttling answers 429 before any hashing, so a run from one address
+with one account measures the throttle, not bcrypt. Start the server with
+the buckets raised for the run, or spread the load over several accounts
+(repeat --email) and loopback addresses (--source-ips, server on localhost):
+
+    LOGIN_EMAIL_BURST=1000000 LOGIN_IP_BURST=1000000 uvicorn app.main:app
+    python bench_login.py --concurrency 32 --duration 20
+
+429s are reported separately and never counted as answered logins.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import httpx
+
+# ── Configuration ──────────────────────────────────────────
+BASE_URL = "http://localhost:8000"
+EMAIL = "test@example.com"
+PASSWORD = "testpassword"
+# Refused before any hashing: 503 pool saturated, 429 throttled
+REFUSED = (503, 429)
+
+
+# ── Load ───────────────────────────────────────────────────
+def worker_client(args, i: int) -> httpx.AsyncClient:
+    """A client for login worker `i`, bound to its own loopback address with --source-ips."""
+    transport = None
+    if args.source_ips:
+        transport = httpx.AsyncHTTPTransport(local_address=f"127.0.0.{i % args.source_ips + 1}")
+    return httpx.AsyncClient(base_url=args.base_url, transport=transport, timeout=60)
+
+
+async def login_worker(args, i: int, deadline: float, statuses: Counter, latencies: list):
+    emails  = args.email or [EMAIL]
+    payload = {"email": emails[i % len(emails)], "password": args.password}
+    async with worker_client(args, i) as client:
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            try:
+                resp = await client.post("/auth/login", json=payload)
+                statuses[resp.status_code] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                continue
+            if resp.status_code not in REFUSED:
+                latencies.append(time.monotonic() - started)
+
+
+async def probe(client: httpx.AsyncClient, args, deadline: float, latencies: list):
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            await client.get(args.probe_path)
+            latencies.append(time.monotonic() - started)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(args.probe_interval)
+
+
+# ── Report ─────────────────────────────────────────────────
+def percentiles(values: list) -> str:
+    if len(values) < 2:
+        return "n/a"
+    q = statistics.quantiles(values, n=100)
+    return f"p50={q[49] * 1000:.0f}ms p95={q[94] * 1000:.0f}ms p99={q[98] * 1000:.0f}ms max={max(values) * 1000:.0f}ms"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--email", action="append", help="account to log in as; repeat to rotate (default %s)" % EMAIL)
+    parser.add_argument("--password", default=PASSWORD)
+    parser.add_argument("--source-ips", type=int, default=0, help="spread workers over 127.0.0.1..N")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent login clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--probe-path", default="/openapi.json", help="unrelated endpoint to time")
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        # Baseline for the probe before any login load
+        baseline: list = []
+        await probe(client, args, time.monotonic() + 2, baseline)
+
+        statuses: Counter = Counter()
+        login_latencies: list = []
+        probe_latencies: list = []
+        deadline = time.monotonic() + args.duration
+        await asyncio.gather(
+            probe(client, args, deadline, probe_latencies),
+            *(login_worker(args, i, deadline, statuses, login_latencies) for i in range(args.concurrency)),
+        )
+
+    checked = sum(n for code, n in statuses.items() if isinstance(code, int) and code not in REFUSED)
+    print(f"Login concurrency {args.concurrency}, {args.duration:.0f}s")
+    print(f"  statuses:         {dict(statuses)}")
+    print(f"  logins answered:  {checked / args.duration:.1f}/s (429 and 503 excluded)")
+    print(f"  throttled (429):  {statuses[429] / args.duration:.1f}/s")
+    print(f"  login latency:    {percentiles(login_latencies)}")
+    print(f"  probe idle:       {percentiles(baseline)}")
+    print(f"  probe under load: {percentiles(probe_latencies)}")
+    if statuses[429]:
+        print("  warning: logins were throttled; raise the login buckets or rotate --email/--source-ips")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -9,7 +9,7 @@ async def create_test_user():
     async with async_session() as session:
         test_email = "test@example.com"
         test_password = "testpassword"
-        hashed_password = get_password_hash(test_password)
+        hashed_password = await get_password_hash(test_password)
         user = User(
             email=test_email,
             hashed_password=hashed_password,
@@ -18,6 +18,8 @@ ME_URL = f"{BASE_URL}/auth/me"
 PENDING_LIST_URL = f"{BASE_URL}/admin/pending-registrations"
 APPROVE_URL = lambda pid: f"{BASE_URL}/admin/pending-registrations/{pid}/approve"
 DATAFILES_URL = f"{BASE_URL}/files"
+UPLOADS_URL = f"{BASE_URL}/files/uploads"
+QIDO_STUDIES_URL = f"{BASE_URL}/dicomweb/studies"
 
 TOKEN_FILE = "token.json"
 ADMIN_EMAIL = "admin@example.com"
@@ -327,6 +329,124 @@ def test_files_create_pdf(token):
     return rec["id"]
 
 
+def test_files_batch_upload(token):
+    # one valid instance plus one non-DICOM part → per-instance results
+    dicom_path = "1.dcm"
+    if not os.path.exists(dicom_path):
+        print("▶ 1.dcm not found; skipping batch upload")
+        return
+    with open(dicom_path, "rb") as f:
+        dicom_bytes = f.read()
+    files = [
+        ("uploads", ("1.dcm", dicom_bytes)),
+        ("uploads", ("notdicom.txt", b"this is not dicom")),
+    ]
+    data = {
+        "data_name": "Test batch",
+        "project_id": 1,
+        "patient_id": 1,
+        "modality": "CT",
+        "access_level": "project",
+    }
+    r = requests.post(
+        f"{DATAFILES_URL}/batch",
+        headers={"Authorization": f"Bearer {token}"},
+        data=data,
+        files=files,
+    )
+    assert r.status_code == 200, f"Batch upload failed: {r.status_code} {r.text}"
+    body = r.json()
+    assert len(body["results"]) == 2, "Expected one result per part"
+    assert body["results"][1]["status_code"] == 400, "Non-DICOM part not rejected"
+    print(f"✔ Batch upload → accepted={body['accepted']} rejected={body['rejected']}")
+
+
+def test_files_cursor_pagination(token):
+    headers = {"Authorization": f"Bearer {token}"}
+    r = requests.get(DATAFILES_URL, headers=headers, params={"limit": 1})
+    assert r.status_code == 200, f"Expected 200, got {r.status_code}"
+    first = r.json()
+    cursor = r.headers.get("X-Next-Cursor")
+    if not cursor:
+        print("▶ Fewer than two files; skipping cursor pagination")
+        return
+    assert 'rel="next"' in r.headers.get("Link", ""), "Link rel=next missing"
+    r2 = requests.get(DATAFILES_URL, headers=headers, params={"limit": 1, "cursor": cursor})
+    assert r2.status_code == 200, f"Next page failed: {r2.status_code}"
+    assert r2.json() and r2.json()[0]["id"] != first[0]["id"], "Next page repeats the first"
+    r3 = requests.get(DATAFILES_URL, headers=headers, params={"cursor": "not-a-cursor"})
+    assert r3.status_code == 400, f"Expected 400 for a bad cursor, got {r3.status_code}"
+    print("✔ /files cursor pagination follows X-Next-Cursor and rejects bad cursors")
+
+
+def test_files_export(token):
+    headers = {"Authorization": f"Bearer {token}"}
+    r = requests.get(f"{DATAFILES_URL}/export", headers=headers, params={"format": "ndjson", "project_id": 1})
+    assert r.status_code == 200, f"NDJSON export failed: {r.status_code}"
+    assert r.headers["Content-Type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines() if line]
+    assert all(row["project_id"] == 1 for row in rows), "Export ignored the project filter"
+    r2 = requests.get(f"{DATAFILES_URL}/export", headers=headers, params={"format": "csv", "project_id": 1})
+    assert r2.status_code == 200, f"CSV export failed: {r2.status_code}"
+    lines = r2.text.splitlines()
+    assert lines and lines[0].startswith("id,"), "CSV header missing"
+    assert len(lines) - 1 == len(rows), "CSV and NDJSON row counts differ"
+    print(f"✔ /files/export streamed {len(rows)} row(s) as NDJSON and CSV")
+
+
+def test_resumable_upload(token):
+    headers = {"Authorization": f"Bearer {token}"}
+    content = b"%PDF-1.4\n%Resumable " + uuid.uuid4().hex.encode() + b"\n"
+    half = len(content) // 2
+    data = {
+        "data_name": "Test resumable PDF",
+        "project_id": 1,
+        "patient_id": 1,
+        "modality": "MRI",
+        "access_level": "research",
+        "file_type": "pdf",
+        "filename": "resumable.pdf",
+    }
+    r = requests.post(UPLOADS_URL, headers={**headers, "Upload-Length": str(len(content))}, data=data)
+    assert r.status_code == 201, f"Create upload failed: {r.status_code} {r.text}"
+    url = f"{BASE_URL}{r.headers['Location']}"
+    patch_headers = {**headers, "Content-Type": "application/offset+octet-stream"}
+
+    r = requests.patch(url, headers={**patch_headers, "Upload-Offset": "0"}, data=content[:half])
+    assert r.status_code == 204, f"First chunk failed: {r.status_code}"
+    r = requests.head(url, headers=headers)
+    assert r.headers.get("Upload-Offset") == str(half), f"Offset not {half}: {r.headers.get('Upload-Offset')}"
+    r = requests.patch(url, headers={**patch_headers, "Upload-Offset": "0"}, data=content[half:])
+    assert r.status_code == 409, f"Expected 409 for a stale offset, got {r.status_code}"
+    r = requests.post(f"{url}/finalize", headers=headers)
+    assert r.status_code == 409, f"Expected 409 for an incomplete upload, got {r.status_code}"
+
+    r = requests.patch(url, headers={**patch_headers, "Upload-Offset": str(half)}, data=content[half:])
+    assert r.status_code == 204, f"Second chunk failed: {r.status_code}"
+    r = requests.post(f"{url}/finalize", headers=headers)
+    assert r.status_code == 201, f"Finalize failed: {r.status_code} {r.text}"
+    assert r.json().get("storage_path"), "storage_path missing"
+    print(f"✔ Resumable upload resumed at {half} and finalized → id={r.json()['id']}")
+
+
+# ── DICOMweb Tests ─────────────────────────────────────────
+def test_qido_studies(token):
+    headers = {"Authorization": f"Bearer {token}"}
+    r = requests.get(QIDO_STUDIES_URL, headers=headers, params={"limit": 10})
+    assert r.status_code == 200, f"QIDO search failed: {r.status_code}"
+    assert r.headers["Content-Type"].startswith("application/dicom+json")
+    studies = r.json()
+    if not studies:
+        print("▶ No studies indexed; skipping QIDO match")
+        return
+    uid = studies[0]["0020000D"]["Value"][0]
+    r2 = requests.get(QIDO_STUDIES_URL, headers=headers, params={"StudyInstanceUID": uid})
+    assert r2.status_code == 200 and len(r2.json()) == 1, "StudyInstanceUID match failed"
+    r3 = requests.get(QIDO_STUDIES_URL, headers=headers, params={"StudyInstanceUID": "1.2.3.999999"})
+    assert r3.status_code == 200 and r3.json() == [], "Unknown study matched"
+    print(f"✔ QIDO /studies returned {len(studies)} study(ies) and matched {uid}")
+
+
 def test_files_list_contains(token, before, did_ids):
     r = requests.get(DATAFILES_URL, headers={"Authorization": f"Bearer {token}"})
     arr = r.json()
@@ -366,6 +486,73 @@ def test_register_and_pending_flow(token):
     print(f"✔ Approved pending user → new user id={r3.json()['id']}")
 
 
+def create_approved_user(token):
+    """Register a user, approve it, and return (email, password)."""
+    email = f"throttle+{uuid.uuid4().hex[:6]}@example.com"
+    password = "TestPass123!"
+    headers = {"Authorization": f"Bearer {token}"}
+    r = requests.post(
+        REGISTER_URL,
+        headers=headers,
+        data={"email": email, "password": password, "first_name": "Rate", "last_name": "Limit"},
+    )
+    assert r.status_code == 201, f"Register failed: {r.status_code} {r.text}"
+    r = requests.post(APPROVE_URL(r.json()["id"]), headers=headers, json={"role_ids": [3]})
+    assert r.status_code == 200, f"Approve failed: {r.status_code}"
+    return email, password
+
+
+# ── Login Throttling Tests ─────────────────────────────────
+LOGIN_BURST = 5  # LOGIN_EMAIL_BURST on the server
+
+
+def test_login_throttle_lockout(token):
+    email, password = create_approved_user(token)
+    bad = {"email": email, "password": "wrong-password"}
+    for attempt in range(1, LOGIN_BURST + 1):
+        r = requests.post(LOGIN_URL, json=bad)
+        # the Nth failure is still answered 401; that is when the lockout is written
+        assert r.status_code == 401, f"Attempt {attempt}: expected 401, got {r.status_code}"
+    r = requests.post(LOGIN_URL, json={"email": email, "password": password})
+    assert r.status_code == 429, f"Expected 429 after the burst, got {r.status_code}"
+    retry_after = int(r.headers.get("Retry-After", "0"))
+    assert retry_after > 0, "Retry-After missing on 429"
+    print(f"✔ Login throttled after {LOGIN_BURST} failures (Retry-After={retry_after}s)")
+
+    if retry_after > 10:
+        print("▶ Refill slower than 10s; skipping the lockout check")
+        return
+    time.sleep(retry_after)
+    r = requests.post(LOGIN_URL, json={"email": email, "password": password})
+    assert r.status_code == 403 and "locked" in r.json().get("detail", ""), (
+        f"Expected the account to be locked, got {r.status_code} {r.text}"
+    )
+    print("✔ Lockout was written on the last allowed failure")
+
+
+def test_login_success_resets(token):
+    email, password = create_approved_user(token)
+    bad = {"email": email, "password": "wrong-password"}
+    for _ in range(LOGIN_BURST - 2):
+        assert requests.post(LOGIN_URL, json=bad).status_code == 401
+
+    # first login sets up TOTP; logging in with a code is a full success
+    r = requests.post(LOGIN_URL, json={"email": email, "password": password})
+    assert r.status_code == 200 and r.json().get("totp_setup"), f"TOTP setup failed: {r.status_code}"
+    secret = parse_secret_from_uri(r.json()["qr_code_url"])
+    r = requests.post(
+        LOGIN_URL,
+        json={"email": email, "password": password, "totp_code": pyotp.TOTP(secret).now()},
+    )
+    assert r.status_code == 200 and "access_token" in r.json(), f"Login failed: {r.status_code} {r.text}"
+
+    # without the reset the bucket would run dry within these attempts
+    for attempt in range(1, LOGIN_BURST):
+        r = requests.post(LOGIN_URL, json=bad)
+        assert r.status_code == 401, f"Attempt {attempt} after success: expected 401, got {r.status_code}"
+    print("✔ Successful login resets the failure budget")
+
+
 def test_me_endpoint(token):
     r = requests.get(ME_URL, headers={"Authorization": f"Bearer {token}"})
     assert r.status_code == 200, f"GET /auth/me failed: {r.status_code}"
@@ -451,10 +638,21 @@ def main():
     pdf_id   = run(test_files_create_pdf, token)
     if before is not None and dicom_id and pdf_id:
         run(test_files_list_contains, token, before, [dicom_id, pdf_id])
+    run(test_files_batch_upload, token)
+    run(test_files_cursor_pagination, token)
+    run(test_files_export, token)
+    run(test_resumable_upload, token)
+
+    # dicomweb
+    run(test_qido_studies, token)
 
     # admin/register
     run(test_register_and_pending_flow, token)
 
+    # login throttling
+    run(test_login_throttle_lockout, token)
+    run(test_login_success_resets, token)
+
     # me
     run(test_me_endpoint, token)
 